@@ -0,0 +1,206 @@
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from listing import Listing
+
+
+logger = logging.getLogger("YELLOSCRAPPER")
+
+# XHR endpoints the map and detail pages call; their JSON has every field we scrape.
+API_PATTERNS = (
+    "/Listing.svc/PropertySearch_Post",
+    "/Listing.svc/PropertyDetails",
+)
+SITE = "https://www.realtor.ca"
+
+
+# =======================
+# API RECORD -> LISTING
+# =======================
+def _phone(p: dict) -> str:
+    number = (p.get("PhoneNumber") or "").strip()
+    area = (p.get("AreaCode") or "").strip()
+    if not number:
+        return ""
+    return f"{area}-{number}" if area else number
+
+
+def _phones(phones, kind="Telephone"):
+    """
+    Numbers of one type, matching what the page renders as data-type='Telephone'.
+    """
+    numbers = [_phone(p) for p in phones or [] if (p.get("PhoneType") or "") == kind]
+    return [n for n in numbers if n]
+
+
+def listing_from_api(record: dict) -> Listing:
+    """
+    Maps one realtor.ca API result (search result or property details) onto a Listing,
+    with the same text formats the DOM extractor produces.
+    """
+    prop = record.get("Property") or {}
+    info = Listing()
+
+    rel = record.get("RelativeDetailsURL") or record.get("RelativeURLEn") or ""
+    info.url = SITE + rel if rel.startswith("/") else rel
+
+    photos = prop.get("Photo") or []
+    if photos:
+        info.image = photos[0].get("HighResPath") or photos[0].get("MedResPath") or ""
+
+    info.set_price(prop.get("Price") or "")
+    address = (prop.get("Address") or {}).get("AddressText") or ""
+    info.set_address(address.replace("|", "\n"))
+
+    individuals = record.get("Individual") or []
+    for idx, person in enumerate(individuals[:2], 1):
+        phones = _phones(person.get("Phones"))
+        setattr(info, f"salesperson{idx}", (person.get("Name") or "").strip() or "-")
+        setattr(info, f"salesperson{idx}_phone1", phones[0] if len(phones) >= 1 else "-")
+        setattr(info, f"salesperson{idx}_phone2", phones[1] if len(phones) >= 2 else "-")
+
+    # One office card per distinct organization, in page order
+    offices, seen = [], set()
+    for person in individuals:
+        org = person.get("Organization") or {}
+        key = org.get("OrganizationID") or org.get("Name")
+        if key and key not in seen:
+            seen.add(key)
+            offices.append(org)
+
+    for idx, org in enumerate(offices[:2], 1):
+        org_address = ((org.get("Address") or {}).get("AddressText") or "").replace("|", " ").strip()
+        phones = _phones(org.get("Phones"))
+        setattr(info, f"brokerage{idx}", (org.get("Name") or "").strip() or "-")
+        setattr(info, f"brokerage{idx}_address", " ".join(org_address.split()) or "-")
+        setattr(info, f"brokerage{idx}_tel", phones[0] if phones else "-")
+
+    return info
+
+
+def _records(payload: dict):
+    """
+    PropertySearch_Post returns {"Results": [...]}; PropertyDetails returns a single record.
+    """
+    if isinstance(payload.get("Results"), list):
+        return payload["Results"]
+    if "Property" in payload and payload.get("Id"):
+        return [payload]
+    return []
+
+
+# =======================
+# NETWORK CAPTURE
+# =======================
+class NetworkCapture:
+    """
+    Reads the search / detail JSON the page already downloaded, from Chrome's
+    performance log (init_driver(capture=True)) plus CDP Network.getResponseBody.
+
+    Records are kept by listing ID (the number in /real-estate/<id>/...), newest
+    wins, except that a search-result summary never replaces a detail response
+    (it may be fetched later, see below). Only the most recent `max_records` are kept.
+
+    The log covers every tab, but getResponseBody only reaches the current one.
+    Responses are tracked per tab (ChromeDriver's "webview", the window handle):
+    a body from another tab is fetched by a later poll() while that tab is
+    current, e.g. the map tab's PropertySearch_Post once back on the results
+    page. Bodies still waiting after `max_age` seconds (tab closed) are dropped.
+    """
+
+    def __init__(self, driver, max_records=5000, max_age=300):
+        self.driver = driver
+        self.max_records = max_records
+        self.max_age = max_age
+        self.records = OrderedDict()
+        self._detailed = set()  # listing IDs whose record came from PropertyDetails
+        self._requests = {}  # (tab, requestId) -> url, response seen
+        self._finished = {}  # (tab, requestId) -> (url, finished at), body not fetched yet
+        self.stats = {"responses": 0, "records": 0, "errors": 0, "dropped": 0}
+
+    def poll(self):
+        """
+        Drains the performance log and stores records from any finished API responses.
+        """
+        try:
+            entries = self.driver.get_log("performance")
+        except Exception as e:
+            logger.debug(f"[capture] performance log unavailable: {e}")
+            return
+
+        now = time.time()
+        for entry in entries:
+            try:
+                wrapper = json.loads(entry["message"])
+                msg = wrapper["message"]
+            except Exception:
+                continue
+            method = msg.get("method")
+            params = msg.get("params") or {}
+            key = (wrapper.get("webview"), params.get("requestId"))
+
+            if method == "Network.responseReceived":
+                url = (params.get("response") or {}).get("url", "")
+                if any(p in url for p in API_PATTERNS):
+                    self._requests[key] = url
+            elif method == "Network.loadingFinished" and key in self._requests:
+                self._finished[key] = (self._requests.pop(key), now)
+            elif method == "Network.loadingFailed":
+                self._requests.pop(key, None)
+
+        if not self._finished:
+            return
+        try:
+            current = self.driver.current_window_handle
+        except Exception:
+            current = None
+        for key, (url, finished) in list(self._finished.items()):
+            tab, request_id = key
+            if tab is None or tab == current:
+                del self._finished[key]
+                self._fetch(request_id, url)
+            elif now - finished > self.max_age:
+                del self._finished[key]
+                self.stats["dropped"] += 1
+
+    def _fetch(self, request_id, url):
+        try:
+            body = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+            payload = json.loads(body.get("body") or "{}")
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.debug(f"[capture] could not read {url}: {e}")
+            return
+
+        self.stats["responses"] += 1
+        detail = "/PropertyDetails" in url
+        for record in _records(payload):
+            rid = str(record.get("Id") or "")
+            if not rid or (not detail and rid in self._detailed):
+                continue
+            if detail:
+                self._detailed.add(rid)
+            self.records.pop(rid, None)
+            self.records[rid] = record
+            self.stats["records"] += 1
+        while len(self.records) > self.max_records:
+            rid, _ = self.records.popitem(last=False)
+            self._detailed.discard(rid)
+
+    def listing(self, listing_id: str, wait=0.0) -> Optional[Listing]:
+        """
+        Listing for `listing_id` from captured JSON, polling for up to `wait`
+        seconds for the response to arrive. None if it was never captured.
+        """
+        deadline = time.time() + wait
+        while True:
+            self.poll()
+            record = self.records.get(str(listing_id))
+            if record is not None:
+                return listing_from_api(record)
+            if time.time() >= deadline:
+                return None
+            time.sleep(0.25)
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from typing import NamedTuple
+
+from listing import Listing
+
+
+logger = logging.getLogger("YELLOSCRAPPER")
+
+# Fields that make up a listing's change hash. The URL is the identity, not content.
+HASH_FIELDS = (
+    "price_text", "address", "image",
+    "salesperson1", "salesperson1_phone1", "salesperson1_phone2",
+    "salesperson2", "salesperson2_phone1", "salesperson2_phone2",
+    "brokerage1", "brokerage1_address", "brokerage1_tel",
+    "brokerage2", "brokerage2_address", "brokerage2_tel",
+)
+
+# Extra leading columns for tabular delta outputs: (header, Listing field)
+DELTA_COLUMNS = (("Change", "change"), ("Old Price", "old_price"))
+
+_ID_RE = re.compile(r"/real-estate/(\d+)")
+
+
+def listing_id(data: Listing) -> str:
+    """
+    Stable listing key: the numeric realtor.ca ID from the detail URL
+    (https://www.realtor.ca/real-estate/<id>/...), else the URL without query/hash.
+    """
+    url = data.url or ""
+    m = _ID_RE.search(url)
+    if m:
+        return m.group(1)
+    return url.split("#", 1)[0].split("?", 1)[0]
+
+
+def field_hash(data: Listing) -> str:
+    payload = "\x1f".join(str(getattr(data, k)) for k in HASH_FIELDS)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+# =======================
+# CRAWL STATE
+# =======================
+class StateEntry(NamedTuple):
+    hash: str
+    price: str
+    url: str
+    address: str
+    first_seen: float
+    last_seen: float
+
+
+class CrawlState:
+    """
+    Previous crawl state per listing, persisted as JSON:
+        {listing_id: [hash, price, url, address, first_seen, last_seen]}
+    Entries are tuples, not dicts, so large regions stay small in memory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.listings = {}
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    raw = json.load(f).get("listings", {})
+                self.listings = {
+                    lid: StateEntry(**e) if isinstance(e, dict) else StateEntry(*e)
+                    for lid, e in raw.items()
+                }
+            except Exception as e:
+                logger.warning(f"Could not read crawl state {path}, starting fresh: {e}")
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"saved": time.time(), "listings": self.listings}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+
+class DeltaSink:
+    """
+    Sink wrapper that compares each listing with the previous crawl and forwards
+    only differences to `inner`, tagged with "change":
+
+        new      - listing not in the previous state
+        changed  - field hash differs ("old_price" holds the previous price)
+        removed  - in the previous state but not seen this crawl (emitted on close)
+
+    Unchanged listings are not forwarded, only their last_seen is refreshed.
+    Removals are only emitted when `complete` is still True at close, since a
+    crawl cut short by a page limit or stop request hasn't seen every listing.
+    """
+
+    def __init__(self, inner, state_path):
+        self.inner = inner
+        self.state = CrawlState(state_path)
+        self.complete = True
+        self.seen = set()
+        self.stats = {"new": 0, "changed": 0, "unchanged": 0, "removed": 0}
+
+    @property
+    def count(self):
+        return self.inner.count
+
+    def write(self, data: Listing):
+        lid = listing_id(data)
+        if not lid:
+            return
+        now = time.time()
+        digest = field_hash(data)
+        self.seen.add(lid)
+
+        prev = self.state.listings.get(lid)
+        self.state.listings[lid] = StateEntry(
+            digest, data.price_text, data.url, data.address,
+            prev.first_seen if prev else now, now,
+        )
+
+        if prev is None:
+            self.stats["new"] += 1
+            data.change, data.old_price = "new", ""
+            self.inner.write(data)
+        elif prev.hash != digest:
+            self.stats["changed"] += 1
+            data.change, data.old_price = "changed", prev.price
+            self.inner.write(data)
+        else:
+            self.stats["unchanged"] += 1
+
+    def needs_detail(self, card: Listing) -> bool:
+        """
+        For list-only crawls: True if a result card is new or its price moved,
+        i.e. its detail page is worth opening.
+        """
+        prev = self.state.listings.get(listing_id(card))
+        return prev is None or prev.price != card.price_text
+
+    def touch(self, card: Listing):
+        """
+        Marks a listing as still present without comparing or forwarding it.
+        """
+        lid = listing_id(card)
+        prev = self.state.listings.get(lid)
+        if prev is None:
+            return
+        self.seen.add(lid)
+        self.state.listings[lid] = prev._replace(last_seen=time.time())
+        self.stats["unchanged"] += 1
+
+    def close(self):
+        if self.complete:
+            for lid in [k for k in self.state.listings if k not in self.seen]:
+                prev = self.state.listings.pop(lid)
+                self.stats["removed"] += 1
+                removed = Listing(change="removed", old_price=prev.price, url=prev.url)
+                removed.set_address(prev.address)
+                self.inner.write(removed)
+        self.state.save()
+        self.inner.close()
+        logger.info(
+            f"[delta] new={self.stats['new']} changed={self.stats['changed']} "
+            f"unchanged={self.stats['unchanged']} removed={self.stats['removed']}"
+        )
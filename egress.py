@@ -0,0 +1,362 @@
+import logging
+import select
+import socket
+import socketserver
+import threading
+import time
+from typing import List, Optional
+from urllib.parse import urlparse
+
+import urllib3
+
+try:
+    from urllib3.contrib.socks import SOCKSProxyManager
+except ImportError:  # socks proxies for the HTTP engine need PySocks
+    SOCKSProxyManager = None
+
+
+logger = logging.getLogger("YELLOSCRAPPER")
+
+DEFAULT_CHECK_URL = "https://www.realtor.ca/robots.txt"
+
+
+# =======================
+# EGRESS IDENTITY
+# =======================
+class Egress:
+    """
+    One network identity: a proxy URL (http://, https://, socks5://, optional
+    user:pass@), a local source address to bind outgoing connections to, or direct.
+    """
+
+    def __init__(self, spec: str):
+        self.spec = spec.strip()
+        self.proxy = None
+        self.source_address = None
+        if self.spec.startswith("source="):
+            self.source_address = self.spec.split("=", 1)[1]
+        elif self.spec and self.spec != "direct":
+            self.proxy = self.spec if "://" in self.spec else "http://" + self.spec
+        self.pool = None
+
+        parsed = urlparse(self.proxy) if self.proxy else None
+        self.auth = f"{parsed.username}:{parsed.password or ''}" if parsed and parsed.username else None
+        self.name = parsed.hostname + (f":{parsed.port}" if parsed.port else "") if parsed else (
+            f"source {self.source_address}" if self.source_address else "direct")
+
+        # Health
+        self.in_use = 0
+        self.failures = 0
+        self.cooldown_until = 0.0
+        self.last_check = 0.0
+        self.checking = False  # a health check is running; others pick another identity
+        self.stats = {"assigned": 0, "ok": 0, "failed": 0, "blocked": 0, "latency": 0.0, "timed": 0}
+
+    @property
+    def browser_ok(self) -> bool:
+        """
+        Chrome can use proxies, but can't bind to a source address, and --proxy-server
+        has no room for credentials: a user:pass@ proxy only serves the HTTP engine.
+        """
+        return self.source_address is None and self.auth is None
+
+    def apply_options(self, options):
+        """
+        Routes a Chrome instance through this identity (--proxy-server).
+        """
+        if not self.browser_ok:
+            raise ValueError(f"{self.name} can't drive a browser"
+                             + (" (Chrome can't take proxy credentials)" if self.auth else ""))
+        if not self.proxy:
+            return
+        parsed = urlparse(self.proxy)
+        options.add_argument(f"--proxy-server={parsed.scheme}://{parsed.hostname}:{parsed.port}")
+
+    def pool_manager(self, **kwargs):
+        """
+        urllib3 pool manager that sends requests through this identity.
+        """
+        if self.source_address:
+            return urllib3.PoolManager(source_address=(self.source_address, 0), **kwargs)
+        if not self.proxy:
+            return urllib3.PoolManager(**kwargs)
+        if self.proxy.startswith("socks"):
+            if SOCKSProxyManager is None:
+                raise RuntimeError("socks proxies need PySocks (pip install pysocks)")
+            return SOCKSProxyManager(self.proxy, **kwargs)
+        headers = urllib3.make_headers(proxy_basic_auth=self.auth) if self.auth else None
+        return urllib3.ProxyManager(self.proxy, proxy_headers=headers, **kwargs)
+
+    def __repr__(self):
+        return f"Egress({self.name})"
+
+
+# =======================
+# EGRESS POOL
+# =======================
+class EgressPool:
+    """
+    Hands out egress identities to drivers and HTTP engines. Browsers only get
+    identities with browser_ok (no source addresses, no proxy credentials).
+
+    acquire() picks the healthy identity with the fewest current users (then the
+    best success rate), health-checking it first if it hasn't been checked for
+    `check_every` seconds. The identity is marked as checking under the lock, so
+    concurrent callers never check the same one twice. report() feeds outcomes
+    back: a block (bot check) or `fail_threshold` failures in a row puts the
+    identity on cooldown, doubling from `cooldown` up to `max_cooldown` while it
+    keeps getting blocked.
+    """
+
+    def __init__(self, specs: List[str], check_url=DEFAULT_CHECK_URL, check_every=300,
+                 cooldown=600, max_cooldown=3600, fail_threshold=3):
+        self.entries = [Egress(s) for s in specs if s.strip()] or [Egress("direct")]
+        for e in self.entries:
+            e.pool = self
+        self.check_url = check_url
+        self.check_every = check_every
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.fail_threshold = fail_threshold
+        self._lock = threading.Lock()
+        self._strikes = {}
+
+    # ---------- Assignment ----------
+    def acquire(self, browser=True, wait=True) -> Optional[Egress]:
+        """
+        Next identity to use (None if none is usable and `wait` is False).
+        Blocks until a cooldown ends when every identity is cooling down.
+        """
+        while True:
+            with self._lock:
+                now = time.time()
+                ready = [e for e in self.entries
+                         if e.cooldown_until <= now and not e.checking and (e.browser_ok or not browser)]
+                ready.sort(key=lambda e: (e.in_use, -self._success_rate(e)))
+                egress = ready[0] if ready else None
+                if egress is not None:
+                    egress.in_use += 1
+                    if not (self.check_url and now - egress.last_check > self.check_every):
+                        egress.stats["assigned"] += 1
+                        return egress
+                    egress.checking = True
+                checking = any(e.checking for e in self.entries)
+
+            if egress is not None:
+                ok = self.check(egress)
+                with self._lock:
+                    egress.checking = False
+                    if ok:
+                        egress.stats["assigned"] += 1
+                        return egress
+                    egress.in_use -= 1
+                continue  # it is cooling down now: try the next one
+            if checking:
+                # Another caller is checking an identity that may turn out healthy
+                time.sleep(0.1)
+                continue
+            if not wait:
+                return None
+            with self._lock:
+                candidates = [e.cooldown_until for e in self.entries if e.browser_ok or not browser]
+            if not candidates:
+                raise RuntimeError("no egress identity can drive a browser")
+            pause = max(1.0, min(candidates) - time.time())
+            logger.info(f"[egress] every identity is cooling down, waiting {pause:.0f}s")
+            time.sleep(pause)
+
+    def release(self, egress: Optional[Egress]):
+        if egress is None:
+            return
+        with self._lock:
+            egress.in_use = max(0, egress.in_use - 1)
+
+    def _success_rate(self, egress) -> float:
+        s = egress.stats
+        total = s["ok"] + s["failed"] + s["blocked"]
+        return s["ok"] / total if total else 1.0
+
+    # ---------- Health ----------
+    def check(self, egress: Egress, timeout=10) -> bool:
+        """
+        Fetches `check_url` through the identity; a failure puts it on cooldown.
+        """
+        started = time.time()
+        try:
+            http = egress.pool_manager(retries=False, timeout=timeout)
+            resp = http.request("GET", self.check_url, preload_content=True)
+            http.clear()
+            ok = resp.status < 400
+            reason = f"HTTP {resp.status}"
+        except Exception as e:
+            ok, reason = False, str(e).splitlines()[0] if str(e) else type(e).__name__
+        egress.last_check = time.time()
+        if ok:
+            logger.debug(f"[egress] {egress.name} healthy ({time.time() - started:.1f}s)")
+        else:
+            logger.warning(f"[egress] {egress.name} failed health check: {reason}")
+            self._cool(egress, blocked=False)
+        return ok
+
+    def report(self, egress: Optional[Egress], ok: bool, latency: Optional[float] = None, blocked=False):
+        """
+        Records one outcome (a job's first page, a download...) for `egress`.
+        """
+        if egress is None:
+            return
+        with self._lock:
+            if latency is not None:
+                egress.stats["latency"] += latency
+                egress.stats["timed"] += 1
+            if blocked:
+                egress.stats["blocked"] += 1
+            elif ok:
+                egress.stats["ok"] += 1
+                egress.failures = 0
+                self._strikes[egress.name] = 0
+                return
+            else:
+                egress.stats["failed"] += 1
+                egress.failures += 1
+                if egress.failures < self.fail_threshold:
+                    return
+        self._cool(egress, blocked)
+
+    def _cool(self, egress, blocked):
+        with self._lock:
+            strikes = self._strikes.get(egress.name, 0)
+            delay = min(self.max_cooldown, self.cooldown * 2 ** strikes)
+            self._strikes[egress.name] = strikes + 1
+            egress.failures = 0
+            egress.cooldown_until = time.time() + delay
+        logger.warning(f"[egress] {egress.name} {'blocked' if blocked else 'failing'}, cooling down {delay:.0f}s")
+
+    def report_text(self) -> str:
+        lines = ["[egress] identity stats:"]
+        for e in self.entries:
+            s = e.stats
+            avg = f"{s['latency'] / s['timed']:.1f}s" if s["timed"] else "-"
+            cooling = f" cooling {e.cooldown_until - time.time():.0f}s" if e.cooldown_until > time.time() else ""
+            lines.append(f"  {e.name}: assigned={s['assigned']} ok={s['ok']} failed={s['failed']} "
+                         f"blocked={s['blocked']} latency={avg}{cooling}")
+        return "\n".join(lines)
+
+
+def load_egress(text: str) -> EgressPool:
+    """
+    A comma-separated list of identities, or a file with one per line ('#' comments).
+    """
+    try:
+        with open(text, encoding="utf-8") as f:
+            specs = [line.split("#", 1)[0].strip() for line in f]
+    except OSError:
+        specs = text.split(",")
+    return EgressPool([s for s in specs if s.strip()])
+
+
+# =======================
+# LOCAL FORWARDING PROXY
+# =======================
+class _ProxyHandler(socketserver.StreamRequestHandler):
+    """
+    Minimal forwarding proxy: CONNECT tunnels and absolute-URI HTTP requests,
+    optionally bound to a source address. Enough to stand in for a real proxy.
+    """
+
+    rbufsize = 0  # unbuffered, so nothing past the headers is held back from the tunnel
+
+    def handle(self):
+        line = self.rfile.readline(65536).decode("latin-1")
+        try:
+            method, target, _ = line.split(" ", 2)
+        except ValueError:
+            return
+        headers = []
+        while True:
+            h = self.rfile.readline(65536)
+            if h in (b"\r\n", b"\n", b""):
+                break
+            headers.append(h)
+        self.server.requests += 1
+
+        if method.upper() == "CONNECT":
+            host, _, port = target.rpartition(":")
+            upstream = self._connect(host, int(port))
+            if upstream is None:
+                return
+            self.wfile.write(b"HTTP/1.1 200 Connection established\r\n\r\n")
+            self.wfile.flush()
+        else:
+            parsed = urlparse(target)
+            upstream = self._connect(parsed.hostname, parsed.port or 80)
+            if upstream is None:
+                return
+            path = parsed.path or "/"
+            if parsed.query:
+                path += "?" + parsed.query
+            kept = [h for h in headers if not h.lower().startswith((b"proxy-", b"connection"))]
+            upstream.sendall(f"{method} {path} HTTP/1.1\r\n".encode("latin-1") + b"".join(kept) +
+                             b"Connection: close\r\n\r\n")
+        self._pipe(upstream)
+
+    def _connect(self, host, port):
+        try:
+            return socket.create_connection((host, port), timeout=20,
+                                            source_address=self.server.source_address)
+        except OSError as e:
+            self.wfile.write(f"HTTP/1.1 502 Bad Gateway\r\n\r\n{e}".encode("latin-1"))
+            return None
+
+    def _pipe(self, upstream):
+        client = self.connection
+        socks = [client, upstream]
+        try:
+            while True:
+                readable, _, _ = select.select(socks, [], [], 60)
+                if not readable:
+                    break
+                for s in readable:
+                    data = s.recv(65536)
+                    if not data:
+                        return
+                    (upstream if s is client else client).sendall(data)
+        except OSError:
+            pass
+        finally:
+            upstream.close()
+
+
+class ForwardProxy(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    """
+    Local stand-in for an egress proxy: ForwardProxy(("127.0.0.1", 8899)).start()
+    and use "http://127.0.0.1:8899" as an identity.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=("127.0.0.1", 8899), source_address=None):
+        super().__init__(address, _ProxyHandler)
+        self.source_address = (source_address, 0) if source_address else None
+        self.requests = 0
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="forward-proxy", daemon=True).start()
+        return self
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    parser = argparse.ArgumentParser(description="Local forwarding proxy for testing egress pools")
+    parser.add_argument("--listen", default="127.0.0.1:8899", help="host:port to listen on")
+    parser.add_argument("--source", help="bind outgoing connections to this local address")
+    args = parser.parse_args()
+    host, _, port = args.listen.rpartition(":")
+    proxy = ForwardProxy((host or "127.0.0.1", int(port)), args.source)
+    logger.info(f"[egress] forwarding proxy on {args.listen}")
+    try:
+        proxy.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,252 @@
+import csv
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from delta import listing_id
+from listing import Listing
+
+
+logger = logging.getLogger("YELLOSCRAPPER")
+
+_DIGITS_RE = re.compile(r"\D+")
+
+
+def _norm(text) -> str:
+    return " ".join(str(text or "").lower().split())
+
+
+def _present(value) -> bool:
+    return bool(value) and value != "-"
+
+
+def agent_key(name: str, phone: str = "") -> str:
+    """
+    Stable agent key from the normalized name and first phone's digits.
+    """
+    raw = f"{_norm(name)}|{_DIGITS_RE.sub('', phone or '')}"
+    return "agent:" + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+
+def brokerage_key(name: str, tel: str = "", address: str = "") -> str:
+    """
+    Brokerage key from the normalized name plus phone (or address when there is no phone),
+    so branches of one franchise stay separate.
+    """
+    raw = f"{_norm(name)}|{_DIGITS_RE.sub('', tel or '') or _norm(address)}"
+    return "brokerage:" + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+
+# =======================
+# ENTITY STORE
+# =======================
+class EntityStore:
+    """
+    Deduplicated salespeople and brokerages, persisted as JSON:
+
+        {"agents":     {key: {name, phones, first_seen, last_seen, listings}},
+         "brokerages": {key: {name, address, tel, first_seen, last_seen, listings}},
+         "listings":   {listing_id: {"agents": [key, ...], "brokerages": [key, ...]}}}
+
+    add() records a listing's people and offices once and returns the keys the
+    listing refers to them by.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.agents = {}
+        self.brokerages = {}
+        self.listings = {}
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+                self.agents = data.get("agents", {})
+                self.brokerages = data.get("brokerages", {})
+                self.listings = data.get("listings", {})
+            except Exception as e:
+                logger.warning(f"Could not read entity store {path}, starting empty: {e}")
+
+    def _touch(self, table, key, fields, now, known):
+        entry = table.get(key)
+        if entry is None:
+            table[key] = entry = {**fields, "first_seen": now, "last_seen": now, "listings": 0}
+        else:
+            entry.update({k: v for k, v in fields.items() if v})
+            entry["last_seen"] = now
+        if key not in known:
+            entry["listings"] += 1
+
+    def add(self, listing: Listing):
+        """
+        Upserts the listing's salespeople and brokerages. Returns (agent keys, brokerage keys),
+        one per card position (None where the card is missing).
+        """
+        now = time.time()
+        lid = listing_id(listing)
+        agents, brokerages = [], []
+        with self._lock:
+            prev = self.listings.get(lid) or {}
+            known = set(prev.get("agents", ())) | set(prev.get("brokerages", ()))
+            for idx in (1, 2):
+                name = getattr(listing, f"salesperson{idx}")
+                phones = [p for p in (getattr(listing, f"salesperson{idx}_phone1"),
+                                      getattr(listing, f"salesperson{idx}_phone2")) if _present(p)]
+                if _present(name):
+                    key = agent_key(name, phones[0] if phones else "")
+                    self._touch(self.agents, key, {"name": name, "phones": phones}, now, known)
+                    agents.append(key)
+                else:
+                    agents.append(None)
+
+                name = getattr(listing, f"brokerage{idx}")
+                address = getattr(listing, f"brokerage{idx}_address")
+                tel = getattr(listing, f"brokerage{idx}_tel")
+                if _present(name):
+                    key = brokerage_key(name, tel if _present(tel) else "", address if _present(address) else "")
+                    self._touch(self.brokerages, key, {
+                        "name": name,
+                        "address": address if _present(address) else "",
+                        "tel": tel if _present(tel) else "",
+                    }, now, known)
+                    brokerages.append(key)
+                else:
+                    brokerages.append(None)
+
+            self.listings[lid] = {
+                "agents": [k for k in agents if k], "brokerages": [k for k in brokerages if k],
+            }
+        return agents, brokerages
+
+    def save(self):
+        # Every job's EntitySink saves on close: writing and renaming the shared
+        # tmp file under one lock keeps concurrent saves from interleaving
+        with self._lock:
+            data = {"agents": self.agents, "brokerages": self.brokerages, "listings": self.listings}
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+
+    def export_csv(self, prefix):
+        """
+        Writes <prefix>agents.csv, <prefix>brokerages.csv and <prefix>listing_entities.csv.
+        """
+        with self._lock:
+            with open(f"{prefix}agents.csv", "w", newline="", encoding="utf-8") as f:
+                w = csv.writer(f)
+                w.writerow(["key", "name", "phone1", "phone2", "listings", "first_seen", "last_seen"])
+                for key, a in self.agents.items():
+                    phones = a["phones"] + ["", ""]
+                    w.writerow([key, a["name"], phones[0], phones[1], a["listings"], a["first_seen"], a["last_seen"]])
+            with open(f"{prefix}brokerages.csv", "w", newline="", encoding="utf-8") as f:
+                w = csv.writer(f)
+                w.writerow(["key", "name", "address", "tel", "listings", "first_seen", "last_seen"])
+                for key, b in self.brokerages.items():
+                    w.writerow([key, b["name"], b["address"], b["tel"], b["listings"], b["first_seen"], b["last_seen"]])
+            with open(f"{prefix}listing_entities.csv", "w", newline="", encoding="utf-8") as f:
+                w = csv.writer(f)
+                w.writerow(["listing_id", "role", "position", "key"])
+                for lid, refs in self.listings.items():
+                    for pos, key in enumerate(refs["agents"], 1):
+                        w.writerow([lid, "salesperson", pos, key])
+                    for pos, key in enumerate(refs["brokerages"], 1):
+                        w.writerow([lid, "brokerage", pos, key])
+
+
+class EntitySink:
+    """
+    Sink wrapper: stores each listing's salespeople and brokerages in an
+    EntityStore and forwards the listing with references instead of copies.
+    The name columns hold the entity key and the phone / address columns are
+    left empty; the details live once in the store.
+    """
+
+    def __init__(self, inner, store: EntityStore):
+        self.inner = inner
+        self.store = store
+
+    @property
+    def count(self):
+        return self.inner.count
+
+    def write(self, data: Listing):
+        agents, brokerages = self.store.add(data)
+        slim = Listing.from_dict(data.to_dict())
+        for idx, (agent, brokerage) in enumerate(zip(agents, brokerages), 1):
+            setattr(slim, f"salesperson{idx}", agent or "")
+            setattr(slim, f"salesperson{idx}_phone1", "")
+            setattr(slim, f"salesperson{idx}_phone2", "")
+            setattr(slim, f"brokerage{idx}", brokerage or "")
+            setattr(slim, f"brokerage{idx}_address", "")
+            setattr(slim, f"brokerage{idx}_tel", "")
+        self.inner.write(slim)
+
+    def close(self):
+        self.inner.close()
+        self.store.save()
+
+
+# =======================
+# EXTRACTION CACHE
+# =======================
+class CardCache:
+    """
+    Parsed realtor / office cards keyed by a hash of the card's link and text,
+    so a card seen in the last `ttl` seconds is filled in without its per-field
+    WebDriver queries. Identical card content always parses the same, so a hit
+    is never stale; the TTL and `max_entries` (LRU) only bound memory.
+    """
+
+    def __init__(self, max_entries=20000, ttl=6 * 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def key(kind: str, fingerprint: str) -> Optional[str]:
+        if not fingerprint or not fingerprint.strip("|"):
+            return None
+        return kind + ":" + hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        if key is None:
+            return None
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is None or time.time() - hit[0] > self.ttl:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return hit[1]
+
+    def put(self, key, value):
+        if key is None:
+            return
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export an entity store as CSV tables")
+    parser.add_argument("store", help="entity store JSON (--entities)")
+    parser.add_argument("--prefix", default="", help="prefix for agents.csv / brokerages.csv / listing_entities.csv")
+    args = parser.parse_args()
+    store = EntityStore(args.store)
+    store.export_csv(args.prefix)
+    print(f"{len(store.agents)} agents, {len(store.brokerages)} brokerages, {len(store.listings)} listings")
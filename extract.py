@@ -0,0 +1,206 @@
+import time
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from listing import Listing
+
+
+# One round trip for every card's link + text; CardCache hashes it into the card's key.
+CARD_FINGERPRINTS_JS = """
+return arguments[0].map(function (c) {
+  var a = c.querySelector("a[href]");
+  return (a ? a.getAttribute("href") : "") + "|" + (c.textContent || "").replace(/\\s+/g, " ").trim();
+});
+"""
+
+
+READY_STATE_JS = "return document.readyState;"
+
+REALTOR_CARDS = (By.XPATH, "//*[starts-with(@id,'realtorCard')]//div[contains(@class,'realtorCardCon card ')]")
+OFFICE_CARDS = (By.XPATH, "//*[starts-with(@id,'officeCard')]")
+
+
+class ListingIncomplete(Exception):
+    """
+    The listing's time budget ran out; `listing` holds the fields read so far.
+    """
+
+    def __init__(self, listing, message="listing time budget ran out"):
+        super().__init__(message)
+        self.listing = listing
+
+
+class Deadline:
+    """
+    One time budget shared by every wait on a listing page.
+    """
+
+    def __init__(self, seconds):
+        self.end = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.end - time.monotonic())
+
+    def wait(self, driver):
+        return WebDriverWait(driver, self.remaining(), poll_frequency=0.25)
+
+
+def _optional(driver, locator, deadline, info):
+    """
+    Elements a listing may not have (hero image, cards): polled until they show up or
+    the document has finished loading, so a listing without them costs no waiting.
+    Raises ListingIncomplete if the budget runs out first.
+    """
+    while True:
+        try:
+            found = driver.find_elements(*locator)
+            if found or driver.execute_script(READY_STATE_JS) == "complete":
+                return found
+        except Exception:
+            return []
+        if not deadline.remaining():
+            raise ListingIncomplete(info)
+        time.sleep(0.25)
+
+
+def _card_keys(driver, cards, kind, cache):
+    if cache is None or not cards:
+        return [None] * len(cards)
+    try:
+        prints = driver.execute_script(CARD_FINGERPRINTS_JS, cards)
+    except Exception:
+        return [None] * len(cards)
+    return [cache.key(kind, p) for p in prints]
+
+
+def _safe_text(el, default="-"):
+    try:
+        t = el.text.strip()
+        return t if t else default
+    except Exception:
+        return default
+
+
+def get_listing_info(driver, timeout=10, cache=None, deadline=None) -> Listing:
+    """
+    Extracts the listing open in the current tab into a Listing.
+    Missing fields keep their defaults ("" for page fields, "-" for agent/office fields).
+    `timeout` is one budget for the whole listing, shared by all of its waits; when it
+    runs out, ListingIncomplete is raised carrying the fields read so far. Pass a
+    `deadline` (a Deadline) instead when the clock started earlier, e.g. before the click.
+    With `cache` (an entities.CardCache), cards already parsed on an earlier listing
+    are filled in from the cache instead of being queried field by field.
+    """
+    deadline = deadline or Deadline(timeout)
+    info = Listing()
+
+    # If you want page URL (current tab)
+    try:
+        info.url = driver.current_url
+    except Exception:
+        info.url = ""
+
+    # ---- Basic single-element fields ----
+    # Every listing has a price or an address: wait for either, then read both without waiting
+    try:
+        deadline.wait(driver).until(EC.presence_of_element_located(
+            (By.XPATH, "//*[@id='listingPriceValue' or @id='listingAddress']")))
+    except TimeoutException:
+        raise ListingIncomplete(info)
+    except Exception:
+        pass
+
+    try:
+        price = driver.find_elements(By.XPATH, "//*[@id='listingPriceValue']")
+        info.set_price(_safe_text(price[0], default="") if price else "")
+    except Exception:
+        info.set_price("")
+
+    try:
+        listingAddress = driver.find_elements(By.XPATH, "//*[@id='listingAddress']")
+        info.set_address(_safe_text(listingAddress[0], default="") if listingAddress else "")
+    except Exception:
+        info.set_address("")
+
+    img = _optional(driver, (By.XPATH, "//*[@id='heroImage']"), deadline, info)
+    try:
+        info.image = (img[0].get_attribute("src") or "") if img else ""
+    except Exception:
+        info.image = ""
+
+    # ---- Realtor cards (salespersons) ----
+    realtor_cards = _optional(driver, REALTOR_CARDS, deadline, info)
+
+    # Extract up to 2 salespersons
+    realtor_cards = realtor_cards[:2]
+    keys = _card_keys(driver, realtor_cards, "realtor", cache)
+    for idx, (card, key) in enumerate(zip(realtor_cards, keys), 1):
+        hit = cache.get(key) if key else None
+        if hit is not None:
+            name, phones = hit
+        else:
+            # Name
+            try:
+                name_el = card.find_element(By.XPATH, ".//*[@class='realtorCardName']")
+                name = _safe_text(name_el, default="-")
+            except Exception:
+                name = "-"
+            # Telephones (may be multiple)
+            try:
+                phone_els = card.find_elements(By.XPATH, ".//*[@data-type='Telephone']")
+                phones = [p.text.strip() for p in phone_els if p.text.strip()]
+            except Exception:
+                phones = []
+            if key:
+                cache.put(key, (name, phones))
+
+        setattr(info, f"salesperson{idx}", name)
+        setattr(info, f"salesperson{idx}_phone1", phones[0] if len(phones) >= 1 else "-")
+        setattr(info, f"salesperson{idx}_phone2", phones[1] if len(phones) >= 2 else "-")
+
+    # ---- Office / brokerage cards ----
+    office_cards = _optional(driver, OFFICE_CARDS, deadline, info)
+
+    office_cards = office_cards[:2]
+    keys = _card_keys(driver, office_cards, "office", cache)
+    for idx, (card, key) in enumerate(zip(office_cards, keys), 1):
+        hit = cache.get(key) if key else None
+        if hit is not None:
+            brokerage_name, brokerage_address, phones = hit
+        else:
+            # Office info text (contains brokerage name + 'Brokerage' + address lines)
+            try:
+                office_info_el = card.find_element(By.XPATH, ".//*[@class='officeCardTopLeft']")
+                office_info_text = _safe_text(office_info_el, default="-")
+            except Exception:
+                office_info_text = _safe_text(card, default="-")
+
+            # Split into lines
+            lines = office_info_text.splitlines() if office_info_text and office_info_text != "-" else []
+
+            # Brokerage name = first line
+            brokerage_name = lines[0].strip() if len(lines) > 0 else "-"
+
+            # Address = everything after the first 2 lines (skip brokerage name + "Brokerage")
+            brokerage_address = " ".join(line.strip() for line in lines[2:]) if len(lines) > 2 else "-"
+
+            # Office phone(s)
+            phones = []
+            try:
+                tel_els = card.find_elements(By.XPATH, ".//*[@class='officeCardContactNumber']")
+                if not tel_els:
+                    tel_els = card.find_elements(By.XPATH, ".//*[@data-type='Telephone']")
+                phones = [t.text.strip() for t in tel_els if t.text.strip()]
+            except Exception:
+                phones = []
+            if key:
+                cache.put(key, (brokerage_name, brokerage_address, phones))
+
+        setattr(info, f"brokerage{idx}", brokerage_name)
+        setattr(info, f"brokerage{idx}_address", brokerage_address)
+        setattr(info, f"brokerage{idx}_tel", phones[0] if len(phones) >= 1 else "-")
+
+    return info
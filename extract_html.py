@@ -0,0 +1,181 @@
+import re
+import time
+
+from lxml import etree, html as lxml_html
+
+from extract import OFFICE_CARDS, READY_STATE_JS, REALTOR_CARDS, Deadline, ListingIncomplete
+from listing import Listing
+
+
+# =======================
+# PRECOMPILED XPATHS
+# =======================
+# Same selectors as extract.get_listing_info, compiled once per process.
+X_HERO_IMAGE = etree.XPath("//*[@id='heroImage']")
+X_PRICE = etree.XPath("//*[@id='listingPriceValue']")
+X_ADDRESS = etree.XPath("//*[@id='listingAddress']")
+X_REALTOR_CARDS = etree.XPath("//*[starts-with(@id,'realtorCard')]//div[contains(@class,'realtorCardCon card ')]")
+X_REALTOR_NAME = etree.XPath(".//*[@class='realtorCardName']")
+X_TELEPHONE = etree.XPath(".//*[@data-type='Telephone']")
+X_OFFICE_CARDS = etree.XPath("//*[starts-with(@id,'officeCard')]")
+X_OFFICE_INFO = etree.XPath(".//*[@class='officeCardTopLeft']")
+X_OFFICE_NUMBER = etree.XPath(".//*[@class='officeCardContactNumber']")
+
+# Elements whose boundaries are line breaks in rendered text
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "dd", "div", "dl", "dt", "fieldset",
+    "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6",
+    "header", "hr", "li", "main", "nav", "ol", "p", "pre", "section", "table",
+    "tbody", "td", "tfoot", "th", "thead", "tr", "ul",
+}
+SKIP_TAGS = {"script", "style", "noscript", "template", "head"}
+# Source whitespace, newlines included, renders as one space
+WHITESPACE = re.compile(r"\s+")
+
+
+def _hidden(el) -> bool:
+    if el.get("hidden") is not None:
+        return True
+    style = (el.get("style") or "").replace(" ", "").lower()
+    return "display:none" in style or "visibility:hidden" in style
+
+
+def _inner_text(el) -> str:
+    """
+    Approximates WebElement.text: visible text, block elements and <br> on their
+    own lines, source whitespace (newlines too) collapsed, blank lines dropped.
+    """
+    chunks = []
+
+    def walk(node):
+        tag = node.tag.lower() if isinstance(node.tag, str) else ""
+        if not tag or tag in SKIP_TAGS or _hidden(node):
+            return
+        if tag == "br":
+            chunks.append("\n")
+            return
+        block = tag in BLOCK_TAGS
+        if block:
+            chunks.append("\n")
+        if node.text:
+            chunks.append(WHITESPACE.sub(" ", node.text))
+        for child in node:
+            walk(child)
+            if child.tail:
+                chunks.append(WHITESPACE.sub(" ", child.tail))
+        if block:
+            chunks.append("\n")
+
+    walk(el)
+    lines = (" ".join(line.split()) for line in "".join(chunks).split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def _text(el, default="-"):
+    t = _inner_text(el) if el is not None else ""
+    return t if t else default
+
+
+def _first(xpath, node):
+    found = xpath(node)
+    return found[0] if found else None
+
+
+# =======================
+# EXTRACTION
+# =======================
+def parse_listing_html(source, url: str = "") -> Listing:
+    """
+    Extracts a Listing from a detail page's HTML (driver.page_source, an HTTP
+    response body, or a stored snapshot). Mirrors get_listing_info field by field.
+    """
+    root = lxml_html.fromstring(source) if isinstance(source, (str, bytes)) else source
+    info = Listing(url=url or "")
+
+    img = _first(X_HERO_IMAGE, root)
+    info.image = (img.get("src") or "") if img is not None else ""
+    info.set_price(_text(_first(X_PRICE, root), default=""))
+    info.set_address(_text(_first(X_ADDRESS, root), default=""))
+
+    # ---- Realtor cards (salespersons) ----
+    for idx, card in enumerate(X_REALTOR_CARDS(root)[:2], 1):
+        name = _text(_first(X_REALTOR_NAME, card), default="-")
+        phones = [t for t in (_inner_text(p) for p in X_TELEPHONE(card)) if t]
+
+        setattr(info, f"salesperson{idx}", name)
+        setattr(info, f"salesperson{idx}_phone1", phones[0] if len(phones) >= 1 else "-")
+        setattr(info, f"salesperson{idx}_phone2", phones[1] if len(phones) >= 2 else "-")
+
+    # ---- Office / brokerage cards ----
+    for idx, card in enumerate(X_OFFICE_CARDS(root)[:2], 1):
+        office_info_el = _first(X_OFFICE_INFO, card)
+        office_info_text = _text(office_info_el if office_info_el is not None else card, default="-")
+
+        lines = office_info_text.splitlines() if office_info_text and office_info_text != "-" else []
+        brokerage_name = lines[0].strip() if len(lines) > 0 else "-"
+        # Skip brokerage name + "Brokerage" line
+        brokerage_address = " ".join(line.strip() for line in lines[2:]) if len(lines) > 2 else "-"
+
+        tel_els = X_OFFICE_NUMBER(card) or X_TELEPHONE(card)
+        phones = [t for t in (_inner_text(t) for t in tel_els) if t]
+
+        setattr(info, f"brokerage{idx}", brokerage_name)
+        setattr(info, f"brokerage{idx}_address", brokerage_address)
+        setattr(info, f"brokerage{idx}_tel", phones[0] if len(phones) >= 1 else "-")
+
+    return info
+
+
+def _rendered(driver) -> bool:
+    """
+    True once the price or address is in and the cards are too, or the document
+    has finished loading (a listing may have no cards at all), the same rule
+    extract.get_listing_info applies field by field.
+    """
+    if not driver.find_elements("xpath", "//*[@id='listingPriceValue' or @id='listingAddress']"):
+        return False
+    if driver.find_elements(*REALTOR_CARDS) and driver.find_elements(*OFFICE_CARDS):
+        return True
+    return driver.execute_script(READY_STATE_JS) == "complete"
+
+
+def get_listing_info_html(driver, timeout=10, deadline=None) -> Listing:
+    """
+    Drop-in for get_listing_info: waits for the page to render (see _rendered),
+    then transfers page_source a single time and parses it locally.
+    If it hasn't rendered within `timeout` (or `deadline`), raises ListingIncomplete
+    with whatever parsed.
+    """
+    deadline = deadline or Deadline(timeout)
+    rendered = False
+    while True:
+        try:
+            if _rendered(driver):
+                rendered = True
+                break
+        except Exception:
+            pass
+        if not deadline.remaining():
+            break
+        time.sleep(0.25)
+
+    try:
+        url = driver.current_url
+    except Exception:
+        url = ""
+    info = parse_listing_html(driver.page_source, url)
+    if not rendered:
+        raise ListingIncomplete(info)
+    return info
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Extract listings from saved detail-page HTML")
+    parser.add_argument("files", nargs="+", help="HTML snapshots")
+    args = parser.parse_args()
+    for path in args.files:
+        with open(path, "rb") as f:
+            print(json.dumps(parse_listing_html(f.read(), url=path).to_dict(), ensure_ascii=False))
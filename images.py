@@ -0,0 +1,237 @@
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Tuple
+from urllib.parse import urlparse
+
+import urllib3
+
+try:
+    from PIL import Image
+except ImportError:  # thumbnails are optional
+    Image = None
+
+
+logger = logging.getLogger("YELLOSCRAPPER")
+
+INDEX_FILE = "index.json"
+
+
+# =======================
+# IMAGE DOWNLOADER
+# =======================
+class ImageDownloader:
+    """
+    Downloads listing images in the background over one pooled HTTP client.
+
+    Files are stored content-addressed under `root` as <sha256[:2]>/<sha256><ext>,
+    so an image shared by several listings is only stored once. `index.json`
+    maps each source URL to its stored file; URLs already in the index (with the
+    file still on disk) are not downloaded again. With `thumbnail=(w, h)` and
+    Pillow installed, a JPEG thumbnail is also written under root/thumbs/.
+    With `egress` (an egress.Egress), downloads go through that proxy / source address.
+    """
+
+    def __init__(self, root="images", concurrency=8, thumbnail: Optional[Tuple[int, int]] = None,
+                 timeout=20, retries=2, egress=None):
+        self.root = root
+        self.thumbnail = thumbnail
+        self.timeout = timeout
+        os.makedirs(self.root, exist_ok=True)
+
+        if thumbnail and Image is None:
+            logger.warning("Pillow is not installed; image thumbnails are disabled.")
+            self.thumbnail = None
+
+        self.egress = egress
+        self.http = (egress.pool_manager if egress is not None else urllib3.PoolManager)(
+            num_pools=4,
+            maxsize=concurrency,
+            block=True,
+            retries=urllib3.Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504)),
+        )
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="img")
+
+        self._lock = threading.Lock()
+        self._pending = {}
+        self.index = self._load_index()
+        self.stats = {"downloaded": 0, "deduped": 0, "skipped": 0, "failed": 0, "thumb_failed": 0}
+
+    # ---------- Index ----------
+    def _index_path(self):
+        return os.path.join(self.root, INDEX_FILE)
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self._index_path(), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Could not read image index, starting empty: {e}")
+            return {}
+
+    def save_index(self):
+        with self._lock:
+            data = dict(self.index)
+        tmp = self._index_path() + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=0)
+        os.replace(tmp, self._index_path())
+
+    def path_for(self, url: str) -> Optional[str]:
+        """
+        Absolute path of the stored file for `url`, or None if not downloaded (yet).
+        """
+        with self._lock:
+            rel = self.index.get(url)
+        return os.path.join(self.root, rel) if rel else None
+
+    # ---------- Download ----------
+    def submit(self, url: str) -> Future:
+        """
+        Queues `url` for download and returns immediately. The future resolves
+        to the stored file path (or None if the download failed).
+        """
+        if not url or not url.startswith(("http://", "https://")):
+            fut = Future()
+            fut.set_result(None)
+            return fut
+
+        with self._lock:
+            rel = self.index.get(url)
+            if rel and os.path.exists(os.path.join(self.root, rel)):
+                self.stats["skipped"] += 1
+                fut = Future()
+                fut.set_result(os.path.join(self.root, rel))
+                return fut
+            if url in self._pending:
+                return self._pending[url]
+            fut = self.executor.submit(self._download, url)
+            self._pending[url] = fut
+        return fut
+
+    def _extension(self, url, content_type):
+        ext = os.path.splitext(urlparse(url).path)[1].lower()
+        if ext in (".jpg", ".jpeg", ".png", ".webp", ".gif"):
+            return ext
+        if content_type:
+            guessed = mimetypes.guess_extension(content_type.split(";")[0].strip())
+            if guessed:
+                return ".jpg" if guessed == ".jpe" else guessed
+        return ".jpg"
+
+    def _report(self, ok, latency=None, blocked=False):
+        # Outcomes that say something about the identity, not the image, feed the egress pool
+        if self.egress is not None:
+            self.egress.pool.report(self.egress, ok=ok, latency=latency, blocked=blocked)
+
+    def _download(self, url):
+        try:
+            started = time.time()
+            try:
+                resp = self.http.request("GET", url, timeout=self.timeout, preload_content=True)
+            except urllib3.exceptions.HTTPError:
+                self._report(ok=False)
+                raise
+            if resp.status == 200:
+                self._report(ok=True, latency=time.time() - started)
+            elif resp.status in (403, 429):
+                self._report(ok=False, blocked=True)
+            if resp.status != 200:
+                raise IOError(f"HTTP {resp.status}")
+            data = resp.data
+
+            digest = hashlib.sha256(data).hexdigest()
+            rel = os.path.join(digest[:2], digest + self._extension(url, resp.headers.get("Content-Type")))
+            path = os.path.join(self.root, rel)
+
+            if os.path.exists(path):
+                deduped = True
+            else:
+                deduped = False
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+
+            with self._lock:
+                self.index[url] = rel
+                self.stats["deduped" if deduped else "downloaded"] += 1
+        except Exception as e:
+            logger.warning(f"[image] {url}: {e}")
+            with self._lock:
+                self.stats["failed"] += 1
+            return None
+        finally:
+            with self._lock:
+                self._pending.pop(url, None)
+
+        if self.thumbnail:
+            try:
+                self._make_thumbnail(path, digest)
+            except Exception as e:
+                # The image is stored and indexed either way; only its thumbnail is missing
+                logger.warning(f"[image] thumbnail for {url}: {e}")
+                with self._lock:
+                    self.stats["thumb_failed"] += 1
+        return path
+
+    def _make_thumbnail(self, path, digest):
+        thumb = os.path.join(self.root, "thumbs", digest[:2], digest + ".jpg")
+        if os.path.exists(thumb):
+            return
+        os.makedirs(os.path.dirname(thumb), exist_ok=True)
+        tmp = f"{thumb}.{threading.get_ident()}.tmp"
+        with Image.open(path) as im:
+            im.thumbnail(self.thumbnail)
+            im.convert("RGB").save(tmp, "JPEG", quality=85)
+        os.replace(tmp, thumb)
+
+    def close(self, wait=True):
+        self.executor.shutdown(wait=wait)
+        self.save_index()
+        self.http.clear()
+        if self.egress is not None:
+            self.egress.pool.release(self.egress)
+        logger.info(
+            f"[image] downloaded={self.stats['downloaded']} deduped={self.stats['deduped']} "
+            f"skipped={self.stats['skipped']} failed={self.stats['failed']} "
+            f"thumb_failed={self.stats['thumb_failed']}"
+        )
+
+
+class ImageSink:
+    """
+    Sink wrapper: queues each listing's image for download, then forwards the
+    listing to `inner` without waiting for the image.
+    """
+
+    def __init__(self, inner, downloader: ImageDownloader):
+        self.inner = inner
+        self.downloader = downloader
+
+    @property
+    def count(self):
+        return self.inner.count
+
+    def write(self, data):
+        self.downloader.submit(data.image)
+        self.inner.write(data)
+
+    def close(self):
+        self.inner.close()
+
+
+def parse_size(text: str) -> Tuple[int, int]:
+    """
+    "320x240" -> (320, 240)
+    """
+    w, h = text.lower().split("x", 1)
+    return int(w), int(h)
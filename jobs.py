@@ -0,0 +1,314 @@
+import itertools
+import json
+import logging
+import queue
+import threading
+import time
+import traceback
+from typing import Callable, List, Optional
+
+
+logger = logging.getLogger("YELLOSCRAPPER")
+
+DEFAULT_OUTPUT = "scrapper.xlsx"
+
+
+# =======================
+# JOBS
+# =======================
+class Job:
+    """
+    One map search to crawl: URL, priority (higher runs first), output target and page limit.
+    With `state` (a JSON path), only new / changed / removed listings are written to the output.
+    `list_only` scrapes result cards without opening detail pages: "none" never opens
+    them, "changed" opens only new listings or ones whose price moved (needs `state`).
+    `paging="url"` opens result pages through the URL hash, starting at `start_page`;
+    `shards=N` splits the search into N jobs that take every Nth page (see expand_shards).
+    """
+
+    def __init__(self, url: str, name: Optional[str] = None, priority: int = 0,
+                 output: str = DEFAULT_OUTPUT, max_pages: Optional[int] = None,
+                 state: Optional[str] = None, list_only: Optional[str] = None,
+                 paging: str = "click", start_page: int = 1, shards: int = 1):
+        self.url = url
+        self.name = name or url
+        self.priority = int(priority)
+        self.output = output or DEFAULT_OUTPUT
+        self.max_pages = int(max_pages) if max_pages else None
+        self.state = state or None
+        self.list_only = list_only or None
+        if self.list_only not in (None, "none", "changed"):
+            raise ValueError(f"list_only must be 'none' or 'changed', not {list_only!r}")
+        self.start_page = max(1, int(start_page or 1))
+        self.shards = max(1, int(shards or 1))
+        self.stride = 1
+        self.paging = paging or "click"
+        if self.start_page > 1 or self.shards > 1:
+            self.paging = "url"
+        if self.paging not in ("click", "url"):
+            raise ValueError(f"paging must be 'click' or 'url', not {paging!r}")
+        if self.shards > 1 and self.state:
+            raise ValueError("shards can't be combined with state (each shard sees only part of the region)")
+        if self.list_only == "changed" and not self.state:
+            raise ValueError("list_only='changed' needs state (it opens only new or changed listings)")
+
+        # Runtime state, filled in by the scheduler / run_job
+        self.status = "pending"
+        self.pages = 0
+        self.items = 0
+        self.error = ""
+        self.incomplete = ""  # why a crawl that ran to its end missed pages or listings
+        self.started = None
+        self.finished = None
+        self.delta = None
+        self.parent = None  # the job this one is a shard of, see expand_shards
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Job":
+        if not d.get("url"):
+            raise ValueError(f"job has no url: {d!r}")
+        return cls(
+            url=d["url"],
+            name=d.get("name"),
+            priority=d.get("priority", 0),
+            output=d.get("output", DEFAULT_OUTPUT),
+            max_pages=d.get("max_pages"),
+            state=d.get("state"),
+            list_only=d.get("list_only"),
+            paging=d.get("paging", "click"),
+            start_page=d.get("start_page", 1),
+            shards=d.get("shards", 1),
+        )
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def summary(self) -> str:
+        line = (f"[{self.status}] {self.name} pages={self.pages} items={self.items} "
+                f"output={self.output} {self.elapsed:.0f}s")
+        if self.delta:
+            line += " delta=" + ",".join(f"{k}:{v}" for k, v in self.delta.items())
+        if self.error:
+            line += f" error={self.error}"
+        if self.incomplete:
+            line += f" reason={self.incomplete}"
+        return line
+
+
+def _parse_line(line: str) -> Job:
+    """
+    A pasted line is either a JSON object or a bare URL followed by optional
+    key=value tokens, e.g.  https://www.realtor.ca/map#... priority=2 output=kitchener.csv max_pages=5 state=kitchener.state.json
+    """
+    if line.startswith("{"):
+        return Job.from_dict(json.loads(line))
+    tokens = line.split()
+    d = {"url": tokens[0]}
+    for tok in tokens[1:]:
+        if "=" not in tok:
+            raise ValueError(f"bad job option {tok!r} (expected key=value)")
+        key, value = tok.split("=", 1)
+        d[key.strip()] = value.strip()
+    return Job.from_dict(d)
+
+
+def parse_jobs(text: str) -> List[Job]:
+    """
+    Parses a job list: a JSON array of objects, JSON lines, or one URL per line.
+    Blank lines and lines starting with '#' are ignored.
+    """
+    text = text.strip()
+    if not text:
+        return []
+    if text.startswith("["):
+        return [Job.from_dict(d) for d in json.loads(text)]
+
+    jobs = []
+    for lineno, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            jobs.append(_parse_line(line))
+        except Exception as e:
+            raise ValueError(f"line {lineno}: {e}") from e
+    return jobs
+
+
+def expand_shards(jobs: List[Job]) -> List[Job]:
+    """
+    Replaces each job with shards=N by N URL-paged jobs: shard k takes pages
+    start_page + k, start_page + k + N, ... The page limit is split between them.
+    A sharded job can't have a state file, see Job.
+    """
+    out = []
+    for job in jobs:
+        if job.shards <= 1:
+            out.append(job)
+            continue
+        if job.state:
+            # Checked again here: state / shards may have been set after Job() validated them
+            raise ValueError(f"{job.name}: shards can't be combined with state")
+        per_shard = -(-job.max_pages // job.shards) if job.max_pages else None
+        for k in range(job.shards):
+            shard = Job(job.url, name=f"{job.name} [shard {k + 1}/{job.shards}]", priority=job.priority,
+                        output=job.output, max_pages=per_shard, list_only=job.list_only,
+                        paging="url", start_page=job.start_page + k)
+            shard.stride = job.shards
+            shard.parent = job
+            out.append(shard)
+    return out
+
+
+def load_jobs(path: str) -> List[Job]:
+    with open(path, encoding="utf-8") as f:
+        return parse_jobs(f.read())
+
+
+# =======================
+# SCHEDULER
+# =======================
+class JobScheduler:
+    """
+    Runs jobs by priority across a pool of drivers, at most `concurrency` at a time.
+
+    `run_job(driver, job, log, stop_event)` does the actual crawl and fills in
+    job.pages / job.items, and job.incomplete when the crawl was cut short (the job
+    then ends as "incomplete" rather than "done"). Drivers passed in `drivers` are
+    reused and left open; extra ones are created with `driver_factory` and quit
+    when the run ends.
+    A driver whose job raised is discarded and replaced for the next job.
+    """
+
+    def __init__(self, jobs: List[Job], run_job: Callable, driver_factory: Optional[Callable] = None,
+                 concurrency: int = 1, drivers: Optional[list] = None, log: Callable = print,
+                 stop_event: Optional[threading.Event] = None):
+        self.jobs = expand_shards(jobs)
+        self.run_job = run_job
+        self.driver_factory = driver_factory
+        self.concurrency = max(1, int(concurrency))
+        self.log = log
+        self.stop_event = stop_event or threading.Event()
+
+        self._shared_drivers = list(drivers or [])
+        self._owned_drivers = []
+        self._drivers_lock = threading.Lock()
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+
+    # ---------- Drivers ----------
+    def _acquire_driver(self):
+        with self._drivers_lock:
+            if self._shared_drivers:
+                return self._shared_drivers.pop(0), False
+        if self.driver_factory is None:
+            raise RuntimeError("no driver available and no driver_factory given")
+        driver = self.driver_factory()
+        with self._drivers_lock:
+            self._owned_drivers.append(driver)
+        return driver, True
+
+    def _release_driver(self, driver, owned, broken=False):
+        if broken and owned:
+            with self._drivers_lock:
+                if driver in self._owned_drivers:
+                    self._owned_drivers.remove(driver)
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        elif not owned:
+            with self._drivers_lock:
+                self._shared_drivers.append(driver)
+
+    # ---------- Workers ----------
+    def _worker(self, worker_id):
+        driver, owned = None, False
+        while not self.stop_event.is_set():
+            try:
+                _, _, job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+            job.status = "running"
+            job.started = time.time()
+            self.log(f"[job w{worker_id}] start {job.name} (priority={job.priority})")
+            broken = False
+            try:
+                if driver is None:
+                    driver, owned = self._acquire_driver()
+                self.run_job(driver, job, self.log, self.stop_event)
+                if self.stop_event.is_set():
+                    job.status = "stopped"
+                else:
+                    job.status = "incomplete" if job.incomplete else "done"
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e).splitlines()[0] if str(e) else type(e).__name__
+                broken = True
+                self.log(f"[job w{worker_id}] {job.name} failed: {e}\n{traceback.format_exc()}")
+            finally:
+                job.finished = time.time()
+                self.log(f"[job w{worker_id}] {job.summary()}")
+
+            if broken and driver is not None:
+                self._release_driver(driver, owned, broken=True)
+                driver, owned = None, False
+
+        if driver is not None:
+            self._release_driver(driver, owned)
+
+        # Jobs never picked up because of a stop request
+        while True:
+            try:
+                _, _, job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            job.status = "stopped"
+
+    def run(self) -> dict:
+        for job in self.jobs:
+            self._queue.put((-job.priority, next(self._seq), job))
+
+        n_workers = min(self.concurrency, len(self.jobs))
+        self.log(f"Running {len(self.jobs)} job(s) with concurrency {n_workers}")
+        threads = [
+            threading.Thread(target=self._worker, args=(i + 1,), name=f"worker-{i + 1}", daemon=True)
+            for i in range(n_workers)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        for driver in self._owned_drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        self._owned_drivers = []
+
+        self.report()
+        return self.totals()
+
+    # ---------- Reporting ----------
+    def totals(self) -> dict:
+        totals = {"jobs": len(self.jobs), "pages": 0, "items": 0}
+        for job in self.jobs:
+            totals["pages"] += job.pages
+            totals["items"] += job.items
+            totals[job.status] = totals.get(job.status, 0) + 1
+        return totals
+
+    def report(self):
+        self.log("=" * 8 + " job report " + "=" * 8)
+        for job in self.jobs:
+            self.log(job.summary())
+        t = self.totals()
+        self.log(
+            f"Totals: jobs={t['jobs']} done={t.get('done', 0)} incomplete={t.get('incomplete', 0)} "
+            f"failed={t.get('failed', 0)} stopped={t.get('stopped', 0)} pages={t['pages']} items={t['items']}"
+        )
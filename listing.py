@@ -0,0 +1,120 @@
+import re
+from typing import Optional
+
+
+# =======================
+# LISTING RECORD
+# =======================
+AGENT_FIELDS = (
+    "salesperson1", "salesperson1_phone1", "salesperson1_phone2",
+    "salesperson2", "salesperson2_phone1", "salesperson2_phone2",
+    "brokerage1", "brokerage1_address", "brokerage1_tel",
+    "brokerage2", "brokerage2_address", "brokerage2_tel",
+)
+
+# Every field with its default; the order is the record's canonical order.
+DEFAULTS = {
+    "url": "",
+    "image": "",
+    "price_text": "",       # as displayed, e.g. "$549,900"
+    "price": None,          # parsed, e.g. 549900
+    "address": "",          # as displayed, "line1\nCity, Province POSTAL"
+    "street": "",
+    "city": "",
+    "province": "",
+    "postal": "",
+    **{f: "-" for f in AGENT_FIELDS},
+    # Set by DeltaSink
+    "change": "",
+    "old_price": "",
+}
+FIELDS = tuple(DEFAULTS)
+
+_PRICE_RE = re.compile(r"\$?\s*(\d[\d,]*(?:\.\d+)?)")
+
+
+def parse_price(text: str) -> Optional[int]:
+    """
+    "$549,900" -> 549900, "$2,500/Monthly" -> 2500, "" -> None
+    """
+    m = _PRICE_RE.search(text or "")
+    if not m:
+        return None
+    try:
+        return int(float(m.group(1).replace(",", "")))
+    except ValueError:
+        return None
+
+
+def split_address(text: str):
+    """
+    "123 Main St\nNorwich (Norwich Town), Ontario N0J1P0"
+        -> ("123 Main St", "Norwich (Norwich Town)", "Ontario", "N0J1P0")
+    """
+    line1, city, province, postal = "", "", "", ""
+    if text:
+        parts = text.split("\n")
+        if len(parts) >= 2:
+            line1 = parts[0].strip()
+            addr_parts = parts[1].split(",")
+            if len(addr_parts) >= 2:
+                city = addr_parts[0].strip()
+                province_post = addr_parts[1].strip().split(" ")
+                if len(province_post) >= 2:
+                    province = province_post[0]
+                    postal = " ".join(province_post[1:])
+    return line1, city, province, postal
+
+
+class Listing:
+    """
+    One scraped listing. Uses __slots__ so hundreds of thousands can be held
+    in memory (dedupe, delta state) without a dict per record.
+
+    Set the displayed price / address with set_price() / set_address() so the
+    parsed fields stay in sync.
+    """
+
+    __slots__ = FIELDS
+
+    def __init__(self, **fields):
+        for name, default in DEFAULTS.items():
+            setattr(self, name, fields.pop(name, default))
+        if fields:
+            raise TypeError(f"unknown Listing field(s): {', '.join(fields)}")
+
+    def set_price(self, text: str):
+        self.price_text = text or ""
+        self.price = parse_price(self.price_text)
+
+    def set_address(self, text: str):
+        self.address = text or ""
+        self.street, self.city, self.province, self.postal = split_address(self.address)
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in FIELDS}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Listing":
+        """
+        Builds a Listing from to_dict() output or an older raw info dict
+        (where "price" held the displayed text).
+        """
+        d = {k: v for k, v in d.items() if k in DEFAULTS}
+        listing = cls(**d)
+        if not listing.price_text and isinstance(listing.price, str):
+            listing.set_price(listing.price)
+        if listing.address and not listing.street:
+            listing.set_address(listing.address)
+        return listing
+
+    def __repr__(self):
+        return f"Listing(url={self.url!r}, price={self.price!r}, street={self.street!r})"
+
+    def __eq__(self, other):
+        if not isinstance(other, Listing):
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in FIELDS)
+
+    # Mutable and compared field by field, so unhashable: key sets / dicts by delta.listing_id(info)
+    __hash__ = None
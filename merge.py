@@ -0,0 +1,307 @@
+import csv
+import glob
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.utils import get_column_letter
+
+from delta import DELTA_COLUMNS, CrawlState, listing_id
+from listing import FIELDS, Listing
+from sinks import HEADERS, listing_from_row, listing_row
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet shards are optional
+    pa = pq = None
+
+
+logger = logging.getLogger("YELLOSCRAPPER")
+
+# Extra leading column in merged tabular outputs
+SEEN_COLUMN = ("Last Seen", "last_seen")
+# Header -> field for leading columns we know how to read back
+KNOWN_EXTRAS = dict(DELTA_COLUMNS + (SEEN_COLUMN,))
+
+PARQUET_BATCH = 5000
+
+
+def _parse_time(value) -> Optional[float]:
+    if value in (None, ""):
+        return None
+    if isinstance(value, datetime):
+        return value.timestamp()
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return None
+
+
+def _format_time(ts: Optional[float]) -> str:
+    return datetime.fromtimestamp(ts).isoformat(" ", "seconds") if ts else ""
+
+
+def _need_parquet():
+    if pq is None:
+        raise RuntimeError("Parquet files need pyarrow (pip install pyarrow)")
+
+
+# =======================
+# READERS
+# =======================
+def _tabular_rows(headers, rows) -> Iterator[Tuple[Listing, Optional[float]]]:
+    """
+    Rows laid out as [extra columns...] + HEADERS, as written by the sinks.
+    """
+    headers = ["" if h is None else str(h) for h in headers]
+    n_extra = max(0, len(headers) - len(HEADERS))
+    extras = [KNOWN_EXTRAS.get(h) for h in headers[:n_extra]]
+    for row in rows:
+        row = list(row)
+        if not any(v not in (None, "") for v in row):
+            continue
+        listing = listing_from_row(row[n_extra:])
+        seen = None
+        for field, value in zip(extras, row[:n_extra]):
+            if field == "last_seen":
+                seen = _parse_time(value)
+            elif field:
+                setattr(listing, field, "" if value is None else str(value))
+        yield listing, seen
+
+
+def _read_xlsx(path):
+    wb = load_workbook(path, read_only=True)
+    try:
+        for ws in wb.worksheets:
+            rows = ws.iter_rows(values_only=True)
+            headers = next(rows, None)
+            if headers:
+                yield from _tabular_rows(headers, rows)
+    finally:
+        wb.close()
+
+
+def _read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = csv.reader(f)
+        headers = next(rows, None)
+        if headers:
+            yield from _tabular_rows(headers, rows)
+
+
+def _from_record(d: dict):
+    return Listing.from_dict(d), _parse_time(d.get("last_seen"))
+
+
+def _read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield _from_record(json.loads(line))
+            except ValueError as e:
+                logger.warning(f"[merge] {path}:{lineno}: skipping bad line: {e}")
+
+
+def _read_parquet(path):
+    _need_parquet()
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=PARQUET_BATCH):
+        for d in batch.to_pylist():
+            yield _from_record(d)
+
+
+READERS = {
+    ".xlsx": _read_xlsx,
+    ".csv": _read_csv,
+    ".jsonl": _read_jsonl,
+    ".ndjson": _read_jsonl,
+    ".parquet": _read_parquet,
+}
+
+
+def read_shard(path) -> Iterator[Tuple[Listing, Optional[float]]]:
+    """
+    Streams (listing, last_seen or None) from one output file of any supported format.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in READERS:
+        raise ValueError(f"unsupported shard format: {path}")
+    return READERS[ext](path)
+
+
+# =======================
+# WRITER
+# =======================
+class MergedOutput:
+    """
+    Streams the merged rows into one file: write-only workbook, CSV, JSONL or
+    Parquet. Tabular formats get a leading "Last Seen" column (plus the delta
+    columns when the inputs had them); JSONL / Parquet get a last_seen key.
+    Everything goes to a temporary file that replaces `path` on close().
+    """
+
+    def __init__(self, path, delta_columns=False):
+        self.path = path
+        self.ext = os.path.splitext(path)[1].lower()
+        self.tmp = f"{path}.merging{self.ext}"
+        self.extra_columns = (SEEN_COLUMN,) + (DELTA_COLUMNS if delta_columns else ())
+        self.count = 0
+        headers = [h for h, _ in self.extra_columns] + HEADERS
+
+        if self.ext == ".csv":
+            self._file = open(self.tmp, "w", newline="", encoding="utf-8")
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(headers)
+        elif self.ext in (".jsonl", ".ndjson"):
+            self._file = open(self.tmp, "w", encoding="utf-8")
+        elif self.ext == ".parquet":
+            _need_parquet()
+            self._schema = pa.schema(
+                [(f, pa.int64() if f == "price" else pa.string()) for f in FIELDS] + [("last_seen", pa.float64())]
+            )
+            self._parquet = pq.ParquetWriter(self.tmp, self._schema)
+            self._batch = []
+        else:
+            self._wb = Workbook(write_only=True)
+            self._ws = self._wb.create_sheet("Sheet1")
+            for col_idx in range(1, len(headers) + 1):
+                self._ws.column_dimensions[get_column_letter(col_idx)].width = 20
+            self._ws.append(headers)
+
+    def _row(self, listing, seen):
+        return [_format_time(seen)] + [getattr(listing, k) for _, k in self.extra_columns[1:]] + listing_row(listing)
+
+    def write(self, listing: Listing, seen: Optional[float]):
+        if self.ext == ".csv":
+            self._csv.writerow(self._row(listing, seen))
+        elif self.ext in (".jsonl", ".ndjson"):
+            self._file.write(json.dumps({**listing.to_dict(), "last_seen": seen}, ensure_ascii=False) + "\n")
+        elif self.ext == ".parquet":
+            d = listing.to_dict()
+            d = {k: (v if k == "price" or v is None else str(v)) for k, v in d.items()}
+            self._batch.append({**d, "last_seen": seen})
+            if len(self._batch) >= PARQUET_BATCH:
+                self._flush_parquet()
+        else:
+            self._ws.append(self._row(listing, seen))
+        self.count += 1
+
+    def _flush_parquet(self):
+        if self._batch:
+            self._parquet.write_table(pa.Table.from_pylist(self._batch, schema=self._schema))
+            self._batch = []
+
+    def close(self):
+        if self.ext in (".csv", ".jsonl", ".ndjson"):
+            self._file.close()
+        elif self.ext == ".parquet":
+            self._flush_parquet()
+            self._parquet.close()
+        else:
+            self._wb.save(self.tmp)
+        os.replace(self.tmp, self.path)
+
+    def abort(self):
+        """
+        Drops the partial output, leaving any existing file at `path` untouched.
+        """
+        try:
+            if self.ext in (".csv", ".jsonl", ".ndjson"):
+                self._file.close()
+            elif self.ext == ".parquet":
+                self._parquet.close()
+        finally:
+            if os.path.exists(self.tmp):
+                os.remove(self.tmp)
+
+
+# =======================
+# MERGE
+# =======================
+def expand_inputs(patterns: List[str]) -> List[str]:
+    """
+    Expands glob patterns (the Windows shell doesn't), keeping order and dropping repeats.
+    """
+    out = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        for path in matches:
+            if path not in out:
+                out.append(path)
+    return out
+
+
+def merge(inputs: List[str], output: str, states=(), log=logger.info) -> dict:
+    """
+    Compacts shards into one output with one row per listing ID, keeping the
+    row with the latest last_seen. A row's last_seen comes from its own
+    column / key, else the delta state files in `states`, else its file's
+    modification time; ties go to the later file and row.
+
+    Two streaming passes: the first keeps only (last_seen, file, row) per ID,
+    the second copies the winning rows. Memory grows with unique IDs, not rows.
+    """
+    state_seen = {}
+    for path in states:
+        for lid, entry in CrawlState(path).listings.items():
+            state_seen[lid] = max(state_seen.get(lid, 0), entry.last_seen)
+
+    winners = {}
+    rows = 0
+    delta_columns = False
+    for fi, path in enumerate(inputs):
+        mtime = os.path.getmtime(path)
+        n = 0
+        for ri, (listing, seen) in enumerate(read_shard(path)):
+            lid = listing_id(listing)
+            if not lid:
+                continue
+            ts = seen or state_seen.get(lid) or mtime
+            key = (ts, fi, ri)
+            if lid not in winners or key >= winners[lid]:
+                winners[lid] = key
+            delta_columns = delta_columns or bool(listing.change)
+            n += 1
+        rows += n
+        log(f"[merge] {path}: {n} row(s), {len(winners)} unique so far")
+
+    out = MergedOutput(output, delta_columns)
+    try:
+        for fi, path in enumerate(inputs):
+            for ri, (listing, seen) in enumerate(read_shard(path)):
+                lid = listing_id(listing)
+                if lid and winners.get(lid, (None,))[1:] == (fi, ri):
+                    out.write(listing, winners[lid][0])
+    except BaseException:
+        out.abort()
+        raise
+    out.close()
+
+    stats = {"files": len(inputs), "rows": rows, "unique": out.count, "duplicates": rows - out.count}
+    log(f"[merge] wrote {out.count} listing(s) to {output} from {rows} row(s) in {len(inputs)} file(s)")
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    parser = argparse.ArgumentParser(
+        description="Merge output shards (xlsx / csv / jsonl / parquet) into one file, one row per listing")
+    parser.add_argument("inputs", nargs="+", help="shard files or glob patterns; the output may be one of them")
+    parser.add_argument("-o", "--output", required=True, help="merged file; format picked by extension")
+    parser.add_argument("--state", action="append", default=[],
+                        help="delta state file to take last_seen from (repeatable)")
+    args = parser.parse_args()
+    merge(expand_inputs(args.inputs), args.output, args.state)
@@ -0,0 +1,237 @@
+import logging
+import os
+import time
+
+from listing import AGENT_FIELDS, FIELDS
+from sinks import HEADERS, ROW_FIELDS
+
+try:
+    import pandas as pd
+except ImportError:  # batch normalization is optional
+    pd = None
+
+try:
+    import pyarrow  # noqa: F401  (Arrow-backed strings run the str ops in C++)
+    STRING = "string[pyarrow]"
+except ImportError:
+    STRING = "string"
+
+
+logger = logging.getLogger("YELLOSCRAPPER")
+
+PROVINCES = {
+    "AB": ("alberta",),
+    "BC": ("british columbia", "colombie-britannique"),
+    "MB": ("manitoba",),
+    "NB": ("new brunswick", "nouveau-brunswick"),
+    "NL": ("newfoundland and labrador", "newfoundland & labrador", "newfoundland", "terre-neuve-et-labrador"),
+    "NS": ("nova scotia", "nouvelle-écosse"),
+    "NT": ("northwest territories", "territoires du nord-ouest"),
+    "NU": ("nunavut",),
+    "ON": ("ontario",),
+    "PE": ("prince edward island", "île-du-prince-édouard", "pei"),
+    "QC": ("quebec", "québec", "que"),
+    "SK": ("saskatchewan",),
+    "YT": ("yukon", "yukon territory"),
+}
+PROVINCE_CODES = {name: code for code, names in PROVINCES.items() for name in names + (code.lower(),)}
+
+# First letter of a postal code -> province (X is shared by NT and NU)
+POSTAL_REGIONS = {
+    "A": "NL", "B": "NS", "C": "PE", "E": "NB", "G": "QC", "H": "QC", "J": "QC",
+    "K": "ON", "L": "ON", "M": "ON", "N": "ON", "P": "ON", "R": "MB", "S": "SK",
+    "T": "AB", "V": "BC", "X": "NT", "Y": "YT",
+}
+# Canada Post never uses D, F, I, O, Q, U, nor W / Z as the first letter
+POSTAL_RE = r"^[ABCEGHJ-NPRSTVXY]\d[ABCEGHJ-NPRSTV-Z] ?\d[ABCEGHJ-NPRSTV-Z]\d$"
+# "City, Province A1A 1A1": the postal code is optional and the province may be several words
+# (the province group is stripped later; leaving the spaces to the postal group
+# keeps "Calgary, T2P 1J9" from reading the postal code as the province)
+CITY_LINE_RE = (r"^\s*(?P<city>[^,]*?)\s*,(?P<province>.*?)"
+                r"(?:\s*\b(?P<postal>[A-Za-z]\d[A-Za-z]\s*\d[A-Za-z]\d))?\s*$")
+
+PHONE_FIELDS = tuple(f for f in AGENT_FIELDS if "phone" in f or f.endswith("_tel"))
+
+# Extra leading columns written to normalized tabular files
+NORMALIZED_COLUMNS = (("Price Value", "price"), ("Postal OK", "postal_ok"))
+
+
+def _need_pandas():
+    if pd is None:
+        raise RuntimeError("batch normalization needs pandas (pip install pandas)")
+
+
+def _distinct(fn, series):
+    """
+    Runs a Series -> Series normalizer over the distinct values only and maps the
+    results back. Phones, cities and postal codes repeat across thousands of
+    rows, so this is most of the speed-up.
+    """
+    codes, uniques = pd.factorize(series.astype(object).fillna(""))
+    out = fn(pd.Series(uniques, dtype=STRING))
+    return pd.Series(out.to_numpy()[codes], index=series.index).astype(out.dtype)
+
+
+# =======================
+# VECTORIZED NORMALIZERS
+# =======================
+def normalize_price(text):
+    """
+    "$549,900" -> 549900, "$2,500/Monthly" -> 2500; missing -> <NA>. Series in, Int64 Series out.
+    """
+    number = text.astype(STRING).str.extract(r"(\d[\d,]*(?:\.\d+)?)", expand=False)
+    return pd.to_numeric(number.str.replace(",", "", regex=False), errors="coerce").round().astype("Int64")
+
+
+def normalize_postal(text):
+    """
+    Upper-cases and spaces Canadian postal codes ("n6a1a1" -> "N6A 1A1").
+    Returns (codes, valid); invalid codes come back as "".
+    """
+    compact = text.astype(STRING).fillna("").str.upper().str.replace(r"[^A-Z0-9]", "", regex=True)
+    spaced = compact.str.slice(0, 3) + " " + compact.str.slice(3)
+    valid = spaced.str.match(POSTAL_RE).fillna(False).astype(bool)
+    return spaced.where(valid, ""), valid
+
+
+def normalize_province(text):
+    """
+    Province names (English / French) or codes -> two-letter codes; unknown -> "".
+    """
+    key = text.astype(STRING).fillna("").str.strip().str.lower().str.replace(r"\s+", " ", regex=True)
+    return key.map(PROVINCE_CODES).fillna("").astype(STRING)
+
+
+def normalize_phone(text):
+    """
+    North American numbers -> "519-555-1234" (a leading 1 is dropped); anything
+    else is kept as given, "-" / empty stay as they are.
+    """
+    raw = text.astype(STRING).fillna("")
+    digits = raw.str.replace(r"\D", "", regex=True)
+    digits = digits.where(~((digits.str.len() == 11) & digits.str.startswith("1")), digits.str.slice(1))
+    dashed = digits.str.slice(0, 3) + "-" + digits.str.slice(3, 6) + "-" + digits.str.slice(6)
+    return dashed.where(digits.str.len() == 10, raw.str.strip())
+
+
+def normalize_frame(df):
+    """
+    Normalizes a frame of listings (Listing field names as columns) in place and returns it:
+    price (Int64) from price_text, street / city / province / postal re-split from the
+    address, province as a two-letter code (inferred from the postal code when missing),
+    postal codes validated into postal_ok, phone numbers in one format.
+    """
+    _need_pandas()
+    for f in FIELDS:
+        if f not in df.columns:
+            df[f] = ""
+
+    df["price"] = _distinct(normalize_price, df["price_text"])
+
+    # Rebuild "line1\nCity, Province POSTAL" where only the split columns were kept
+    address = df["address"].astype(STRING).fillna("")
+    city = df["city"].astype(STRING).fillna("")
+    rebuilt = (df["street"].astype(STRING).fillna("") + "\n" + city + ", " +
+               df["province"].astype(STRING).fillna("") + " " + df["postal"].astype(STRING).fillna(""))
+    address = address.where(address.str.strip() != "", rebuilt.where(city != "", ""))
+
+    lines = address.str.split("\n", n=1, expand=True).reindex(columns=[0, 1])
+    line2 = lines[1].fillna("")
+    # The "City, Province POSTAL" line repeats per building / street, so parse it once per value
+    codes, uniques = pd.factorize(line2.astype(object))
+    parts = pd.Series(uniques, dtype=STRING).str.extract(CITY_LINE_RE)
+    parts = pd.DataFrame({c: parts[c].to_numpy()[codes] for c in parts.columns}, index=df.index)
+    has_line = parts["city"].notna()
+
+    df["street"] = lines[0].fillna("").str.strip().where(has_line, df["street"])
+    df["city"] = parts["city"].fillna("").where(has_line, df["city"])
+    province = _distinct(normalize_province, parts["province"].where(has_line, df["province"]))
+    postal = _distinct(lambda s: normalize_postal(s)[0], parts["postal"].where(has_line, df["postal"]))
+    valid = postal != ""
+
+    from_postal = _distinct(lambda s: s.str.slice(0, 1).map(POSTAL_REGIONS).fillna("").astype(STRING), postal)
+    df["province"] = province.where(province != "", from_postal)
+    # A postal code is only accepted when its region matches the province (X covers NT and NU)
+    region_ok = (from_postal == df["province"]) | ((from_postal == "NT") & (df["province"] == "NU"))
+    df["postal_ok"] = (valid & region_ok).astype(bool)
+    df["postal"] = postal
+
+    for f in PHONE_FIELDS:
+        df[f] = _distinct(normalize_phone, df[f])
+    return df
+
+
+# =======================
+# FILES
+# =======================
+def _tabular_frame(raw):
+    """
+    Sink layout ([extra columns] + HEADERS, with repeated "Phone#" headers) -> field-named columns.
+    """
+    n_extra = max(0, raw.shape[1] - len(HEADERS))
+    extras = [str(c) for c in raw.columns[:n_extra]]
+    known = {"Change": "change", "Old Price": "old_price", "Last Seen": "last_seen",
+             **{h: f for h, f in NORMALIZED_COLUMNS}}
+    raw.columns = [known.get(c, c) for c in extras] + list(ROW_FIELDS) + [
+        f"extra_{i}" for i in range(raw.shape[1] - n_extra - len(ROW_FIELDS))]
+    return raw.drop(columns=["price", "postal_ok"], errors="ignore")
+
+
+def read_frame(path):
+    _need_pandas()
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return _tabular_frame(pd.read_csv(path, dtype="string", keep_default_na=False))
+    if ext == ".xlsx":
+        return _tabular_frame(pd.read_excel(path, dtype="string", keep_default_na=False))
+    if ext in (".jsonl", ".ndjson"):
+        return pd.read_json(path, lines=True, dtype=False)
+    if ext == ".parquet":
+        return pd.read_parquet(path)
+    raise ValueError(f"unsupported format: {path}")
+
+
+def write_frame(df, path):
+    """
+    Tabular files keep the sink layout with "Price Value" / "Postal OK" (and any
+    Last Seen / Change / Old Price) in front; JSONL / Parquet keep field names.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".jsonl", ".ndjson"):
+        df.to_json(path, orient="records", lines=True, force_ascii=False)
+        return
+    if ext == ".parquet":
+        df.to_parquet(path, index=False)
+        return
+
+    extras = [(h, f) for h, f in (("Last Seen", "last_seen"), ("Change", "change"), ("Old Price", "old_price"))
+              if f in df.columns and (df[f].astype(STRING).fillna("") != "").any()]
+    columns = list(NORMALIZED_COLUMNS) + extras
+    out = df[[f for _, f in columns] + list(ROW_FIELDS)].copy()
+    out.columns = [h for h, _ in columns] + HEADERS
+    if ext == ".csv":
+        out.to_csv(path, index=False)
+    else:
+        out.to_excel(path, index=False)
+
+
+def normalize_file(src, dst, log=logger.info):
+    started = time.time()
+    df = normalize_frame(read_frame(src))
+    write_frame(df, dst)
+    bad = int((~df["postal_ok"]).sum())
+    log(f"[normalize] {src} -> {dst}: {len(df)} row(s) in {time.time() - started:.1f}s, "
+        f"{bad} without a valid postal code")
+    return df
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    parser = argparse.ArgumentParser(
+        description="Normalize prices, addresses, postal codes, provinces and phones in an output file")
+    parser.add_argument("input", help="xlsx / csv / jsonl / parquet")
+    parser.add_argument("output", help="normalized file; format picked by extension")
+    args = parser.parse_args()
+    normalize_file(args.input, args.output)
@@ -0,0 +1,208 @@
+import json
+import logging
+import math
+import os
+import time
+from typing import Callable, List, Optional, Tuple
+
+
+logger = logging.getLogger("YELLOSCRAPPER")
+
+DEFAULT_HISTORY_FILE = "crawl_history.json"
+
+DAY = 86400.0
+HOUR = 3600.0
+
+
+# =======================
+# CRAWL HISTORY
+# =======================
+class CrawlHistory:
+    """
+    Per-job record of past crawls, persisted as JSON: when each crawl started,
+    how long it held a browser, and its delta counts (new / changed / removed,
+    only known for jobs with `state`). The newest `keep` runs per job are kept.
+    """
+
+    def __init__(self, path=DEFAULT_HISTORY_FILE, keep=50):
+        self.path = path
+        self.keep = keep
+        self.runs = {}
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.runs = json.load(f)
+            except Exception as e:
+                logger.warning(f"Could not read crawl history {path}, starting empty: {e}")
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.runs, f, indent=1)
+        os.replace(tmp, self.path)
+
+    def record(self, job, parts=None):
+        """
+        Adds a finished job's run. Stopped or failed runs only count towards browser time.
+        With `parts` (the job's shards), they are recorded as one run of `job`:
+        browser time and counts add up, and it is done only if every shard is.
+        """
+        parts = [p for p in parts or [job] if p.started is not None]
+        if not parts:
+            return
+        statuses = [p.status for p in parts]
+        run = {
+            "at": min(p.started for p in parts),
+            "elapsed": round(sum(p.elapsed for p in parts), 1),
+            "status": "done" if set(statuses) == {"done"} else next(s for s in statuses if s != "done"),
+            "pages": sum(p.pages for p in parts),
+            "items": sum(p.items for p in parts),
+        }
+        if run["status"] == "done" and all(p.delta for p in parts):
+            run.update({k: sum(p.delta.get(k, 0) for p in parts) for k in ("new", "changed", "removed")})
+        runs = self.runs.setdefault(job.name, [])
+        runs.append(run)
+        del runs[:-self.keep]
+
+    def record_all(self, jobs):
+        """
+        Records a scheduler's jobs. Shards (see jobs.expand_shards) go in as one run
+        under the name of the job they were split from, which is what plan() looks up.
+        """
+        groups = {}
+        for job in jobs:
+            parent = getattr(job, "parent", None) or job
+            groups.setdefault(id(parent), (parent, []))[1].append(job)
+        for parent, parts in groups.values():
+            self.record(parent, parts)
+
+    def spent(self, since: float) -> float:
+        """
+        Browser-hours used by all jobs since `since` (epoch seconds).
+        """
+        return sum(r["elapsed"] for runs in self.runs.values() for r in runs if r["at"] >= since) / HOUR
+
+    def last_crawl(self, name) -> Optional[float]:
+        runs = self.runs.get(name) or []
+        return runs[-1]["at"] if runs else None
+
+    def cost(self, name) -> Optional[float]:
+        """
+        Mean browser-hours of the job's completed crawls.
+        """
+        done = [r["elapsed"] for r in self.runs.get(name) or [] if r["status"] == "done"]
+        return sum(done) / len(done) / HOUR if done else None
+
+    def change_rate(self, name, now=None, halflife=7 * DAY) -> Optional[float]:
+        """
+        Listing changes (new + changed + removed) per hour, from the gaps between
+        consecutive delta crawls. Recent gaps weigh more (half-life `halflife`).
+        None until two delta crawls exist.
+        """
+        now = now or time.time()
+        runs = [r for r in self.runs.get(name) or [] if "new" in r]
+        changes = gaps = 0.0
+        for prev, run in zip(runs, runs[1:]):
+            gap = run["at"] - prev["at"]
+            if gap <= 0:
+                continue
+            w = 0.5 ** ((now - run["at"]) / halflife)
+            changes += w * (run["new"] + run["changed"] + run["removed"])
+            gaps += w * gap
+        return changes / (gaps / HOUR) if gaps else None
+
+
+# =======================
+# PLANNER
+# =======================
+class PlanEntry:
+    __slots__ = ("job", "rate", "cost", "interval", "last", "due", "score", "selected")
+
+    def __init__(self, job, rate, cost, interval, last, due, score):
+        self.job = job
+        self.rate = rate
+        self.cost = cost
+        self.interval = interval
+        self.last = last
+        self.due = due
+        self.score = score
+        self.selected = False
+
+    def describe(self) -> str:
+        rate = (f"{self.rate:.2f}/h" if self.rate is not None else
+                "unknown" if self.job.state else "untracked")
+        last = f"{(time.time() - self.last) / HOUR:.1f}h ago" if self.last else "never"
+        verdict = "run" if self.selected else ("over budget" if self.due else "not due")
+        return (f"{self.job.name}: changes={rate} cost={self.cost * 60:.0f}min "
+                f"every {self.interval / HOUR:.1f}h last={last} -> {verdict}")
+
+
+def plan(jobs: List, history: CrawlHistory, budget_hours: float, period=DAY, now=None,
+         min_interval=HOUR, max_interval=7 * DAY, default_cost=0.25,
+         log: Callable = logger.info) -> Tuple[List, List[PlanEntry]]:
+    """
+    Picks which jobs to crawl now so that, over every `period`, crawling fits in
+    `budget_hours` browser-hours and goes where listings actually change.
+
+    Each job's crawl frequency is set proportional to sqrt(change rate / cost),
+    which minimises the number of changes waiting to be picked up for a fixed
+    budget. A job is due once its interval has passed; due jobs run by priority,
+    then by changes pending per browser-hour, while the budget left in the
+    trailing period allows. Jobs with no rate yet are always due, so they get
+    measured. Jobs without `state` never get a rate: once their cost is known they
+    run every `max_interval`, after the jobs with a rate. Returns (jobs to run,
+    plan entries).
+    """
+    now = now or time.time()
+    known_costs = [c for c in (history.cost(j.name) for j in jobs) if c]
+    fallback_cost = sorted(known_costs)[len(known_costs) // 2] if known_costs else default_cost
+
+    stats = []
+    for job in jobs:
+        rate = history.change_rate(job.name, now)
+        cost = history.cost(job.name) or fallback_cost
+        stats.append((job, rate, max(cost, 1e-3)))
+
+    # crawls per period: f_i = B * sqrt(rate_i / cost_i) / sum_j sqrt(rate_j * cost_j)
+    norm = sum(math.sqrt(rate * cost) for _, rate, cost in stats if rate)
+    entries = []
+    for job, rate, cost in stats:
+        # Without state a job's changes are never counted, so measuring it again won't help
+        untracked = rate is None and not job.state and history.cost(job.name) is not None
+        if untracked:
+            interval = max_interval
+        elif rate is None:
+            interval = min_interval
+        elif rate <= 0 or norm <= 0:
+            interval = max_interval
+        else:
+            per_period = budget_hours * math.sqrt(rate / cost) / norm
+            interval = period / per_period if per_period > 0 else max_interval
+        interval = min(max(interval, min_interval), max_interval)
+
+        last = history.last_crawl(job.name)
+        since = now - last if last else None
+        # 10% slack so a crawl started by cron a little early still counts as due
+        due = since is None or since >= 0.9 * interval
+        if untracked:
+            score = 0.0
+        elif rate is None or since is None:
+            score = math.inf
+        else:
+            score = rate * since / HOUR / cost
+        entries.append(PlanEntry(job, rate, cost, interval, last, due, score))
+
+    remaining = budget_hours - history.spent(now - period)
+    selected = []
+    for entry in sorted((e for e in entries if e.due), key=lambda e: (-e.job.priority, -e.score)):
+        if entry.cost > remaining:
+            continue
+        entry.selected = True
+        remaining -= entry.cost
+        selected.append(entry.job)
+
+    log(f"[plan] budget {budget_hours:.1f} browser-h per {period / HOUR:.0f}h, "
+        f"{history.spent(now - period):.2f}h used, {len(selected)}/{len(jobs)} job(s) to run")
+    for entry in entries:
+        log(f"[plan] {entry.describe()}")
+    return selected, entries
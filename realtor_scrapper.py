@@ -3,12 +3,17 @@
 
 
 
+import argparse
+import functools
+import math
 import threading
 import time
 import sys
 import traceback
+from contextlib import contextmanager
 
 import customtkinter as ctk
+from tkinter import filedialog
 
 # --- Selenium imports ---
 from selenium import webdriver
@@ -27,7 +32,6 @@ from selenium.common.exceptions import TimeoutException, NoSuchElementException,
 import json
 import logging
 import os
-import pickle
 import re
 import subprocess
 import sys
@@ -43,6 +47,7 @@ from selenium.common.exceptions import (
     ElementNotInteractableException,
     WebDriverException,
 )
+from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
@@ -105,12 +110,23 @@ def get_chrome_major_version() -> int:
     sys.exit(1)
 
 
-def init_driver(headless: bool = False) -> uc.Chrome:
+PAGE_LOAD_STRATEGIES = ("normal", "eager", "none")
+
+
+def init_driver(headless: bool = False, capture: bool = False, session=None, egress=None,
+                page_load: str = "normal") -> uc.Chrome:
     """
     Initialize undetected_chromedriver with appropriate options.
+    `page_load` is Chrome's page-load strategy: "normal" waits for every subresource,
+    "eager" only for the DOM, "none" returns right after navigation starts (the
+    extractor's waits then cover the load, within the per-listing budget).
+    With capture=True, Chrome's performance (network) log is enabled for NetworkCapture.
+    With `session` (from SessionStore.checkout), saved cookies / localStorage / profile
+    are restored, and the session is released when the driver quits.
+    With `egress` (from EgressPool.acquire), Chrome's traffic goes through that identity.
     """
     version = get_chrome_major_version()
-    logger.info(f"Initializing ChromeDriver with Chrome version {version} (headless={headless})")
+    logger.info(f"Initializing ChromeDriver with Chrome version {version} (headless={headless}, page_load={page_load})")
 
     options = uc.ChromeOptions()
     if headless:
@@ -125,6 +141,13 @@ def init_driver(headless: bool = False) -> uc.Chrome:
         "profile.default_content_setting_values.popups": 0           # Block popups
     }
     options.add_experimental_option("prefs", prefs)
+    options.page_load_strategy = page_load
+    if capture:
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    if session is not None:
+        session.apply_options(options)
+    if egress is not None:
+        egress.apply_options(options)
 
     
 
@@ -134,345 +157,684 @@ def init_driver(headless: bool = False) -> uc.Chrome:
 
     driver = uc.Chrome(version_main=version, options=options)
     driver.maximize_window()
+    return bind_identity(driver, session, egress)
+
+
+def bind_identity(driver, session=None, egress=None):
+    """
+    Restores `session` into a fresh driver and ties the session / egress identity to it:
+    check_page and run_job find them on the driver, and quit() releases both.
+    """
+    if session is not None:
+        session.restore(driver)
+    if session is not None or egress is not None:
+        driver.browser_session = session
+        driver.egress = egress
+        quit_driver = driver.quit
+
+        def quit():
+            try:
+                quit_driver()
+            finally:
+                if session is not None:
+                    session.store.release(session)
+                if egress is not None:
+                    egress.pool.release(egress)
+
+        driver.quit = quit
     return driver
 
 
 
 
-import os
-from openpyxl import Workbook, load_workbook
-from openpyxl.utils import get_column_letter
+from capture import NetworkCapture
+from tracing import Profiler, span, tracer
+from delta import DELTA_COLUMNS, DeltaSink, listing_id
+from images import ImageDownloader, ImageSink, parse_size
+from extract import READY_STATE_JS, Deadline, ListingIncomplete, get_listing_info
+from extract_html import get_listing_info_html
+from jobs import DEFAULT_OUTPUT, JobScheduler, load_jobs, parse_jobs
+from listing import Listing
+from planner import DEFAULT_HISTORY_FILE, CrawlHistory, plan
+from retry import DEFAULT_RETRY_FILE, RetryQueue
+from sessions import DEFAULT_SESSION_DIR, SessionBlocked, SessionStore, looks_blocked
+from egress import load_egress
+from entities import CardCache, EntitySink, EntityStore
+from sinks import append_to_excel, open_sink
+from writer import WriterClient
+
 
+# The crawl loop's fixed pauses (traced as "sleep" spans); see set_sleep
+sleep = tracer.sleep
 
 
-def append_to_excel(data: dict, filename="scrapper.xlsx", sheet_name="Sheet1"):
+def set_sleep(fn):
     """
-    Appends scraped data to Excel in a structured format.
+    Replaces the function behind the crawl loop's fixed pauses, e.g. with a
+    shortened one when running against simulated browsers (simdriver.py).
     """
+    global sleep
+    sleep = fn
 
-    headers = [
-        "Price", "page link", "1st Image link",
-        "Line 1 Address", "City", "Province", "Post Code",
-        "Salesperson 1", "Phone#1", "Phone#2",
-        "Brokerage1", "Brokerage1 Addr#" ,"Brokerage1 Tel#",
-        "Salesperson 2", "Phone#1", "Phone#2",
-        "Brokerage2", "Brokerage2 Addr#" ,"Brokerage2 Tel#"
-    ]
 
-    # Create workbook if not exists
-    if not os.path.exists(filename):
-        wb = Workbook()
-        ws = wb.active
-        ws.title = sheet_name
-        ws.append(headers)
-        wb.save(filename)
 
-    # Load existing workbook
-    wb = load_workbook(filename)
-    if sheet_name not in wb.sheetnames:
-        ws = wb.create_sheet(sheet_name)
-        ws.append(headers)
-    else:
-        ws = wb[sheet_name]
 
-    # ----- Parse data into required format -----
-    # Address split
-    line1, city, province, postal = "", "", "", ""
-    if "address" in data and data["address"]:
-        parts = data["address"].split("\n")
-        if len(parts) >= 2:
-            line1 = parts[0].strip()
-            # Example: "Norwich (Norwich Town), Ontario N0J1P0"
-            addr_parts = parts[1].split(",")
-            if len(addr_parts) >= 2:
-                city = addr_parts[0].strip()
-                province_post = addr_parts[1].strip().split(" ")
-                if len(province_post) >= 2:
-                    province = province_post[0]
-                    postal = " ".join(province_post[1:])
 
-    # Salesperson 1 (main agent)
-    salesperson1 = data.get("salesperson1", "")
-    phone1 = data.get("salesperson1_phone1", "")
-    phone2 = data.get("salesperson1_phone2", "")   
+def wait_for_page(driver, url, previous, timeout=30):
+    """
+    Waits after driver.get(url) until the tab has left `previous` (its URL before
+    the get) and the new document is parsed. Under the "none" page-load strategy
+    get() returns before the page commits, and the page would otherwise be timed,
+    bot-checked or refreshed while the old document is still up. Returns False
+    on timeout.
+    """
+    deadline = time.time() + timeout
+    while True:
+        # Opening the page already shown reloads it in place: nothing to tell apart
+        if (previous == url or driver.current_url != previous) and \
+                driver.execute_script(READY_STATE_JS) in ("interactive", "complete"):
+            return True
+        if time.time() >= deadline:
+            return False
+        sleep(0.1)
+
+
+def find_result_items(driver, log=print, refreshes=3):
+    """
+    Returns the result-card links on the current map page, refreshing a few times
+    if the list comes back empty. Returns [] if the page never loads.
+    """
+    for attempt in range(refreshes + 1):
+        try:
+            items = driver.find_elements(By.XPATH, "//*[@data-binding='href=DetailsURL']")
+        except Exception:
+            items = []
+        if items:
+            return items
+        if attempt < refreshes:
+            log(f"Cannot load the main page... refreshing ({attempt + 1}/{refreshes})")
+            driver.refresh()
+            sleep(2)
+    return []
 
 
+def check_loaded(info):
+    """
+    Raises if the detail page clearly didn't render (no price and no address),
+    so the listing is retried instead of written empty.
+    """
+    if not info.price_text and not info.address:
+        raise RuntimeError("listing page did not load (no price or address)")
 
-    salesperson2 = data.get("salesperson2", "")
-    salesperson2_phone1 = data.get("salesperson2_phone1", "")
-    salesperson2_phone2 = data.get("salesperson2_phone2", "")
 
+# ChromeDriver messages meaning the browser itself is gone, not just the page
+BROWSER_LOST = ("chrome not reachable", "invalid session id", "disconnected", "session deleted")
 
-    #brokara
 
+def browser_lost(error) -> bool:
+    """
+    True if `error` says the browser died, so nothing more can be done with this driver.
+    """
+    return isinstance(error, WebDriverException) and any(m in str(error).lower() for m in BROWSER_LOST)
 
-    brokerage1 = data.get("brokerage1", "")
-    brokerage1_address = data.get("brokerage1_address", "")
-    brokerage1_tel = data.get("brokerage1_tel", "")
 
-    brokerage2 = data.get("brokerage2", "")
-    brokerage2_address = data.get("brokerage1_address", "")
-    brokerage2_tel = data.get("brokerage1_tel", "")
+def error_reason(error) -> str:
+    """
+    First line of an exception's message, for logs and job summaries.
+    """
+    return str(error).splitlines()[0] if str(error) else type(error).__name__
 
 
+def make_extractor(capture=None, html=False, cache=None, budget=20):
+    """
+    Returns extract(driver) -> Listing for the detail page in the current tab.
+    With `capture` (a NetworkCapture) the page's own API JSON is used when it was
+    captured; otherwise the DOM is read, either with per-element WebDriver queries
+    or, with html=True, from one page_source transfer parsed locally with lxml.
+    `cache` (a CardCache) lets the per-element reader skip cards it has already parsed.
+    `budget` is the hard time limit per listing in seconds, shared by every wait;
+    past it the extractor raises ListingIncomplete with the fields it has.
+    Callers that start the clock earlier (before the click / navigation) pass
+    extract(driver, deadline) with a Deadline(extract.budget).
+    """
+    fallback = get_listing_info_html if html else functools.partial(get_listing_info, cache=cache)
 
-    # Row in correct order
-    row = [
-        data.get("price", ""),
-        data.get("url", ""),
-        data.get("image", ""),
-        line1, city, province, postal,
-        salesperson1, phone1, phone2,
-        brokerage1, brokerage1_address,brokerage1_tel,
-        salesperson2, salesperson2_phone1, salesperson2_phone2,
-        brokerage2, brokerage2_address,brokerage2_tel
-        
-    ]
+    def extract(driver, deadline=None):
+        deadline = deadline or Deadline(budget)
+        if capture is not None:
+            url = driver.current_url
+            info = capture.listing(listing_id(Listing(url=url)), wait=min(3, deadline.remaining()))
+            if info is not None:
+                info.url = url
+                return info
+        return fallback(driver, deadline=deadline)
 
-    # Append row
-    ws.append(row)
+    extract.budget = budget
+    extract.capture = capture
+    return extract
 
-    # Auto-adjust column width
-    for col_idx, header in enumerate(headers, 1):
-        col_letter = get_column_letter(col_idx)
-        max_length = max(len(str(cell.value)) for cell in ws[col_letter])
-        ws.column_dimensions[col_letter].width = max(15, min(max_length + 2, 60))
 
-    wb.save(filename)
+# Selenium's default, restored after each listing's own limit
+PAGE_LOAD_TIMEOUT = 300
 
 
+def listing_deadline(extract) -> Deadline:
+    """
+    Starts a listing's clock; get_listing_info's default timeout for plain extractors.
+    """
+    return Deadline(getattr(extract, "budget", 10))
 
 
+@contextmanager
+def page_load_limit(driver, deadline):
+    """
+    Caps ChromeDriver's page-load wait (driver.get, and the implicit wait for a
+    pending navigation before each command) at what is left of the listing's budget.
+    """
+    driver.set_page_load_timeout(max(1, int(math.ceil(deadline.remaining()))))
+    try:
+        yield
+    finally:
+        try:
+            driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+        except Exception:
+            pass
 
 
+def with_url(info, url):
+    """
+    Fills in the listing's `url` when the tab was still loading and could not
+    report its own (the read timed out). Returns `info`.
+    """
+    if not info.url and url:
+        info.url = url
+    return info
 
-def _safe_text(el, default="-"):
-    try:
-        t = el.text.strip()
-        return t if t else default
-    except Exception:
-        return default
-
-
-
-def get_listing_info(driver, timeout=10):
-    wait = WebDriverWait(driver, timeout)
-    info = {
-        "image": "",
-        "price": "",
-        "address": "",
-        # Salesperson 1
-        "salesperson1": "-",
-        "salesperson1_phone1": "-",
-        "salesperson1_phone2": "-",
-        # Salesperson 2
-        "salesperson2": "-",
-        "salesperson2_phone1": "-",
-        "salesperson2_phone2": "-",
-        # Brokerage / office 1
-        "brokerage1": "-",
-        "brokerage1_address":"-",
-        "brokerage1_tel": "-",
-        # Brokerage / office 2
-        "brokerage2": "-",
-        "brokerage2_address":"-",
-        "brokerage2_tel": "-",
-        # optional
-        "url": ""
-    }
 
-    # ---- Basic single-element fields ----
+def extract_and_write(driver, extract, write, deadline, keep_partial=False, url=None):
+    """
+    Reads the detail page in the current tab and writes it. A listing that runs
+    out of its time budget raises ListingIncomplete so the caller queues it for
+    retry; with keep_partial=True (no retry queue) it is written with the fields
+    it got instead, as long as it has a price or address. Never both, so a retry
+    can't add a second row for the same listing.
+    """
     try:
-        img = wait.until(EC.presence_of_element_located((By.XPATH, "//*[@id='heroImage']")))
-        info["image"] = img.get_attribute("src") or ""
-    except Exception:
-        info["image"] = ""
+        with span("extract"):
+            info = extract(driver, deadline)
+    except ListingIncomplete as e:
+        if not keep_partial:
+            raise
+        info = e.listing
+    with_url(info, url)
+    check_loaded(info)
+    with span("write"):
+        write(info)
+
+
+def _open_and_scrape(driver, eachitem, href, write, log, on_failure, extract):
+    """
+    Opens one result card in a new tab, extracts and writes it, closes the tab.
+    Returns True if the listing was written.
+    """
+    ok = False
+    # The listing's budget covers the click and pauses too, not just extraction
+    deadline = listing_deadline(extract)
+    # Scroll into view before clicking
+    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", eachitem)
+    sleep(0.5)
 
     try:
-        price = wait.until(EC.presence_of_element_located((By.XPATH, "//*[@id='listingPriceValue']")))
-        info["price"] = _safe_text(price, default="")
-    except Exception:
-        info["price"] = ""
+        WebDriverWait(driver, min(10, deadline.remaining())).until(EC.element_to_be_clickable(eachitem))
+        ActionChains(driver).move_to_element(eachitem).click().perform()
+    except Exception as e:
+        log(f"⚠️ Click failed, trying JS click: {e}")
+        driver.execute_script("arguments[0].click();", eachitem)
 
-    try:
-        listingAddress = wait.until(EC.presence_of_element_located((By.XPATH, "//*[@id='listingAddress']")))
-        info["address"] = _safe_text(listingAddress, default="")
-    except Exception:
-        info["address"] = ""
+    sleep(1)
+    driver.switch_to.window(driver.window_handles[-1])
+    sleep(1)
 
-    # If you want page URL (current tab)
     try:
-        info["url"] = driver.current_url
-    except Exception:
-        info["url"] = ""
+        with page_load_limit(driver, deadline):
+            if href:
+                # The new tab may still be on about:blank under the "none" page-load strategy
+                wait_for_listing(driver, href, deadline)
+            extract_and_write(driver, extract, write, deadline, keep_partial=on_failure is None, url=href)
+        ok = True
+    except Exception as e:
+        if browser_lost(e):
+            raise
+        log(f"❌ cannot visit the item page {e}")
+        if on_failure is not None:
+            on_failure(href, e)
+    finally:
+        log("="*8)
 
-    # ---- Realtor cards (salespersons) ----
-    try:
-        realtor_cards = wait.until(
-            EC.presence_of_all_elements_located(
-                (By.XPATH, "//*[starts-with(@id,'realtorCard')]//div[contains(@class,'realtorCardCon card ')]")
-            )
-        )
-    except Exception:
-        realtor_cards = []
+    driver.close()
+    driver.switch_to.window(driver.window_handles[-1])
+    sleep(1)
+    return ok
 
-    # Extract up to 2 salespersons
-    for idx in range(2):
-        if idx < len(realtor_cards):
-            card = realtor_cards[idx]
-            # Name
-            try:
-                name_el = card.find_element(By.XPATH, ".//*[@class='realtorCardName']")
-                name = _safe_text(name_el, default="-")
-            except Exception:
-                name = "-"
-            # Telephones (may be multiple)
-            try:
-                phone_els = card.find_elements(By.XPATH, ".//*[@data-type='Telephone']")
-                phones = [p.text.strip() for p in phone_els if p.text.strip()]
-            except Exception:
-                phones = []
 
-            phone1 = phones[0] if len(phones) >= 1 else "-"
-            phone2 = phones[1] if len(phones) >= 2 else "-"
+def process(driver, sink=None, log=print, on_failure=None, extract=get_listing_info, prefetch=0):
+    """
+    Opens every listing on the current results page and writes it to `sink`
+    (defaults to append_to_excel). Returns the number of listings written.
+    Listings that fail are passed to `on_failure(url, error)`, e.g. RetryQueue.push.
+    `extract(driver)` reads the open detail page, see make_extractor.
+    With prefetch=N, the next N listings load in background tabs while one is extracted,
+    see process_prefetch.
+    """
+    write = sink.write if sink is not None else append_to_excel
 
-            if idx == 0:
-                info["salesperson1"] = name
-                info["salesperson1_phone1"] = phone1
-                info["salesperson1_phone2"] = phone2
-            else:
-                info["salesperson2"] = name
-                info["salesperson2_phone1"] = phone1
-                info["salesperson2_phone2"] = phone2
-        else:
-            # no card for this index -> keep defaults
-            pass
+    items = find_result_items(driver, log)
+    if not items:
+        log("Cannot load the main page, skipping.")
+        return 0
+    if prefetch > 0:
+        return process_prefetch(driver, write, log, on_failure, extract, prefetch)
 
-    # ---- Office / brokerage cards ----
-    try:
-        office_cards = wait.until(
-            EC.presence_of_all_elements_located((By.XPATH, "//*[starts-with(@id,'officeCard')]"))
-        )
-    except Exception:
-        office_cards = []
+    log(f"Total item {len(items)} found")
 
-    for idx in range(2):
-        if idx < len(office_cards):
-            card = office_cards[idx]
+    written = 0
+    for idx, eachitem in enumerate(items):
+        log(f"{idx+1} / {len(items)} running")
+        try:
+            href = eachitem.get_attribute("href") or ""
+        except Exception:
+            href = ""
 
-            # Office info text (contains brokerage name + 'Brokerage' + address lines)
-            try:
-                office_info_el = card.find_element(By.XPATH, ".//*[@class='officeCardTopLeft']")
-                office_info_text = _safe_text(office_info_el, default="-")
-            except Exception:
-                office_info_text = _safe_text(card, default="-")
+        with tracer.tag(url=href), span("listing"):
+            if _open_and_scrape(driver, eachitem, href, write, log, on_failure, extract):
+                written += 1
 
-            # Split into lines
-            lines = office_info_text.splitlines() if office_info_text and office_info_text != "-" else []
+    return written
 
-            # Brokerage name = first line
-            brokerage_name = lines[0].strip() if len(lines) > 0 else "-"
 
-            # Address = everything after the first 2 lines (skip brokerage name + "Brokerage")
-            brokerage_address = " ".join(line.strip() for line in lines[2:]) if len(lines) > 2 else "-"
+# ---------------- Prefetch ----------------
+# Navigates after the script returns, so ChromeDriver doesn't wait for the load.
+START_LOAD_JS = "setTimeout(function (u) { window.location.replace(u); }, 0, arguments[0]);"
 
-            # Office phone(s)
-            phones = []
-            try:
-                tel_els = card.find_elements(By.XPATH, ".//*[@class='officeCardContactNumber']")
-                if not tel_els:
-                    tel_els = card.find_elements(By.XPATH, ".//*[@data-type='Telephone']")
-                phones = [t.text.strip() for t in tel_els if t.text.strip()]
-            except Exception:
-                phones = []
 
-            brokerage_tel = phones[0] if len(phones) >= 1 else "-"
+def detail_tabs(driver, count):
+    """
+    Returns `count` background tab handles for detail pages, opening any that are
+    missing. The tabs are kept on the driver and reused by every results page.
+    """
+    origin = driver.current_window_handle
+    alive = set(driver.window_handles)
+    tabs = [h for h in getattr(driver, "detail_tabs", []) if h in alive and h != origin]
+    while len(tabs) < count:
+        driver.switch_to.new_window("tab")
+        tabs.append(driver.current_window_handle)
+    driver.switch_to.window(origin)
+    driver.detail_tabs = tabs
+    return tabs[:count]
 
-            # Assign to info dict
-            if idx == 0:
-                info["brokerage1"] = brokerage_name
-                info["brokerage1_address"] = brokerage_address
-                info["brokerage1_tel"] = brokerage_tel
-            else:
-                info["brokerage2"] = brokerage_name
-                info["brokerage2_address"] = brokerage_address
-                info["brokerage2_tel"] = brokerage_tel
 
+def start_load(driver, tab, url):
+    driver.switch_to.window(tab)
+    driver.execute_script(START_LOAD_JS, url)
 
-    return info
 
+def wait_for_listing(driver, url, deadline):
+    """
+    Waits until the current tab has navigated to `url` (by listing ID) and its
+    document is parsed (readyState past "loading"), so a reused tab is never read
+    while it still shows its previous page or half of the new one. Under the
+    "none" page-load strategy nothing else waits for that, and the html extractor
+    takes its one page_source as soon as the price shows.
+    """
+    target = listing_id(Listing(url=url))
+    while True:
+        if listing_id(Listing(url=driver.current_url)) == target and \
+                driver.execute_script(READY_STATE_JS) in ("interactive", "complete"):
+            return
+        if not deadline.remaining():
+            raise TimeoutException(f"tab did not finish navigating to {url}")
+        sleep(0.1)
 
 
+def process_prefetch(driver, write, log, on_failure, extract, window):
+    """
+    Pipelined process(): `window` + 1 reused tabs, listing k is extracted while
+    listings k+1..k+window are already loading in the others. Detail pages are
+    opened by URL instead of clicking the result cards. Returns the number written.
+    """
+    origin = driver.current_window_handle
+    urls = [u for u in dict.fromkeys(driver.execute_script(RESULT_HREFS_JS) or []) if u]
+    log(f"Total item {len(urls)} found (prefetching {window})")
+    if not urls:
+        return 0
 
+    def start(tab, url):
+        try:
+            start_load(driver, tab, url)
+        except Exception as e:
+            # Not fatal here: the listing fails on its own turn and reaches on_failure
+            log(f"[warn] could not start loading {url}: {e}")
 
+    tabs = detail_tabs(driver, window + 1)
+    for k, url in enumerate(urls[:len(tabs)]):
+        start(tabs[k], url)
 
-def process(driver):
+    written = 0
     try:
-        items = driver.find_elements(By.XPATH, "//*[@data-binding='href=DetailsURL']")
-    except Exception:
-        print("Cannot load the main page...")
-        while True:
-            input("refresh ?")
-            driver.refresh()
-            time.sleep(2)
-            process(driver)  
-
-    while items == []:
-        print("Cannot load the main page...")
-        while True:
-            input("refresh ?")
-            driver.refresh()
-            time.sleep(2)
-            process(driver) 
+        for k, url in enumerate(urls):
+            log(f"{k+1} / {len(urls)} running")
+            tab = tabs[k % len(tabs)]
+            with tracer.tag(url=url), span("listing"):
+                try:
+                    deadline = listing_deadline(extract)
+                    driver.switch_to.window(tab)
+                    with page_load_limit(driver, deadline):
+                        wait_for_listing(driver, url, deadline)
+                        extract_and_write(driver, extract, write, deadline,
+                                          keep_partial=on_failure is None, url=url)
+                    written += 1
+                except Exception as e:
+                    if browser_lost(e):
+                        raise
+                    log(f"❌ cannot visit the item page {e}")
+                    if on_failure is not None:
+                        on_failure(url, e)
+                finally:
+                    log("="*8)
+
+            # This tab is free again: start the listing `window` + 1 ahead in it
+            if k + len(tabs) < len(urls):
+                start(tab, urls[k + len(tabs)])
+    finally:
+        # Park the tabs so nothing keeps loading (or is mistaken for the next page's listing)
+        for tab in tabs:
+            try:
+                start_load(driver, tab, "about:blank")
+            except Exception:
+                pass
+        driver.switch_to.window(origin)
+    return written
+
+
+# One round trip per results page: every card's link, price, address and thumbnail.
+RESULT_CARDS_JS = """
+const out = [], seen = new Set();
+for (const a of document.querySelectorAll("[data-binding='href=DetailsURL']")) {
+    if (!a.href || seen.has(a.href)) continue;
+    seen.add(a.href);
+    const card = a.closest(".cardCon, .smallListingCard, [class*='listingCard']") || a.parentElement;
+    const pick = (sels) => { for (const s of sels) { const el = card.querySelector(s); if (el) return el; } return null; };
+    const price = pick([".listingCardPrice", "[class*='Price']"]);
+    const address = pick([".listingCardAddress", "[class*='Address']"]);
+    const img = pick(["img.gridViewListingImage", "img"]);
+    out.push({
+        url: a.href,
+        price: price ? price.innerText.trim() : "",
+        address: address ? address.innerText.trim() : "",
+        image: img ? (img.currentSrc || img.src || "") : "",
+    });
+}
+return out;
+"""
+
+
+def card_to_listing(card: dict) -> Listing:
+    info = Listing(url=card.get("url", ""), image=card.get("image", ""))
+    info.set_price(card.get("price", ""))
+    address = card.get("address", "")
+    # Cards show "line1, City, Province POSTAL" on one line; the detail page splits line1 off
+    if "\n" not in address and address.count(",") >= 2:
+        address = address.replace(", ", "\n", 1)
+    info.set_address(address)
+    return info
 
-    print(f"Total item {len(items)} found")
 
-    for idx, eachitem in enumerate(items):
-        print(f"{idx+1} / {len(items)} running")        
+def visit_detail(driver, url, extract=get_listing_info, keep_partial=False):
+    """
+    Opens `url` in a new tab, extracts it, closes the tab and returns to the previous one.
+    With keep_partial, a listing that runs out of time is returned as far as it was read.
+    """
+    origin = driver.current_window_handle
+    driver.switch_to.new_window("tab")
+    try:
+        deadline = listing_deadline(extract)
+        with page_load_limit(driver, deadline):
+            driver.get(url)
+            wait_for_listing(driver, url, deadline)
+            try:
+                info = extract(driver, deadline)
+            except ListingIncomplete as e:
+                if not keep_partial:
+                    raise
+                info = e.listing
+        with_url(info, url)
+        check_loaded(info)
+        return info
+    finally:
+        driver.close()
+        driver.switch_to.window(origin)
 
-        # Scroll into view before clicking
-        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", eachitem)
-        time.sleep(0.5)
 
+def process_cards(driver, sink=None, log=print, detail="none", delta=None, on_failure=None,
+                  extract=get_listing_info):
+    """
+    List-only mode: reads all result cards on the current page with one script call
+    and writes them without opening detail pages. With detail="changed" and a
+    DeltaSink, detail pages are opened only for new listings or changed prices.
+    Returns the number of listings written.
+    """
+    write = sink.write if sink is not None else append_to_excel
+    if not find_result_items(driver, log):
+        log("Cannot load the main page, skipping.")
+        return 0
+
+    cards = [card_to_listing(c) for c in driver.execute_script(RESULT_CARDS_JS) or []]
+    log(f"Total item {len(cards)} found (list-only)")
+
+    written = 0
+    for card in cards:
+        if detail == "changed" and delta is not None and not delta.needs_detail(card):
+            delta.touch(card)
+            continue
+        info = card
+        if detail == "changed":
+            try:
+                info = visit_detail(driver, card.url, extract, keep_partial=on_failure is None)
+            except Exception as e:
+                if browser_lost(e):
+                    raise
+                log(f"❌ cannot visit the item page {e}")
+                if on_failure is not None:
+                    on_failure(card.url, e)
+                continue
         try:
-            WebDriverWait(driver, 10).until(EC.element_to_be_clickable(eachitem))
-            ActionChains(driver).move_to_element(eachitem).click().perform()
+            with span("write", url=card.url):
+                write(info)
+            written += 1
         except Exception as e:
-            print(f"⚠️ Click failed, trying JS click: {e}")
-            driver.execute_script("arguments[0].click();", eachitem)
+            log(f"❌ cannot write {card.url}: {e}")
+            if on_failure is not None:
+                on_failure(card.url, e)
+    return written
 
-        time.sleep(1)
-        driver.switch_to.window(driver.window_handles[-1])
-        time.sleep(1)
 
-        try:
-            info = get_listing_info(driver, timeout=10)
-            append_to_excel(info)
-        except Exception as e:
-            print(f"❌ cannot visit the item page {e}")
-        finally:
-            print("="*8)
+def startbrowser(url):
+    """Create driver, open url, return driver."""
+    driver = init_driver()
+    driver.get(url)
+    return driver
 
-        driver.close()
-        driver.switch_to.window(driver.window_handles[-1])
-        time.sleep(1)
+
+# ---------------- Pagination Logic ----------------
+RESULTS_PER_PAGE = 12
+
+RESULT_HREFS_JS = """
+return Array.from(document.querySelectorAll("[data-binding='href=DetailsURL']"), a => a.href);
+"""
 
 
+def scrape_page(driver, pagecount, sink, log, on_failure, extract, list_only=None, delta=None, prefetch=0):
+    """
+    Scrapes the results page currently shown. Returns the number of listings written.
+    """
+    with span("page", page=pagecount):
+        capture = getattr(extract, "capture", None)
+        if capture is not None:
+            # While the results tab is current: its search JSON can only be read from here
+            capture.poll()
+        if list_only:
+            return process_cards(driver, sink=sink, log=log, detail=list_only, delta=delta,
+                                 on_failure=on_failure, extract=extract)
+        return process(driver, sink=sink, log=log, on_failure=on_failure, extract=extract, prefetch=prefetch)
 
 
+# How a pagination loop ended; anything else is the reason a crawl was cut short
+LAST_PAGE = "last page"
+PAGE_LIMIT = "page limit"
+STOPPED = "stopped"
 
 
+def page_url(url, page):
+    """
+    The map URL with CurrentPage=<page> in its hash state.
+    """
+    base, _, state = url.partition("#")
+    params = [p for p in state.split("&") if p and not p.startswith("CurrentPage=")]
+    params.append(f"CurrentPage={page}")
+    return f"{base}#{'&'.join(params)}"
 
 
-def startbrowser(url):
-    """Create driver, open url, return driver."""
-    driver = init_driver()
-    driver.get(url)
-    return driver
+def results_signature(driver):
+    """
+    Detail links of the results currently listed, in order; () if none.
+    """
+    try:
+        return tuple(dict.fromkeys(driver.execute_script(RESULT_HREFS_JS) or []))
+    except Exception:
+        return ()
 
 
-# ---------------- Pagination Logic ----------------
-def pagination(driver, log, stop_event):
+def total_results(driver):
+    try:
+        text = driver.find_element(By.ID, "mapResultsNumVal").text
+        return int(re.sub(r"[^\d]", "", text) or 0) or None
+    except Exception:
+        return None
+
+
+def wait_for_results(driver, previous=(), timeout=20):
+    """
+    Waits until the results list is non-empty and differs from `previous` (a
+    results_signature). Returns the new signature, or () if it never changed.
+    """
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        signature = results_signature(driver)
+        if signature and signature != previous:
+            return signature
+        sleep(0.5)
+    return ()
+
+
+def goto_page(driver, url, page, previous=(), timeout=20):
+    """
+    Opens results page `page` directly by rewriting CurrentPage in the URL hash,
+    then waits until the list is non-empty and differs from `previous`.
+    Returns the new results signature, or () if the results never changed.
+    """
+    target = page_url(url, page)
+    with span("goto_page", page=page):
+        if driver.current_url.partition("#")[0] == target.partition("#")[0]:
+            # Same map page: a hash change re-runs the search without a reload
+            driver.execute_script("window.location.hash = arguments[0];", target.partition("#")[2])
+        else:
+            driver.get(target)
+        return wait_for_results(driver, previous, timeout)
+
+
+def pagination_by_url(driver, url, log, stop_event, sink=None, start_page=1, stride=1, max_pages=None,
+                      on_failure=None, extract=get_listing_info, list_only=None, delta=None, prefetch=0,
+                      on_page=None):
+    """
+    Like pagination(), but reaches each page through the URL hash instead of
+    clicking Next: pages start_page, start_page + stride, ... so a crawl can resume
+    at any page and one search can be split across workers. Stops past the last
+    page (from the result count), after `max_pages` pages, or when the results
+    don't change. Returns (pages visited, listings written, why it ended), see pagination.
+    `on_page(load_time, first)` runs right after each page opens (e.g. check_page);
+    a SessionBlocked from it is passed on to the caller.
+    """
+    page = start_page
+    visited = written = 0
+    previous = ()
+    last_page = None
+    end = STOPPED
+    first = True
+
+    while not stop_event.is_set():
+        if max_pages and visited >= max_pages:
+            log(f"Reached page limit ({max_pages}). Stopping.")
+            end = PAGE_LIMIT
+            break
+        if last_page is not None and page > last_page:
+            log(f"Past the last page ({last_page}). Stopping.")
+            end = LAST_PAGE
+            break
+        try:
+            started = time.time()
+            try:
+                signature = goto_page(driver, url, page, previous)
+            finally:
+                # Checked even when the page didn't load: a block page has no results either
+                if on_page is not None:
+                    on_page(time.time() - started, first)
+                first = False
+            if not signature:
+                # Not treated as the end: the site may just have ignored the page parameter
+                log(f"[warn] Page {page}: results did not change. Stopping.")
+                end = f"page {page} did not load"
+                break
+            if last_page is None:
+                total = total_results(driver)
+                if total:
+                    last_page = -(-total // RESULTS_PER_PAGE)
+                    log(f"total item {total} ({last_page} pages)")
+
+            log(f"Opened page {page} by URL")
+            written += scrape_page(driver, page, sink, log, on_failure, extract, list_only, delta, prefetch)
+            visited += 1
+            previous = signature
+            page += stride
+
+        except SessionBlocked:
+            raise
+        except WebDriverException as e:
+            if browser_lost(e):
+                raise
+            log(f"[webdriver] {e}")
+            end = f"page {page}: {error_reason(e)}"
+            break
+        except Exception as e:
+            log(f"[error] {e}\n{traceback.format_exc()}")
+            end = f"page {page}: {error_reason(e)}"
+            break
+
+    log("Pagination loop finished.")
+    return visited, written, end
+
+
+def pagination(driver, log, stop_event, sink=None, max_pages=None, on_failure=None,
+               extract=get_listing_info, list_only=None, delta=None, prefetch=0, on_page=None):
+    """
+    Scrapes the current results page, clicks Next, repeats until the last page,
+    `max_pages` pages, or a stop request. Returns (pages visited, listings written,
+    why it ended): LAST_PAGE once the last results page was scraped, PAGE_LIMIT,
+    STOPPED, or what went wrong (a timeout, an error) for a crawl cut short.
+    `list_only` ("none" / "changed") scrapes result cards instead, see process_cards.
+    `prefetch` is the number of detail pages loaded ahead in background tabs, see process.
+    `on_page(None, False)` runs after each Next click (the caller checks the first page
+    itself); a SessionBlocked from it is passed on.
+    """
     try:
         total = driver.find_element(By.ID, "mapResultsNumVal").text
         log(f"total item {total}")
@@ -480,16 +842,22 @@ def pagination(driver, log, stop_event):
         log(f"[warn] Could not read total mapResultsNumVal: {e}")
 
     pagecount = 1
+    written = 0
+    end = STOPPED
     while not stop_event.is_set():
         log(f"Clicked Next page  {pagecount}")
         try:
             # replace with your actual scraping logic
-            time.sleep(3)
+            sleep(3)
 
-            process(driver)
+            written += scrape_page(driver, pagecount, sink, log, on_failure, extract, list_only, delta, prefetch)
 
+            if max_pages and pagecount >= max_pages:
+                log(f"Reached page limit ({max_pages}). Stopping.")
+                end = PAGE_LIMIT
+                break
 
-            time.sleep(3)
+            sleep(3)
 
             wait = WebDriverWait(driver, 15)
             next_btn = wait.until(
@@ -499,25 +867,259 @@ def pagination(driver, log, stop_event):
             aria_label = next_btn.get_attribute("aria-label") or ""
             if "disabled" in aria_label.lower():
                 log("Next button is disabled. Stopping.")
+                end = LAST_PAGE
                 break
 
+            previous = results_signature(driver)
             driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", next_btn)
             next_btn.click()
             log("Clicked Next Page")
+            sleep(5)
+            # The list re-renders asynchronously; never scrape the previous page's cards again
+            if not wait_for_results(driver, previous):
+                log(f"[warn] Page {pagecount + 1}: results did not change. Stopping; the crawl is incomplete.")
+                end = f"page {pagecount + 1} did not load"
+                break
             pagecount += 1
-            time.sleep(5)
+            if on_page is not None:
+                on_page(None, False)
 
+        except SessionBlocked:
+            raise
         except TimeoutException:
-            log("No more Next button found (timeout). Stopping.")
+            # A slow page, not necessarily the last one: only a disabled Next button ends the crawl
+            log("No Next button found (timeout). Stopping; the crawl is incomplete.")
+            end = f"page {pagecount}: no Next button (timeout)"
             break
         except WebDriverException as e:
+            if browser_lost(e):
+                raise
             log(f"[webdriver] {e}")
+            end = f"page {pagecount}: {error_reason(e)}"
             break
         except Exception as e:
             log(f"[error] {e}\n{traceback.format_exc()}")
+            end = f"page {pagecount}: {error_reason(e)}"
             break
 
     log("Pagination loop finished.")
+    return pagecount, written, end
+
+
+def open_job_sink(output, state=None, images=None, writer=None, entities=None):
+    """
+    Builds the sink chain for one output: [DeltaSink ->] [ImageSink ->] [EntitySink ->] file sink.
+    With `writer` (a writer service address) rows go to that service instead of the file.
+    With `entities` (an EntityStore) rows reference agents / brokerages by key.
+    Returns (sink, delta) where delta is the DeltaSink or None.
+    """
+    columns = DELTA_COLUMNS if state else ()
+    sink = WriterClient(writer, output, columns) if writer else open_sink(output, columns)
+    if entities is not None:
+        sink = EntitySink(sink, entities)
+    if images is not None:
+        sink = ImageSink(sink, images)
+    delta = None
+    if state:
+        # Only new / changed listings reach the output (and the image stage)
+        delta = sink = DeltaSink(sink, state)
+    return sink, delta
+
+
+def retry_failed(driver, retry, write, log, stop_event, job=None, max_wait=120, extract=get_listing_info,
+                 on_give_up=None):
+    """
+    Re-visits queued detail pages directly by URL and hands each recovered
+    Listing to `write(entry, info)`. Entries still backing off are waited for
+    if due within `max_wait` seconds. Returns the number recovered.
+    Listings out of attempts are passed to `on_give_up(url, error)`.
+    If the browser dies, the error is re-raised with the listing left queued as it
+    was, so the scheduler replaces the driver instead of burning every attempt on it.
+    """
+    recovered = 0
+    while not stop_event.is_set():
+        due = retry.due(job)
+        if not due:
+            next_at = retry.next_due(job)
+            if next_at is None or next_at - time.time() > max_wait:
+                break
+            stop_event.wait(max(0.0, next_at - time.time()))
+            continue
+
+        for entry in due:
+            if stop_event.is_set():
+                break
+            log(f"[retry] attempt {entry['attempts'] + 1}: {entry['url']}")
+            try:
+                with tracer.tag(url=entry["url"]), span("retry", attempt=entry["attempts"] + 1):
+                    deadline = listing_deadline(extract)
+                    with page_load_limit(driver, deadline):
+                        driver.get(entry["url"])
+                        wait_for_listing(driver, entry["url"], deadline)
+                        with span("extract"):
+                            info = extract(driver, deadline)
+                    with_url(info, entry["url"])
+                    check_loaded(info)
+                    with span("write"):
+                        write(entry, info)
+                retry.done(entry["url"])
+                recovered += 1
+            except Exception as e:
+                if browser_lost(e):
+                    log(f"[retry] browser lost, stopping: {e}")
+                    raise
+                if not retry.push(entry["url"], e):
+                    log(f"[retry] giving up on {entry['url']}: {e}")
+                    if on_give_up is not None:
+                        on_give_up(entry["url"], e)
+                    if isinstance(e, ListingIncomplete):
+                        # Out of retries: keep what the last attempt read rather than nothing
+                        try:
+                            info = with_url(e.listing, entry["url"])
+                            check_loaded(info)
+                            write(entry, info)
+                        except Exception:
+                            pass
+    return recovered
+
+
+def check_page(driver, load_time=None, first=False):
+    """
+    Bot-check test on a results page. Reports the outcome to the driver's session
+    and egress identity (when it has them) and raises SessionBlocked on a block
+    page. Only the first page's load time counts towards the session stats.
+    """
+    session = getattr(driver, "browser_session", None)
+    egress = getattr(driver, "egress", None)
+    if session is None and egress is None:
+        return
+    blocked = looks_blocked(driver)
+    if egress is not None:
+        egress.pool.report(egress, ok=not blocked, latency=load_time, blocked=blocked)
+    if session is not None:
+        session.check(driver, load_time if first else None, blocked)
+    elif blocked:
+        raise SessionBlocked(f"{egress.name} hit a bot check")
+
+
+def run_job(driver, job, log, stop_event, images=None, retry=None, capture=False, html=False, writer=None,
+            entities=None, cache=None, prefetch=0, budget=20):
+    """
+    JobScheduler callback: opens the job's search URL and paginates it into the job's output.
+    With `images` (an ImageDownloader), hero images are downloaded in the background.
+    With `retry` (a RetryQueue), failed listings are queued and retried once pagination ends.
+    With `capture`, listings are read from the site's XHR JSON (driver needs init_driver(capture=True)).
+    With `html`, the DOM fallback parses page_source locally instead of querying each element.
+    With `writer`, rows are sent to the writer service at that address (see writer.py).
+    With `entities` / `cache`, see open_job_sink / make_extractor.
+    With `prefetch`, that many detail pages load ahead in reused background tabs.
+    `budget` is the time limit per listing, see make_extractor.
+    A crawl cut short (timeout, error) or that wrote nothing sets job.incomplete
+    to the reason, and the scheduler reports the job as incomplete instead of done.
+    """
+    if tracer.enabled:
+        tracer.instrument(driver)
+    extract = make_extractor(NetworkCapture(driver) if capture else None, html, cache, budget)
+    session = getattr(driver, "browser_session", None)
+    sink, delta = open_job_sink(job.output, job.state, images, writer, entities)
+    # Listings that failed to load this run: they were on the site, so never "removed"
+    failed = set()
+
+    def on_failure(url, e):
+        failed.add(listing_id(Listing(url=url)))
+        if retry is not None:
+            retry.push(url, e, job=job.name, output=job.output, state=job.state)
+        elif isinstance(e, ListingIncomplete) and (e.listing.price_text or e.listing.address):
+            # Nothing will retry it: keep the fields it got (as check_loaded would)
+            sink.write(with_url(e.listing, url))
+
+    def on_give_up(url, e):
+        failed.add(listing_id(Listing(url=url)))
+
+    # Every results page is bot-checked and feeds the egress identity's stats
+    on_page = functools.partial(check_page, driver)
+
+    end = None
+    try:
+        with tracer.tag(job=job.name, worker=threading.current_thread().name), span("job"):
+            if job.paging == "url":
+                job.pages, job.items, end = pagination_by_url(
+                    driver, job.url, log, stop_event, sink=sink, start_page=job.start_page,
+                    stride=job.stride, max_pages=job.max_pages, on_failure=on_failure,
+                    extract=extract, list_only=job.list_only, delta=delta, prefetch=prefetch,
+                    on_page=on_page)
+            else:
+                started = time.time()
+                previous = driver.current_url
+                driver.get(job.url)
+                if not wait_for_page(driver, job.url, previous):
+                    log(f"[warn] {job.name}: results page still loading after 30s")
+                check_page(driver, time.time() - started, first=True)
+                job.pages, job.items, end = pagination(driver, log, stop_event, sink=sink,
+                                                               max_pages=job.max_pages, on_failure=on_failure,
+                                                               extract=extract, list_only=job.list_only,
+                                                               delta=delta, prefetch=prefetch, on_page=on_page)
+            if retry is not None and not stop_event.is_set():
+                job.items += retry_failed(driver, retry, lambda entry, info: sink.write(info),
+                                          log, stop_event, job=job.name, extract=extract, on_give_up=on_give_up)
+            if not stop_event.is_set():
+                if end not in (LAST_PAGE, PAGE_LIMIT):
+                    job.incomplete = end
+                elif not job.items:
+                    job.incomplete = "no listings written"
+        if session is not None and not stop_event.is_set():
+            session.save(driver)
+    except Exception as e:
+        if session is not None and not session.blocked:
+            session.failed()
+        egress = getattr(driver, "egress", None)
+        if egress is not None and not isinstance(e, SessionBlocked):
+            egress.pool.report(egress, ok=False)
+        raise
+    finally:
+        if delta is not None:
+            # Removals are only trustworthy when every page was crawled
+            delta.complete = end == LAST_PAGE and not stop_event.is_set()
+            delta.seen.update(failed)
+            if retry is not None:
+                # Still-failing listings were on the site, they just didn't load
+                for entry in retry.pending(job.name):
+                    delta.seen.add(listing_id(Listing(url=entry["url"])))
+            job.delta = delta.stats
+        sink.close()
+
+
+def run_retry_pass(driver, retry, log, stop_event, images=None, extract=get_listing_info, writer=None,
+                   entities=None):
+    """
+    Retries every queued listing (from any job) with this driver, writing each
+    into the output / state it was queued for. Returns the number recovered.
+    A browser that dies ends the pass; the rest stay queued for the next run.
+    """
+    sinks = {}
+    recovered = 0
+
+    def write(entry, info):
+        nonlocal recovered
+        key = (entry.get("output") or DEFAULT_OUTPUT, entry.get("state"))
+        if key not in sinks:
+            sinks[key] = open_job_sink(key[0], key[1], images, writer, entities)
+        sinks[key][0].write(info)
+        recovered += 1
+
+    log(f"[retry] {len(retry)} listing(s) queued")
+    try:
+        return retry_failed(driver, retry, write, log, stop_event, extract=extract)
+    except WebDriverException as e:
+        if not browser_lost(e):
+            raise
+        log(f"[retry] {len(retry)} listing(s) left queued")
+        return recovered
+    finally:
+        for sink, delta in sinks.values():
+            if delta is not None:
+                delta.complete = False  # a retry pass never sees the whole region
+            sink.close()
 
 
 
@@ -526,24 +1128,25 @@ def pagination(driver, log, stop_event):
 
 # ---------------- UI ----------------
 class App(ctk.CTk):
-    def __init__(self, driver):
+    def __init__(self, driver, writer=None):
         super().__init__()
 
         ctk.set_appearance_mode("dark")
         ctk.set_default_color_theme("dark-blue")
 
         self.title("Realtor.ca Pagination Controller")
-        self.geometry("880x560")
+        self.geometry("880x720")
 
         # State
         self.driver = driver
+        self.writer = writer
         self.worker = None
         self.stop_event = threading.Event()
         self._lock = threading.Lock()
 
         # Layout
         self.grid_columnconfigure(0, weight=1)
-        self.grid_rowconfigure(3, weight=1)
+        self.grid_rowconfigure(4, weight=1)
 
         # Header
         self.header = ctk.CTkFrame(self, corner_radius=16)
@@ -587,9 +1190,28 @@ class App(ctk.CTk):
         self.quit_btn = ctk.CTkButton(self.controls, text="✕ Quit", command=self.safe_quit)
         self.quit_btn.grid(row=0, column=3, padx=8, pady=12, sticky="ew")
 
+        # Jobs
+        self.jobs_frame = ctk.CTkFrame(self, corner_radius=16)
+        self.jobs_frame.grid(row=3, column=0, sticky="ew", padx=16, pady=8)
+        self.jobs_frame.grid_columnconfigure(0, weight=1)
+
+        self.jobs_box = ctk.CTkTextbox(self.jobs_frame, height=110)
+        self.jobs_box.grid(row=0, column=0, rowspan=3, sticky="ew", padx=12, pady=12)
+        self.jobs_box.insert("end", "# one search per line: <url> priority=0 output=scrapper.xlsx max_pages=5\n")
+
+        self.load_jobs_btn = ctk.CTkButton(self.jobs_frame, text="Load Jobs File", command=self.load_jobs_file)
+        self.load_jobs_btn.grid(row=0, column=1, padx=8, pady=(12, 4), sticky="ew")
+
+        self.concurrency_entry = ctk.CTkEntry(self.jobs_frame, placeholder_text="Concurrency")
+        self.concurrency_entry.grid(row=1, column=1, padx=8, pady=4, sticky="ew")
+        self.concurrency_entry.insert(0, "1")
+
+        self.run_jobs_btn = ctk.CTkButton(self.jobs_frame, text="▶ Run Jobs", command=self.start_jobs)
+        self.run_jobs_btn.grid(row=2, column=1, padx=8, pady=(4, 12), sticky="ew")
+
         # Log
-        self.log_box = ctk.CTkTextbox(self, height=380)
-        self.log_box.grid(row=3, column=0, sticky="nsew", padx=16, pady=16)
+        self.log_box = ctk.CTkTextbox(self, height=300)
+        self.log_box.grid(row=4, column=0, sticky="nsew", padx=16, pady=16)
 
     # ---------- Helpers ----------
     def set_status(self, text, color="#9ca3af"):
@@ -627,8 +1249,70 @@ class App(ctk.CTk):
         self.worker.start()
 
     def _run_pagination(self):
+        sink = None
         try:
-            pagination(self.driver, self.log, self.stop_event)
+            if self.writer:
+                sink = WriterClient(self.writer, DEFAULT_OUTPUT)
+            pagination(self.driver, self.log, self.stop_event, sink=sink)
+        except Exception as e:
+            self.log(f"[fatal] {e}\n{traceback.format_exc()}")
+        finally:
+            if sink is not None:
+                sink.close()
+            self.set_status("idle", "#9ca3af")
+
+    def load_jobs_file(self):
+        path = filedialog.askopenfilename(
+            title="Load jobs",
+            filetypes=[("Job lists", "*.json *.jsonl *.txt"), ("All files", "*.*")],
+        )
+        if not path:
+            return
+        try:
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+            jobs = parse_jobs(text)
+        except Exception as e:
+            self.log(f"[error] Could not load jobs from {path}: {e}")
+            return
+        self.jobs_box.delete("1.0", "end")
+        self.jobs_box.insert("end", text)
+        self.log(f"Loaded {len(jobs)} job(s) from {path}")
+
+    def start_jobs(self):
+        if self.worker and self.worker.is_alive():
+            self.log("[info] Worker already running.")
+            return
+        try:
+            jobs = parse_jobs(self.jobs_box.get("1.0", "end"))
+        except Exception as e:
+            self.log(f"[error] Bad job list: {e}")
+            return
+        if not jobs:
+            self.log("[warn] Job list is empty.")
+            return
+        try:
+            concurrency = int(self.concurrency_entry.get().strip() or 1)
+        except ValueError:
+            self.log("[warn] Concurrency must be a number.")
+            return
+
+        self.stop_event.clear()
+        self.set_status(f"running {len(jobs)} jobs", "#22c55e")
+        self.worker = threading.Thread(target=self._run_jobs, args=(jobs, concurrency), daemon=True)
+        self.worker.start()
+
+    def _run_jobs(self, jobs, concurrency):
+        try:
+            scheduler = JobScheduler(
+                jobs, functools.partial(run_job, writer=self.writer),
+                driver_factory=init_driver,
+                concurrency=concurrency,
+                drivers=[self.driver] if self.driver else [],
+                log=self.log,
+                stop_event=self.stop_event,
+            )
+            scheduler.run()
         except Exception as e:
             self.log(f"[fatal] {e}\n{traceback.format_exc()}")
         finally:
@@ -656,11 +1340,177 @@ class App(ctk.CTk):
 
 
 # ---------------- Main ----------------
-def main():
+def run_cli(args):
+    """
+    Runs a job file and/or a retry pass without the UI. Returns the totals dict.
+    """
+    egress = load_egress(args.egress) if args.egress else None
+    images = None
+    if args.images:
+        images = ImageDownloader(
+            args.images,
+            concurrency=args.image_workers,
+            thumbnail=parse_size(args.thumbnail) if args.thumbnail else None,
+            egress=egress.acquire(browser=False) if egress is not None else None,
+        )
+    retry = RetryQueue(args.retry_file)
+    entities = EntityStore(args.entities) if args.entities else None
+    cache = CardCache()
+    sessions = SessionStore(args.sessions, profile=args.session_profile) if args.sessions else None
+    stop_event = threading.Event()
+
+    def new_driver():
+        return init_driver(headless=args.headless, capture=args.capture, page_load=args.page_load,
+                           session=sessions.checkout() if sessions is not None else None,
+                           egress=egress.acquire() if egress is not None else None)
+
+    totals = {}
+
+    profiler = Profiler() if args.profile else None
+    job_runner = functools.partial(run_job, images=images, retry=retry, capture=args.capture,
+                                   html=args.extractor == "html", writer=args.writer,
+                                   entities=entities, cache=cache, prefetch=args.prefetch,
+                                   budget=args.listing_budget)
+    retry_runner = functools.partial(run_retry_pass, writer=args.writer, entities=entities)
+    if profiler is not None:
+        job_runner = profiler.wrap(job_runner)
+        retry_runner = profiler.wrap(retry_runner)
+
+    try:
+        if args.trace:
+            tracer.enable()
+        if args.jobs:
+            jobs = load_jobs(args.jobs)
+            logger.info(f"Loaded {len(jobs)} job(s) from {args.jobs}")
+            for job in jobs:
+                if args.list_only:
+                    job.list_only = job.list_only or args.list_only
+                if args.url_paging:
+                    job.paging = "url"
+            history = None
+            if args.budget or args.history:
+                history = CrawlHistory(args.history or DEFAULT_HISTORY_FILE)
+            if args.budget:
+                jobs, _ = plan(jobs, history, args.budget, log=logger.info)
+            scheduler = JobScheduler(
+                jobs, job_runner,
+                driver_factory=new_driver,
+                concurrency=args.concurrency,
+                log=logger.info,
+                stop_event=stop_event,
+            )
+            totals = scheduler.run()
+            if history is not None:
+                history.record_all(scheduler.jobs)
+                history.save()
+
+        if args.retry_pass and len(retry) and not stop_event.is_set():
+            # Fresh driver: whatever state broke the first attempt is left behind
+            driver = new_driver()
+            if tracer.enabled:
+                tracer.instrument(driver)
+            try:
+                extract = make_extractor(NetworkCapture(driver) if args.capture else None,
+                                         args.extractor == "html", cache, args.listing_budget)
+                totals["recovered"] = retry_runner(driver, retry, logger.info, stop_event, images, extract)
+            finally:
+                driver.quit()
+    except KeyboardInterrupt:
+        stop_event.set()
+        logger.info("Interrupted, waiting for running jobs to stop...")
+    finally:
+        if images is not None:
+            images.close()
+        if sessions is not None:
+            logger.info(sessions.report())
+        if entities is not None:
+            entities.save()
+            logger.info(f"[entities] {len(entities.agents)} agents, {len(entities.brokerages)} brokerages "
+                        f"in {args.entities}; card cache hits={cache.stats['hits']} misses={cache.stats['misses']}")
+        if egress is not None:
+            logger.info(egress.report_text())
+        if args.trace:
+            tracer.disable()
+            count = tracer.export(args.trace)
+            logger.info(f"Wrote {count} trace events to {args.trace} (open in chrome://tracing or ui.perfetto.dev)")
+        if profiler is not None:
+            logger.info(f"Profile written to {args.profile}\n{profiler.dump(args.profile)}")
+
+    if len(retry):
+        logger.info(f"{len(retry)} listing(s) still queued for retry in {args.retry_file}")
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Realtor.ca scraper")
+    parser.add_argument("--jobs", help="job file (JSON array, JSON lines, or one URL per line); runs without the UI")
+    parser.add_argument("--concurrency", type=int, default=1, help="max jobs running at once (one Chrome each)")
+    parser.add_argument("--headless", action="store_true", help="run Chrome headless (job mode)")
+    parser.add_argument("--images", metavar="DIR", help="also download hero images into DIR (job mode)")
+    parser.add_argument("--image-workers", type=int, default=8, help="concurrent image downloads")
+    parser.add_argument("--thumbnail", metavar="WxH", help="also write JPEG thumbnails, e.g. 320x240 (needs Pillow)")
+    parser.add_argument("--capture", action="store_true",
+                        help="read listings from the site's own XHR JSON (Chrome network log), DOM as fallback")
+    parser.add_argument("--extractor", choices=("dom", "html"), default="dom",
+                        help="dom: WebDriver query per field; html: one page_source transfer parsed with lxml")
+    parser.add_argument("--url-paging", action="store_true",
+                        help="open result pages directly via the URL hash instead of clicking Next")
+    parser.add_argument("--prefetch", type=int, default=0, metavar="N",
+                        help="load the next N detail pages in reused background tabs while one is extracted")
+    parser.add_argument("--page-load", choices=PAGE_LOAD_STRATEGIES, default="normal",
+                        help="Chrome page-load strategy: eager / none stop waiting for images, ads and trackers")
+    parser.add_argument("--listing-budget", type=float, default=20, metavar="SECONDS",
+                        help="hard time limit per listing; slower listings are retried, or written as far as read")
+    parser.add_argument("--list-only", choices=("none", "changed"),
+                        help="scrape result cards only; 'changed' still opens new/changed listings (needs job state)")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="record navigation/wait/find/script/write/sleep spans as Chrome trace-event JSON")
+    parser.add_argument("--profile", metavar="FILE", help="run jobs under cProfile and dump merged stats to FILE")
+    parser.add_argument("--writer", metavar="ADDR",
+                        help="send rows to a writer service (python writer.py) at host:port or unix:/path.sock")
+    parser.add_argument("--sessions", metavar="DIR", nargs="?", const=DEFAULT_SESSION_DIR,
+                        help=f"save and reuse browser sessions (cookies, localStorage) in DIR (default {DEFAULT_SESSION_DIR})")
+    parser.add_argument("--session-profile", action="store_true",
+                        help="with --sessions, keep each session's whole Chrome profile (user-data-dir)")
+    parser.add_argument("--budget", type=float, metavar="HOURS",
+                        help="browser-hours per day: only run the jobs due by their learned change rate")
+    parser.add_argument("--history", metavar="FILE",
+                        help=f"crawl history used by --budget (default {DEFAULT_HISTORY_FILE}, written after each run)")
+    parser.add_argument("--egress", metavar="LIST",
+                        help="proxies / source addresses to spread workers over: a file (one per line) "
+                             "or a comma list, e.g. http://10.0.0.2:3128,socks5://127.0.0.1:1080,source=192.168.1.7")
+    parser.add_argument("--entities", metavar="FILE",
+                        help="store salespeople / brokerages once in FILE and reference them by key in the output")
+    parser.add_argument("--retry-file", default=DEFAULT_RETRY_FILE, help="persistent queue of failed listings")
+    parser.add_argument("--retry-pass", action="store_true",
+                        help="retry queued listings with a fresh browser (after --jobs, or on its own)")
+    args = parser.parse_args(argv)
+
+    if args.jobs:
+        try:
+            jobs = load_jobs(args.jobs)
+        except (OSError, ValueError) as e:
+            parser.error(f"--jobs {args.jobs}: {e}")
+        if args.list_only == "changed":
+            stateless = [job.name for job in jobs if not job.list_only and not job.state]
+            if stateless:
+                parser.error(f"--list-only changed needs a state file on every job; missing on: {', '.join(stateless)}")
+
+    if args.egress and (args.jobs or args.retry_pass):
+        entries = load_egress(args.egress).entries
+        if not any(e.browser_ok for e in entries):
+            names = [e.name + (" (with credentials)" if e.auth else "") for e in entries]
+            parser.error(f"--egress: no identity can drive a browser: {', '.join(names)}. Chrome can't bind "
+                         f"a source address or take proxy credentials; allow-list this machine's IP instead")
+
+    if args.jobs or args.retry_pass:
+        totals = run_cli(args)
+        sys.exit(1 if totals.get("failed") or totals.get("incomplete") else 0)
+
     default_url = "https://www.realtor.ca/map#ZoomLevel=9&Center=42.949006%2C-81.248535&LatitudeMax=43.25883&LongitudeMax=-79.99335&LatitudeMin=42.63762&LongitudeMin=-82.50372&Sort=6-D&PGeoIds=g30_dpwhr7kj&GeoName=London%2C%20ON&PropertyTypeGroupID=1&TransactionTypeId=2&PropertySearchTypeId=0&Currency=CAD"
     driver = startbrowser(default_url)   # ✅ open browser immediately
 
-    app = App(driver)
+    app = App(driver, writer=args.writer)
     app.log(f"Opened on startup: {default_url}")
     app.mainloop()
 
@@ -0,0 +1,114 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import List, Optional
+
+
+logger = logging.getLogger("YELLOSCRAPPER")
+
+DEFAULT_RETRY_FILE = "retry_queue.json"
+
+
+# =======================
+# RETRY QUEUE
+# =======================
+class RetryQueue:
+    """
+    Persistent queue of detail pages that failed to scrape.
+
+    Each entry is a dict: url, reason, attempts, next_at (epoch seconds), plus the
+    job / output / state it belongs to so it can be written to the right place
+    later. Retry delay doubles per attempt, from `base_delay` up to `max_delay`;
+    after `max_attempts` failures the entry moves to `dead` and is kept for the
+    record but not retried again. The file is rewritten on every change, so a
+    crash loses nothing.
+    """
+
+    def __init__(self, path=DEFAULT_RETRY_FILE, base_delay=30, max_delay=900, max_attempts=5):
+        self.path = path
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self.entries = {}
+        self.dead = {}
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+                self.entries = {e["url"]: e for e in data.get("pending", [])}
+                self.dead = {e["url"]: e for e in data.get("dead", [])}
+            except Exception as e:
+                logger.warning(f"Could not read retry queue {path}, starting empty: {e}")
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"pending": list(self.entries.values()), "dead": list(self.dead.values())},
+                      f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+    def backoff(self, attempts: int) -> float:
+        return min(self.max_delay, self.base_delay * 2 ** max(0, attempts - 1))
+
+    def push(self, url: str, reason: str, job: Optional[str] = None,
+             output: Optional[str] = None, state: Optional[str] = None) -> bool:
+        """
+        Records a failure for `url`. Returns False if the entry has used up its
+        attempts and was moved to the dead list.
+        """
+        if not url:
+            return False
+        now = time.time()
+        with self._lock:
+            prev = self.entries.get(url, {})
+            attempts = prev.get("attempts", 0) + 1
+            entry = {
+                "url": url,
+                "reason": str(reason).splitlines()[0][:300] if reason else "",
+                "attempts": attempts,
+                "next_at": now + self.backoff(attempts),
+                "first_failed": prev.get("first_failed", now),
+                "job": job if job is not None else prev.get("job"),
+                "output": output if output is not None else prev.get("output"),
+                "state": state if state is not None else prev.get("state"),
+            }
+            alive = attempts < self.max_attempts
+            if alive:
+                self.entries[url] = entry
+            else:
+                self.entries.pop(url, None)
+                self.dead[url] = entry
+            self._save()
+        return alive
+
+    def done(self, url: str):
+        with self._lock:
+            if self.entries.pop(url, None) is not None:
+                self._save()
+
+    def due(self, job: Optional[str] = None, now: Optional[float] = None) -> List[dict]:
+        """
+        Entries whose backoff has expired, oldest first (optionally for one job only).
+        """
+        now = now or time.time()
+        with self._lock:
+            items = [
+                dict(e) for e in self.entries.values()
+                if e["next_at"] <= now and (job is None or e.get("job") == job)
+            ]
+        return sorted(items, key=lambda e: e["next_at"])
+
+    def next_due(self, job: Optional[str] = None) -> Optional[float]:
+        with self._lock:
+            times = [e["next_at"] for e in self.entries.values() if job is None or e.get("job") == job]
+        return min(times) if times else None
+
+    def pending(self, job: Optional[str] = None) -> List[dict]:
+        with self._lock:
+            return [dict(e) for e in self.entries.values() if job is None or e.get("job") == job]
+
+    def __len__(self):
+        return len(self.entries)
@@ -1,7 +1,6 @@
 import json
 import logging
 import os
-import pickle
 import re
 import subprocess
 import sys
@@ -113,274 +112,20 @@ def init_driver(headless: bool = False) -> uc.Chrome:
 
 
 
-import os
-from openpyxl import Workbook, load_workbook
-from openpyxl.utils import get_column_letter
-
-
-
-def append_to_excel(data: dict, filename="scrapper.xlsx", sheet_name="Sheet1"):
-    """
-    Appends scraped data to Excel in a structured format.
-    """
-
-    headers = [
-        "Price", "page link", "1st Image link",
-        "Line 1 Address", "City", "Province", "Post Code",
-        "Salesperson 1", "Phone#1", "Phone#2",
-        "Brokerage1", "Brokerage1 Addr#" ,"Brokerage1 Tel#",
-        "Salesperson 2", "Phone#1", "Phone#2",
-        "Brokerage2", "Brokerage2 Addr#" ,"Brokerage2 Tel#"
-    ]
-
-    # Create workbook if not exists
-    if not os.path.exists(filename):
-        wb = Workbook()
-        ws = wb.active
-        ws.title = sheet_name
-        ws.append(headers)
-        wb.save(filename)
-
-    # Load existing workbook
-    wb = load_workbook(filename)
-    if sheet_name not in wb.sheetnames:
-        ws = wb.create_sheet(sheet_name)
-        ws.append(headers)
-    else:
-        ws = wb[sheet_name]
-
-    # ----- Parse data into required format -----
-    # Address split
-    line1, city, province, postal = "", "", "", ""
-    if "address" in data and data["address"]:
-        parts = data["address"].split("\n")
-        if len(parts) >= 2:
-            line1 = parts[0].strip()
-            # Example: "Norwich (Norwich Town), Ontario N0J1P0"
-            addr_parts = parts[1].split(",")
-            if len(addr_parts) >= 2:
-                city = addr_parts[0].strip()
-                province_post = addr_parts[1].strip().split(" ")
-                if len(province_post) >= 2:
-                    province = province_post[0]
-                    postal = " ".join(province_post[1:])
-
-    # Salesperson 1 (main agent)
-    salesperson1 = data.get("salesperson1", "")
-    phone1 = data.get("salesperson1_phone1", "")
-    phone2 = data.get("salesperson1_phone2", "")   
-
-
-
-    salesperson2 = data.get("salesperson2", "")
-    salesperson2_phone1 = data.get("salesperson2_phone1", "")
-    salesperson2_phone2 = data.get("salesperson2_phone2", "")
-
-
-    #brokara
-
-
-    brokerage1 = data.get("brokerage1", "")
-    brokerage1_address = data.get("brokerage1_address", "")
-    brokerage1_tel = data.get("brokerage1_tel", "")
-
-    brokerage2 = data.get("brokerage2", "")
-    brokerage2_address = data.get("brokerage1_address", "")
-    brokerage2_tel = data.get("brokerage1_tel", "")
+from extract import ListingIncomplete, get_listing_info
+from sinks import append_to_excel
 
 
 
-    # Row in correct order
-    row = [
-        data.get("price", ""),
-        data.get("url", ""),
-        data.get("image", ""),
-        line1, city, province, postal,
-        salesperson1, phone1, phone2,
-        brokerage1, brokerage1_address,brokerage1_tel,
-        salesperson2, salesperson2_phone1, salesperson2_phone2,
-        brokerage2, brokerage2_address,brokerage2_tel
-        
-    ]
 
-    # Append row
-    ws.append(row)
 
-    # Auto-adjust column width
-    for col_idx, header in enumerate(headers, 1):
-        col_letter = get_column_letter(col_idx)
-        max_length = max(len(str(cell.value)) for cell in ws[col_letter])
-        ws.column_dimensions[col_letter].width = max(15, min(max_length + 2, 60))
 
-    wb.save(filename)
-
-
-
-
-
-
-
-def _safe_text(el, default="-"):
-    try:
-        t = el.text.strip()
-        return t if t else default
-    except Exception:
-        return default
-
-
-
-def get_listing_info(driver, timeout=10):
-    wait = WebDriverWait(driver, timeout)
-    info = {
-        "image": "",
-        "price": "",
-        "address": "",
-        # Salesperson 1
-        "salesperson1": "-",
-        "salesperson1_phone1": "-",
-        "salesperson1_phone2": "-",
-        # Salesperson 2
-        "salesperson2": "-",
-        "salesperson2_phone1": "-",
-        "salesperson2_phone2": "-",
-        # Brokerage / office 1
-        "brokerage1": "-",
-        "brokerage1_address":"-",
-        "brokerage1_tel": "-",
-        # Brokerage / office 2
-        "brokerage2": "-",
-        "brokerage2_address":"-",
-        "brokerage2_tel": "-",
-        # optional
-        "url": ""
-    }
-
-    # ---- Basic single-element fields ----
-    try:
-        img = wait.until(EC.presence_of_element_located((By.XPATH, "//*[@id='heroImage']")))
-        info["image"] = img.get_attribute("src") or ""
-    except Exception:
-        info["image"] = ""
-
-    try:
-        price = wait.until(EC.presence_of_element_located((By.XPATH, "//*[@id='listingPriceValue']")))
-        info["price"] = _safe_text(price, default="")
-    except Exception:
-        info["price"] = ""
-
-    try:
-        listingAddress = wait.until(EC.presence_of_element_located((By.XPATH, "//*[@id='listingAddress']")))
-        info["address"] = _safe_text(listingAddress, default="")
-    except Exception:
-        info["address"] = ""
-
-    # If you want page URL (current tab)
-    try:
-        info["url"] = driver.current_url
-    except Exception:
-        info["url"] = ""
-
-    # ---- Realtor cards (salespersons) ----
-    try:
-        realtor_cards = wait.until(
-            EC.presence_of_all_elements_located(
-                (By.XPATH, "//*[starts-with(@id,'realtorCard')]//div[contains(@class,'realtorCardCon card ')]")
-            )
-        )
-    except Exception:
-        realtor_cards = []
-
-    # Extract up to 2 salespersons
-    for idx in range(2):
-        if idx < len(realtor_cards):
-            card = realtor_cards[idx]
-            # Name
-            try:
-                name_el = card.find_element(By.XPATH, ".//*[@class='realtorCardName']")
-                name = _safe_text(name_el, default="-")
-            except Exception:
-                name = "-"
-            # Telephones (may be multiple)
-            try:
-                phone_els = card.find_elements(By.XPATH, ".//*[@data-type='Telephone']")
-                phones = [p.text.strip() for p in phone_els if p.text.strip()]
-            except Exception:
-                phones = []
-
-            phone1 = phones[0] if len(phones) >= 1 else "-"
-            phone2 = phones[1] if len(phones) >= 2 else "-"
-
-            if idx == 0:
-                info["salesperson1"] = name
-                info["salesperson1_phone1"] = phone1
-                info["salesperson1_phone2"] = phone2
-            else:
-                info["salesperson2"] = name
-                info["salesperson2_phone1"] = phone1
-                info["salesperson2_phone2"] = phone2
-        else:
-            # no card for this index -> keep defaults
-            pass
-
-    # ---- Office / brokerage cards ----
-    try:
-        office_cards = wait.until(
-            EC.presence_of_all_elements_located((By.XPATH, "//*[starts-with(@id,'officeCard')]"))
-        )
-    except Exception:
-        office_cards = []
-
-    for idx in range(2):
-        if idx < len(office_cards):
-            card = office_cards[idx]
-
-            # Office info text (contains brokerage name + 'Brokerage' + address lines)
-            try:
-                office_info_el = card.find_element(By.XPATH, ".//*[@class='officeCardTopLeft']")
-                office_info_text = _safe_text(office_info_el, default="-")
-            except Exception:
-                office_info_text = _safe_text(card, default="-")
-
-            # Split into lines
-            lines = office_info_text.splitlines() if office_info_text and office_info_text != "-" else []
-
-            # Brokerage name = first line
-            brokerage_name = lines[0].strip() if len(lines) > 0 else "-"
-
-            # Address = everything after the first 2 lines (skip brokerage name + "Brokerage")
-            brokerage_address = " ".join(line.strip() for line in lines[2:]) if len(lines) > 2 else "-"
-
-            # Office phone(s)
-            phones = []
-            try:
-                tel_els = card.find_elements(By.XPATH, ".//*[@class='officeCardContactNumber']")
-                if not tel_els:
-                    tel_els = card.find_elements(By.XPATH, ".//*[@data-type='Telephone']")
-                phones = [t.text.strip() for t in tel_els if t.text.strip()]
-            except Exception:
-                phones = []
-
-            brokerage_tel = phones[0] if len(phones) >= 1 else "-"
-
-            # Assign to info dict
-            if idx == 0:
-                info["brokerage1"] = brokerage_name
-                info["brokerage1_address"] = brokerage_address
-                info["brokerage1_tel"] = brokerage_tel
-            else:
-                info["brokerage2"] = brokerage_name
-                info["brokerage2_address"] = brokerage_address
-                info["brokerage2_tel"] = brokerage_tel
-
-
-    return info
-
-
-
-
-
-
-def process(driver):
+def process(driver, write=append_to_excel):
+    """
+    Scrapes every listing on the current results page and passes each to `write`
+    (append_to_excel by default; use writer.WriterClient(...).write when several
+    scraper processes share one output).
+    """
     try:
         items=driver.find_elements(By.XPATH,"//*[@data-binding='href=DetailsURL']")
 
@@ -390,7 +135,7 @@ def process(driver):
             input("refresh ?")
             driver.refresh()
             time.sleep(2)
-            process(driver)  
+            process(driver, write)  
 
     while items ==[]:
         print("Cannot load the main page...")
@@ -398,7 +143,7 @@ def process(driver):
             input("refresh ?")
             driver.refresh()
             time.sleep(2)
-            process(driver) 
+            process(driver, write) 
 
 
 
@@ -414,9 +159,13 @@ def process(driver):
         time.sleep(1)
 
         try:
-            info=get_listing_info(driver, timeout=10)
+            try:
+                info=get_listing_info(driver, timeout=10)
+            except ListingIncomplete as e:
+                # Out of time: keep whatever loaded, as before the per-listing budget
+                info=e.listing
             time.sleep(0.5)
-            append_to_excel(info)
+            write(info)
             time.sleep(1.5)            
         except Exception as e:
             print(f" cannot visit the item page {e} ")
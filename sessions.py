@@ -0,0 +1,309 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Optional
+
+
+logger = logging.getLogger("YELLOSCRAPPER")
+
+DEFAULT_SESSION_DIR = "sessions"
+
+# Text that only shows up on bot-check / block pages, never on listings or search results.
+BLOCK_MARKERS = (
+    "_incapsula_resource",
+    "incapsula incident",
+    "request unsuccessful",
+    "access denied",
+    "verify you are human",
+    "hcaptcha",
+    "g-recaptcha",
+)
+
+# Keys Network.setCookies accepts out of what Network.getAllCookies returns
+COOKIE_KEYS = ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite", "expires")
+
+# Seeds saved localStorage before any page script runs; keys the site already set win.
+STORAGE_SEED_JS = """
+(function (data) {
+  var items = data[location.origin];
+  if (!items) return;
+  try {
+    for (var k in items) {
+      if (localStorage.getItem(k) === null) localStorage.setItem(k, items[k]);
+    }
+  } catch (e) {}
+})(%s);
+"""
+
+READ_STORAGE_JS = """
+try { return [location.origin, Object.assign({}, localStorage)]; } catch (e) { return null; }
+"""
+
+
+class SessionBlocked(Exception):
+    """
+    Raised when a page comes back as a bot check or block page.
+    """
+
+
+def looks_blocked(driver) -> bool:
+    try:
+        text = ((driver.title or "") + " " + (driver.page_source or "")[:20000]).lower()
+    except Exception:
+        return False
+    return any(marker in text for marker in BLOCK_MARKERS)
+
+
+# =======================
+# SESSION
+# =======================
+class Session:
+    """
+    One saved browser identity under <store root>/<id>/: meta.json, cookies.json
+    (every cookie from Network.getAllCookies), storage.json (localStorage by
+    origin) and, with profile=True, the whole Chrome user-data-dir in profile/.
+    """
+
+    def __init__(self, store, sid, meta):
+        self.store = store
+        self.id = sid
+        self.meta = meta
+        self.path = os.path.join(store.root, sid)
+        self.recycled = meta.get("uses", 0) > 0
+        self.blocked = False
+        self.healthy = False
+
+    @property
+    def kind(self):
+        return "recycled" if self.recycled else "new"
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _save_meta(self):
+        tmp = self._file("meta.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, indent=1)
+        os.replace(tmp, self._file("meta.json"))
+
+    # ---------- Driver setup ----------
+    def apply_options(self, options):
+        """
+        Points Chrome at this session's profile directory (profile mode only).
+        """
+        if self.store.profile:
+            options.add_argument(f"--user-data-dir={os.path.abspath(self._file('profile'))}")
+
+    def restore(self, driver):
+        """
+        Loads saved cookies and localStorage into a fresh driver before its first navigation.
+        """
+        try:
+            with open(self._file("cookies.json"), encoding="utf-8") as f:
+                cookies = json.load(f)
+        except FileNotFoundError:
+            cookies = []
+        except Exception as e:
+            logger.warning(f"[session {self.id}] unreadable cookies, starting without: {e}")
+            cookies = []
+
+        params = []
+        for c in cookies:
+            p = {k: c[k] for k in COOKIE_KEYS if k in c}
+            if p.get("expires", -1) <= 0 or c.get("session"):
+                p.pop("expires", None)
+            params.append(p)
+        if params:
+            try:
+                driver.execute_cdp_cmd("Network.setCookies", {"cookies": params})
+            except Exception as e:
+                logger.warning(f"[session {self.id}] could not restore cookies: {e}")
+
+        storage = self._load_storage()
+        if storage:
+            try:
+                driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument",
+                                       {"source": STORAGE_SEED_JS % json.dumps(storage)})
+            except Exception as e:
+                logger.warning(f"[session {self.id}] could not restore localStorage: {e}")
+
+        logger.info(f"[session {self.id}] {self.kind}: {len(params)} cookie(s), "
+                    f"{sum(len(v) for v in storage.values())} storage key(s)")
+
+    def _load_storage(self) -> dict:
+        try:
+            with open(self._file("storage.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception:
+            return {}
+
+    # ---------- Health ----------
+    def check(self, driver, load_time: Optional[float] = None, blocked: Optional[bool] = None):
+        """
+        Validity check after a page load: raises SessionBlocked on a bot-check page,
+        otherwise records the load time for the new/recycled stats.
+        `blocked` skips the page test when the caller already ran looks_blocked.
+        """
+        stats = self.store.stats[self.kind]
+        if blocked is None:
+            blocked = looks_blocked(driver)
+        if blocked:
+            self.blocked = True
+            stats["blocked"] += 1
+            raise SessionBlocked(f"session {self.id} hit a bot check")
+        if load_time is not None:
+            stats["loads"] += 1
+            stats["load_time"] += load_time
+
+    def save(self, driver):
+        """
+        Snapshots cookies and the current origin's localStorage after a healthy job.
+        """
+        try:
+            cookies = driver.execute_cdp_cmd("Network.getAllCookies", {}).get("cookies", [])
+            tmp = self._file("cookies.json.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(cookies, f, ensure_ascii=False)
+            os.replace(tmp, self._file("cookies.json"))
+
+            found = driver.execute_script(READ_STORAGE_JS)
+            if found and found[0] and found[0] != "null":
+                storage = self._load_storage()
+                storage[found[0]] = found[1] or {}
+                tmp = self._file("storage.json.tmp")
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(storage, f, ensure_ascii=False)
+                os.replace(tmp, self._file("storage.json"))
+        except Exception as e:
+            logger.warning(f"[session {self.id}] could not save state: {e}")
+            return
+
+        self.healthy = True
+        self.meta["uses"] = self.meta.get("uses", 0) + 1
+        self.meta["failures"] = 0
+        self.meta["last_good"] = time.time()
+        self._save_meta()
+
+    def failed(self):
+        self.meta["failures"] = self.meta.get("failures", 0) + 1
+        self._save_meta()
+
+
+# =======================
+# SESSION STORE
+# =======================
+class SessionStore:
+    """
+    Pool of saved sessions on disk. checkout() hands out the most recently healthy
+    free session (or a new one); release() returns it. Sessions are rotated out
+    when they hit a bot check, fail `max_failures` jobs in a row, are older than
+    `max_age` seconds, or have been used for `max_uses` jobs.
+
+    A lock file per session keeps two processes from driving the same profile.
+    """
+
+    def __init__(self, root=DEFAULT_SESSION_DIR, profile=False, max_age=3 * 86400,
+                 max_uses=200, max_failures=3, stale_lock=12 * 3600):
+        self.root = root
+        self.profile = profile
+        self.max_age = max_age
+        self.max_uses = max_uses
+        self.max_failures = max_failures
+        self.stale_lock = stale_lock
+        self._lock = threading.Lock()
+        self.stats = {
+            kind: {"checkouts": 0, "blocked": 0, "loads": 0, "load_time": 0.0}
+            for kind in ("new", "recycled")
+        }
+        os.makedirs(root, exist_ok=True)
+
+    def _lock_path(self, sid):
+        return os.path.join(self.root, sid, "lock")
+
+    def _try_lock(self, sid) -> bool:
+        path = self._lock_path(sid)
+        try:
+            if time.time() - os.path.getmtime(path) > self.stale_lock:
+                os.remove(path)
+        except OSError:
+            pass
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w") as f:
+            f.write(str(os.getpid()))
+        return True
+
+    def _retire(self, sid, reason):
+        logger.info(f"[session {sid}] retired: {reason}")
+        shutil.rmtree(os.path.join(self.root, sid), ignore_errors=True)
+
+    def _expired(self, meta) -> Optional[str]:
+        now = time.time()
+        if meta.get("blocked"):
+            return "blocked"
+        if now - meta.get("created", now) > self.max_age:
+            return "too old"
+        if meta.get("uses", 0) >= self.max_uses:
+            return "used up"
+        if meta.get("failures", 0) >= self.max_failures:
+            return f"{meta['failures']} failures in a row"
+        return None
+
+    def checkout(self) -> Session:
+        with self._lock:
+            candidates = []
+            for sid in os.listdir(self.root):
+                try:
+                    with open(os.path.join(self.root, sid, "meta.json"), encoding="utf-8") as f:
+                        meta = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if os.path.exists(self._lock_path(sid)) and \
+                        time.time() - os.path.getmtime(self._lock_path(sid)) <= self.stale_lock:
+                    continue
+                reason = self._expired(meta)
+                if reason:
+                    self._retire(sid, reason)
+                    continue
+                candidates.append((meta.get("last_good", 0), sid, meta))
+
+            for _, sid, meta in sorted(candidates, reverse=True):
+                if self._try_lock(sid):
+                    session = Session(self, sid, meta)
+                    break
+            else:
+                sid = uuid.uuid4().hex[:10]
+                os.makedirs(os.path.join(self.root, sid), exist_ok=True)
+                self._try_lock(sid)
+                session = Session(self, sid, {"created": time.time(), "uses": 0, "failures": 0,
+                                              "profile": self.profile})
+                session._save_meta()
+
+            self.stats[session.kind]["checkouts"] += 1
+            return session
+
+    def release(self, session: Session):
+        if session.blocked:
+            self._retire(session.id, "blocked")
+            return
+        try:
+            os.remove(self._lock_path(session.id))
+        except OSError:
+            pass
+
+    def report(self) -> str:
+        parts = []
+        for kind, s in self.stats.items():
+            if not s["checkouts"]:
+                continue
+            avg = f"{s['load_time'] / s['loads']:.1f}s" if s["loads"] else "-"
+            parts.append(f"{kind}: checkouts={s['checkouts']} blocked={s['blocked']} first-page={avg}")
+        return "[session] " + ("; ".join(parts) if parts else "no sessions used")
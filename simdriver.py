@@ -0,0 +1,821 @@
+import html
+import itertools
+import logging
+import math
+import random
+import time
+import uuid
+import weakref
+from urllib.parse import parse_qsl, quote
+
+from lxml import etree, html as lxml_html
+from selenium.common.exceptions import (
+    InvalidSelectorException,
+    NoSuchElementException,
+    NoSuchWindowException,
+    StaleElementReferenceException,
+    TimeoutException,
+    WebDriverException,
+)
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.command import Command
+from selenium.webdriver.remote.webelement import WebElement
+
+from extract_html import _inner_text
+
+try:
+    from cssselect import GenericTranslator
+except ImportError:  # CSS selectors are optional, the scraper only uses XPath / ID / class
+    GenericTranslator = None
+
+
+logger = logging.getLogger("YELLOSCRAPPER")
+
+BASE_URL = "https://www.realtor.ca"
+# Same page size as realtor_scrapper.RESULTS_PER_PAGE (importing it would pull in the UI)
+RESULTS_PER_PAGE = 12
+
+# Seconds; see Latency for the spec format
+DEFAULT_LATENCY = {
+    "command": "lognormal:0.002,0.5",   # every WebDriver round trip
+    "nav": "lognormal:0.05,0.5",        # navigation start -> document committed (DOM ready)
+    "load": "lognormal:0.1,0.6",        # committed -> load event (images, scripts)
+    "search": "lognormal:0.03,0.4",     # results re-render after a hash change / Next click
+}
+
+# Probabilities per navigation (crash: per command)
+FAULTS = ("blank", "slow", "error", "blocked", "crash")
+
+CITIES = (
+    ("London", "Ontario", "N6"), ("Toronto", "Ontario", "M5"), ("Ottawa", "Ontario", "K1"),
+    ("Vancouver", "British Columbia", "V5"), ("Calgary", "Alberta", "T2"), ("Montreal", "Quebec", "H2"),
+    ("Halifax", "Nova Scotia", "B3"), ("Winnipeg", "Manitoba", "R3"), ("Regina", "Saskatchewan", "S4"),
+)
+STREETS = ("Main St", "King St", "Oak Ave", "Maple Dr", "Queen St W", "Richmond St", "Elm Cres",
+           "Lakeshore Rd", "Wellington Rd", "Dundas St")
+FIRST_NAMES = ("Alex", "Sam", "Jordan", "Taylor", "Morgan", "Chris", "Jamie", "Pat", "Robin", "Casey")
+LAST_NAMES = ("Smith", "Tremblay", "Martin", "Roy", "Wilson", "MacDonald", "Gagnon", "Lee", "Brown", "Singh")
+POSTAL_LETTERS = "ABCEGHJKLMNPRSTVWXYZ"
+
+BLANK_HTML = "<html><head><title></title></head><body></body></html>"
+BLOCK_HTML = ("<html><head><title>Access Denied</title></head><body>"
+              "<p>Request unsuccessful. Incapsula incident ID: 0-000000000</p></body></html>")
+ERROR_HTML = ("<html><head><title>REALTOR.ca</title></head><body>"
+              "<div class='error'>Something went wrong. Please try again.</div></body></html>")
+
+
+# =======================
+# CATALOGUE
+# =======================
+def _phone(rng) -> str:
+    return f"{rng.randint(204, 905)}-{rng.randint(200, 999)}-{rng.randint(1000, 9999)}"
+
+
+def hash_params(url: str) -> dict:
+    return dict(parse_qsl(url.partition("#")[2]))
+
+
+def search_url(city=None, page=None) -> str:
+    """
+    A map search the simulator understands: GeoName picks a city (None = whole catalogue).
+    """
+    params = ["ZoomLevel=11", "Sort=6-D", "TransactionTypeId=2"]
+    if city:
+        params.append(f"GeoName={quote(city)}")
+    if page:
+        params.append(f"CurrentPage={page}")
+    return f"{BASE_URL}/map#{'&'.join(params)}"
+
+
+class Catalogue:
+    """
+    Synthetic listings, the same for a given size and seed, spread over CITIES.
+    Salespeople and brokerages come from shared pools so they repeat across
+    listings the way they do on the real site.
+    """
+
+    def __init__(self, size=20000, seed=1):
+        rng = random.Random(seed)
+        agents = [(f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", _phone(rng),
+                   _phone(rng) if rng.random() < 0.3 else "")
+                  for _ in range(max(2, size // 8))]
+        offices = [(f"{rng.choice(LAST_NAMES)} Realty Inc.",
+                    f"{rng.randint(1, 999)} {rng.choice(STREETS)}\n{city}, {province}", _phone(rng))
+                   for city, province, _ in (rng.choice(CITIES) for _ in range(max(2, size // 40)))]
+
+        self.listings = []
+        self.by_id = {}
+        self.by_city = {}
+        for i in range(size):
+            city, province, prefix = rng.choice(CITIES)
+            item = {
+                "id": str(27000000 + i),
+                "price": rng.randrange(150, 2500) * 1000,
+                "street": f"{rng.randint(1, 9999)} {rng.choice(STREETS)}",
+                "city": city,
+                "province": province,
+                "postal": f"{prefix}{rng.choice(POSTAL_LETTERS)} {rng.randint(0, 9)}"
+                          f"{rng.choice(POSTAL_LETTERS)}{rng.randint(0, 9)}",
+                "agents": rng.sample(agents, rng.choice((1, 1, 2))),
+                "offices": rng.sample(offices, rng.choice((1, 1, 2))),
+            }
+            slug = f"{item['street']} {city} {province}".lower().replace(" ", "-")
+            item["url"] = f"{BASE_URL}/real-estate/{item['id']}/{slug}"
+            self.listings.append(item)
+            self.by_id[item["id"]] = item
+            self.by_city.setdefault(city.lower(), []).append(item)
+
+    def __len__(self):
+        return len(self.listings)
+
+    def search(self, url: str) -> list:
+        geo = hash_params(url).get("GeoName", "").split(",")[0].strip().lower()
+        return self.by_city.get(geo, self.listings)
+
+    def cities(self) -> list:
+        return [city for city, _, _ in CITIES if city.lower() in self.by_city]
+
+
+# ---------- Pages ----------
+def _e(text) -> str:
+    return html.escape(str(text))
+
+
+def results_html(items, page, total) -> str:
+    last_page = max(1, -(-total // RESULTS_PER_PAGE))
+    cards = "".join(
+        f'<div class="cardCon"><a data-binding="href=DetailsURL" href="{_e(it["url"])}">'
+        f'<img class="gridViewListingImage" src="{BASE_URL}/photos/{it["id"]}/thumb.jpg"></a>'
+        f'<div class="listingCardPrice">${it["price"]:,}</div>'
+        f'<div class="listingCardAddress">{_e(it["street"])}, {_e(it["city"])}, '
+        f'{_e(it["province"])} {_e(it["postal"])}</div></div>'
+        for it in items
+    )
+    forward = "Go to the next page" + (" disabled" if page >= last_page else "")
+    return (f"<html><head><title>Real Estate &amp; Homes For Sale | REALTOR.ca</title></head><body>"
+            f'<span id="mapResultsNumVal">{total:,}</span><div id="mapSidebarBodyCon">{cards}</div>'
+            f'<a class="paginationLinkForward" aria-label="{forward}" href="#"></a></body></html>')
+
+
+def detail_html(item, cards=True) -> str:
+    """
+    A detail page with the ids / classes extract.py reads; cards=False is the page
+    before its agent and office cards have rendered.
+    """
+    parts = [
+        f'<html><head><title>{_e(item["street"])} | REALTOR.ca</title></head><body>',
+        f'<img id="heroImage" src="{BASE_URL}/photos/{item["id"]}/hero.jpg">',
+        f'<div id="listingPriceValue">${item["price"]:,}</div>',
+        f'<div id="listingAddress">{_e(item["street"])}<br>{_e(item["city"])}, '
+        f'{_e(item["province"])} {_e(item["postal"])}</div>',
+    ]
+    if cards:
+        for n, (name, phone1, phone2) in enumerate(item["agents"], 1):
+            phones = "".join(f'<span data-type="Telephone">{_e(p)}</span>' for p in (phone1, phone2) if p)
+            parts.append(f'<div id="realtorCard{n}"><div class="realtorCardCon card shadow">'
+                         f'<a href="/agent/{n}"><span class="realtorCardName">{_e(name)}</span></a>'
+                         f'{phones}</div></div>')
+        for n, (name, address, tel) in enumerate(item["offices"], 1):
+            lines = "".join(f"<div>{_e(line)}</div>" for line in [name, "Brokerage"] + address.split("\n"))
+            parts.append(f'<div id="officeCard{n}"><div class="officeCardTopLeft">{lines}</div>'
+                         f'<span class="officeCardContactNumber">{_e(tel)}</span></div>')
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+# =======================
+# LATENCY / FAULTS
+# =======================
+class Latency:
+    """
+    A delay distribution in seconds: "const:0.05", "uniform:0.02,0.2",
+    "lognormal:0.1,0.5" (median, sigma) or "exp:0.1" (mean).
+    """
+
+    KINDS = {"const": 1, "uniform": 2, "lognormal": 2, "exp": 1}
+
+    def __init__(self, spec="const:0"):
+        self.spec = spec
+        kind, _, args = spec.partition(":")
+        self.kind = kind.strip().lower()
+        try:
+            self.args = tuple(float(a) for a in args.split(",") if a.strip())
+        except ValueError:
+            raise ValueError(f"bad latency {spec!r}")
+        if self.kind not in self.KINDS or len(self.args) != self.KINDS[self.kind]:
+            raise ValueError(f"bad latency {spec!r} (const:S, uniform:A,B, lognormal:MEDIAN,SIGMA or exp:MEAN)")
+
+    def sample(self, rng) -> float:
+        a = self.args
+        if self.kind == "const":
+            return a[0]
+        if self.kind == "uniform":
+            return rng.uniform(a[0], a[1])
+        if self.kind == "lognormal":
+            return a[0] * math.exp(rng.gauss(0.0, a[1]))
+        return rng.expovariate(1.0 / a[0]) if a[0] > 0 else 0.0
+
+    def __repr__(self):
+        return f"Latency({self.spec!r})"
+
+
+def parse_latency(text) -> dict:
+    """
+    "nav=lognormal:0.2,0.5 load=const:0" (space or semicolon separated) -> {name: Latency}.
+    """
+    out = {}
+    for part in (text or "").replace(";", " ").split():
+        name, _, spec = part.partition("=")
+        if name not in DEFAULT_LATENCY:
+            raise ValueError(f"unknown latency {name!r} (one of {', '.join(DEFAULT_LATENCY)})")
+        out[name] = Latency(spec)
+    return out
+
+
+def parse_faults(text) -> dict:
+    """
+    "blank=0.02,slow=0.01,crash=0.0001" -> {fault: probability}.
+    """
+    out = {}
+    for part in (text or "").split(","):
+        if not part.strip():
+            continue
+        name, _, value = part.partition("=")
+        name = name.strip()
+        if name not in FAULTS:
+            raise ValueError(f"unknown fault {name!r} (one of {', '.join(FAULTS)})")
+        out[name] = float(value)
+    return out
+
+
+# =======================
+# DOCUMENTS / TABS
+# =======================
+class _Document:
+    """
+    One page in a tab. It commits (URL and DOM switch over) at commit_at and fires
+    load at load_at; `late_source`, when set, replaces the DOM at load_at
+    (content that only renders once the page has finished loading).
+    """
+
+    _generations = itertools.count(1)
+
+    def __init__(self, url, source, commit_at=0.0, load_at=0.0, late_source=None):
+        self.url = url
+        self.commit_at = commit_at
+        self.load_at = load_at
+        self.generation = next(self._generations)
+        self._source = source
+        self._late_source = late_source
+        self._tree = None
+
+    def ready_state(self, now) -> str:
+        return "complete" if now >= self.load_at else "interactive"
+
+    def source(self, now) -> str:
+        if self._late_source is not None and now >= self.load_at:
+            self._source, self._late_source, self._tree = self._late_source, None, None
+        return self._source
+
+    def tree(self, now):
+        source = self.source(now)
+        if self._tree is None:
+            self._tree = lxml_html.fromstring(source)
+        return self._tree
+
+
+class _Tab:
+    def __init__(self, handle):
+        self.handle = handle
+        self.doc = _Document("about:blank", BLANK_HTML)
+        self.pending = None
+
+    def settle(self, now):
+        if self.pending is not None and now >= self.pending.commit_at:
+            self.doc, self.pending = self.pending, None
+        return self.doc
+
+
+class _SwitchTo:
+    def __init__(self, driver):
+        self._driver = driver
+
+    def window(self, handle):
+        self._driver._command(tab=False)
+        if handle not in self._driver._tabs:
+            raise NoSuchWindowException(f"no such window: {handle}")
+        self._driver._current = handle
+
+    def new_window(self, type_hint=None):
+        self._driver._command(tab=False)
+        self._driver._current = self._driver._open_tab()
+
+    def default_content(self):
+        pass
+
+    def frame(self, frame_reference):
+        raise NoSuchElementException("the simulated driver has no frames")
+
+
+# =======================
+# ELEMENTS
+# =======================
+def _literal(value: str) -> str:
+    if "'" not in value:
+        return f"'{value}'"
+    if '"' not in value:
+        return f'"{value}"'
+    return "concat(" + ", \"'\", ".join(f"'{p}'" for p in value.split("'")) + ")"
+
+
+def _xpath(by, value, relative=False) -> str:
+    prefix = ".//" if relative else "//"
+    if by == By.XPATH:
+        return value
+    if by == By.ID:
+        return f"{prefix}*[@id={_literal(value)}]"
+    if by == By.CLASS_NAME:
+        return f"{prefix}*[contains(concat(' ', normalize-space(@class), ' '), {_literal(' ' + value + ' ')})]"
+    if by == By.TAG_NAME:
+        return f"{prefix}{value}"
+    if by == By.NAME:
+        return f"{prefix}*[@name={_literal(value)}]"
+    if by == By.CSS_SELECTOR and GenericTranslator is not None:
+        return GenericTranslator().css_to_xpath(value, prefix="descendant::" if relative else "descendant-or-self::")
+    raise InvalidSelectorException(f"the simulated driver does not support {by!r} selectors")
+
+
+class SimElement(WebElement):
+    """
+    A node of a simulated document. Like a real element it goes stale when its
+    tab navigates away and can only be used while its tab is the current one.
+    """
+
+    def __init__(self, driver, handle, doc, node):
+        super().__init__(driver, uuid.uuid4().hex)
+        self._handle = handle
+        self._doc = doc
+        self._node = node
+        driver._elements[self.id] = self
+
+    def _check(self):
+        driver = self._parent
+        driver._command()
+        tab = driver._tabs.get(self._handle)
+        if driver._current != self._handle or tab is None or tab.settle(time.monotonic()) is not self._doc:
+            raise StaleElementReferenceException("stale element reference: element is not attached to the page")
+
+    @property
+    def tag_name(self) -> str:
+        self._check()
+        return str(self._node.tag)
+
+    @property
+    def text(self) -> str:
+        self._check()
+        return _inner_text(self._node)
+
+    def get_attribute(self, name):
+        self._check()
+        value = self._node.get(name)
+        if value is not None and name in ("href", "src") and value.startswith("/"):
+            value = BASE_URL + value
+        return value
+
+    get_dom_attribute = get_attribute
+    get_property = get_attribute
+
+    def is_displayed(self) -> bool:
+        self._check()
+        return True
+
+    def is_enabled(self) -> bool:
+        self._check()
+        return True
+
+    def click(self):
+        self._check()
+        self._parent._click(self)
+
+    def find_elements(self, by=By.ID, value=None):
+        self._check()
+        return self._parent._find(self._handle, self._doc, self._node, _xpath(by, value, relative=True))
+
+    def find_element(self, by=By.ID, value=None):
+        found = self.find_elements(by, value)
+        if not found:
+            raise NoSuchElementException(f"no such element: {by}={value}")
+        return found[0]
+
+
+# =======================
+# DRIVER
+# =======================
+class SimDriver:
+    """
+    In-process stand-in for uc.Chrome serving a Catalogue, for load-testing the
+    crawl loop without a browser or the network. Implements what the scraper
+    calls: get / refresh / current_url / title / page_source, find_element(s),
+    execute_script (for the scripts realtor_scrapper and extract use),
+    window_handles / switch_to / close / quit, and W3C click actions.
+
+    Time is modelled, not faked: a navigation commits after a "nav" latency and
+    loads after a further "load" latency, and WebDriver commands wait for the
+    current tab's load like ChromeDriver does for the chosen `page_load` strategy.
+    `faults` are per-navigation probabilities (crash: per command):
+      blank    detail page renders without price / address
+      slow     detail cards render only `slow_delay` seconds after the rest
+      error    get() raises; clicked / prefetched pages show an error page
+      blocked  results page is a bot-check page
+      crash    the browser dies; every later command raises
+    """
+
+    def __init__(self, catalogue, latency=None, faults=None, page_load="normal", slow_delay=60.0, seed=None):
+        self.catalogue = catalogue
+        self.latency = {name: Latency(spec) for name, spec in DEFAULT_LATENCY.items()}
+        for name, value in (latency or {}).items():
+            self.latency[name] = value if isinstance(value, Latency) else Latency(value)
+        self.faults = {name: 0.0 for name in FAULTS}
+        self.faults.update(faults or {})
+        self.page_load = page_load
+        self.slow_delay = slow_delay
+        self.page_load_timeout = 300.0
+        self.rng = random.Random(seed)
+        self.alive = True
+        self.stats = {"commands": 0, "navigations": 0, **{f: 0 for f in FAULTS}}
+        # Shared by every tab, like a browser profile; the site sets a visitor cookie on first visit
+        self.cookies = {}
+
+        self._tabs = {}
+        self._handles = itertools.count(1)
+        self._elements = weakref.WeakValueDictionary()
+        self._current = self._open_tab()
+        self.switch_to = _SwitchTo(self)
+
+    # ---------- Internals ----------
+    def _open_tab(self):
+        handle = f"SIM-{next(self._handles):04d}"
+        self._tabs[handle] = _Tab(handle)
+        return handle
+
+    def _tab(self) -> _Tab:
+        tab = self._tabs.get(self._current)
+        if tab is None:
+            raise NoSuchWindowException("no such window: target window already closed")
+        return tab
+
+    def _fault(self, name) -> bool:
+        if self.faults[name] and self.rng.random() < self.faults[name]:
+            self.stats[name] += 1
+            return True
+        return False
+
+    def _command(self, tab=True):
+        """
+        One WebDriver round trip: crash check, latency, and (like ChromeDriver)
+        waiting for a navigation still pending in the current tab.
+        """
+        if not self.alive:
+            raise WebDriverException("chrome not reachable")
+        if self._fault("crash"):
+            self.alive = False
+            raise WebDriverException("chrome not reachable (simulated crash)")
+        self.stats["commands"] += 1
+        time.sleep(self.latency["command"].sample(self.rng))
+        if tab:
+            self._wait_loaded(self._tab())
+
+    def _wait_loaded(self, tab):
+        doc = tab.pending or tab.doc
+        if self.page_load == "none":
+            return
+        target = doc.load_at if self.page_load == "normal" else doc.commit_at
+        delay = target - time.monotonic()
+        if delay > self.page_load_timeout:
+            time.sleep(self.page_load_timeout)
+            raise TimeoutException("timeout: Timed out receiving message from renderer")
+        if delay > 0:
+            time.sleep(delay)
+        tab.settle(time.monotonic())
+
+    def _route(self, url):
+        """
+        url -> (source, late_source, extra load delay, is_detail).
+        """
+        if url.startswith("about:"):
+            return BLANK_HTML, None, 0.0, False
+        path = url.partition("#")[0]
+        if "/real-estate/" in path:
+            lid = path.split("/real-estate/", 1)[1].split("/", 1)[0]
+            item = self.catalogue.by_id.get(lid)
+            if item is None or self._fault("blank"):
+                return ERROR_HTML, None, 0.0, True
+            if self._fault("slow"):
+                return detail_html(item, cards=False), detail_html(item), self.slow_delay, True
+            return detail_html(item), None, 0.0, True
+        if "/map" in path:
+            return self._results(url), None, 0.0, False
+        return ERROR_HTML, None, 0.0, False
+
+    def _results(self, url):
+        if self._fault("blocked"):
+            return BLOCK_HTML
+        items = self.catalogue.search(url)
+        try:
+            page = max(1, int(hash_params(url).get("CurrentPage", 1)))
+        except ValueError:
+            page = 1
+        start = (page - 1) * RESULTS_PER_PAGE
+        return results_html(items[start:start + RESULTS_PER_PAGE], page, len(items))
+
+    def _navigate(self, tab, url, raise_errors=False):
+        self.stats["navigations"] += 1
+        now = time.monotonic()
+        old = tab.settle(now)
+        if (url.partition("#")[0] == old.url.partition("#")[0] and "#" in url and "/map" in url):
+            # Same-document hash change: the URL switches now, the results re-render after a search
+            old.url = url
+            commit = now + self.latency["search"].sample(self.rng)
+            tab.pending = _Document(url, self._results(url), commit, commit)
+            return
+        if self._fault("error"):
+            if raise_errors:
+                raise WebDriverException("unknown error: net::ERR_CONNECTION_RESET")
+            source, late, extra = ERROR_HTML, None, 0.0
+        else:
+            source, late, extra, _ = self._route(url)
+            if url.startswith(BASE_URL) and "visid_incap" not in self.cookies:
+                self.cookies["visid_incap"] = {"name": "visid_incap", "value": uuid.uuid4().hex,
+                                               "domain": ".realtor.ca", "path": "/", "expires": -1,
+                                               "session": True}
+        commit = now + self.latency["nav"].sample(self.rng)
+        load = commit + self.latency["load"].sample(self.rng) + extra
+        tab.pending = _Document(url, source, commit, load, late)
+
+    def _find(self, handle, doc, node, xpath):
+        try:
+            nodes = node.xpath(xpath)
+        except etree.XPathError as e:
+            raise InvalidSelectorException(f"invalid selector {xpath!r}: {e}")
+        return [SimElement(self, handle, doc, n) for n in nodes if isinstance(n, etree._Element)]
+
+    def _click(self, element):
+        node = element._node
+        tab = self._tab()
+        if node.get("data-binding") == "href=DetailsURL" or (node.tag == "a" and node.get("target") == "_blank"):
+            # Result cards open the listing in a new tab
+            new = self._tabs[self._open_tab()]
+            self._navigate(new, element.get_attribute("href"))
+        elif "paginationLinkForward" in (node.get("class") or ""):
+            if "disabled" not in (node.get("aria-label") or "").lower():
+                page = int(hash_params(tab.doc.url).get("CurrentPage", 1)) + 1
+                base, _, state = tab.doc.url.partition("#")
+                params = [p for p in state.split("&") if p and not p.startswith("CurrentPage=")]
+                self._navigate(tab, f"{base}#{'&'.join(params + [f'CurrentPage={page}'])}")
+        elif node.tag == "a" and node.get("href") and not node.get("href").startswith("#"):
+            self._navigate(tab, element.get_attribute("href"))
+
+    # ---------- Navigation ----------
+    def get(self, url):
+        self._command()
+        tab = self._tab()
+        self._navigate(tab, url, raise_errors=True)
+        self._wait_loaded(tab)
+
+    def refresh(self):
+        self._command()
+        tab = self._tab()
+        url = tab.doc.url
+        tab.doc.url = url.partition("#")[0]  # a reload is never a same-document navigation
+        self._navigate(tab, url, raise_errors=True)
+        self._wait_loaded(tab)
+
+    @property
+    def current_url(self) -> str:
+        self._command()
+        return self._tab().settle(time.monotonic()).url
+
+    @property
+    def title(self) -> str:
+        self._command()
+        tree = self._tab().settle(time.monotonic()).tree(time.monotonic())
+        found = tree.xpath("//title")
+        return (found[0].text_content() or "").strip() if found else ""
+
+    @property
+    def page_source(self) -> str:
+        self._command()
+        return self._tab().settle(time.monotonic()).source(time.monotonic())
+
+    # ---------- Elements ----------
+    def find_elements(self, by=By.ID, value=None):
+        self._command()
+        tab = self._tab()
+        now = time.monotonic()
+        doc = tab.settle(now)
+        return self._find(tab.handle, doc, doc.tree(now), _xpath(by, value))
+
+    def find_element(self, by=By.ID, value=None):
+        found = self.find_elements(by, value)
+        if not found:
+            raise NoSuchElementException(f"no such element: {by}={value}")
+        return found[0]
+
+    # ---------- Scripts ----------
+    def execute_script(self, script, *args):
+        """
+        Recognizes the scraper's scripts by what they touch; anything else returns None.
+        """
+        self._command()
+        tab = self._tab()
+        now = time.monotonic()
+        doc = tab.settle(now)
+
+        if "document.readyState" in script:
+            return doc.ready_state(now)
+        if "DetailsURL" in script:
+            links = doc.tree(now).xpath("//*[@data-binding='href=DetailsURL']")
+            if "out.push" not in script:
+                return [BASE_URL + a.get("href") if a.get("href", "").startswith("/") else a.get("href")
+                        for a in links]
+            cards = []
+            for a in links:
+                card = a.getparent()
+                price = card.xpath(".//*[contains(@class,'Price')]")
+                address = card.xpath(".//*[contains(@class,'Address')]")
+                img = card.xpath(".//img")
+                cards.append({
+                    "url": a.get("href"),
+                    "price": _inner_text(price[0]) if price else "",
+                    "address": _inner_text(address[0]) if address else "",
+                    "image": img[0].get("src") if img else "",
+                })
+            return cards
+        if "textContent" in script and args and isinstance(args[0], list):
+            out = []
+            for el in args[0]:
+                link = el._node.xpath(".//a[@href]")
+                out.append((link[0].get("href") if link else "") + "|" + " ".join(el._node.text_content().split()))
+            return out
+        if "location.hash" in script and args:
+            base = doc.url.partition("#")[0]
+            self._navigate(tab, f"{base}#{args[0]}")
+            return None
+        if ("location.replace" in script or "location.href" in script) and args:
+            self._navigate(tab, args[0])
+            return None
+        if ".click()" in script and args and isinstance(args[0], SimElement):
+            args[0].click()
+            return None
+        return None
+
+    def execute_cdp_cmd(self, cmd, params):
+        self._command(tab=False)
+        if cmd == "Network.getAllCookies":
+            return {"cookies": [dict(c) for c in self.cookies.values()]}
+        if cmd == "Network.setCookies":
+            for c in params.get("cookies", []):
+                self.cookies[c["name"]] = dict(c)
+        return {}
+
+    def execute(self, driver_command, params=None):
+        """
+        Only W3C actions arrive here (ActionChains): a pointer up over an element clicks it.
+        """
+        if driver_command == Command.W3C_ACTIONS:
+            self._command()
+            for device in (params or {}).get("actions", []):
+                target = None
+                for action in device.get("actions", []):
+                    origin = action.get("origin")
+                    if action.get("type") == "pointerMove" and isinstance(origin, dict):
+                        target = self._elements.get(next(iter(origin.values()), None))
+                    elif action.get("type") == "pointerUp" and target is not None:
+                        target.click()
+            return {"value": None}
+        if driver_command == Command.W3C_CLEAR_ACTIONS:
+            return {"value": None}
+        raise WebDriverException(f"the simulated driver does not implement {driver_command}")
+
+    # ---------- Windows ----------
+    @property
+    def window_handles(self) -> list:
+        self._command(tab=False)
+        return list(self._tabs)
+
+    @property
+    def current_window_handle(self) -> str:
+        self._command(tab=False)
+        self._tab()
+        return self._current
+
+    def close(self):
+        self._command(tab=False)
+        self._tab()
+        del self._tabs[self._current]
+        self._current = None
+
+    def quit(self):
+        self.alive = False
+        self._tabs.clear()
+
+    def maximize_window(self):
+        pass
+
+    def set_page_load_timeout(self, seconds):
+        self.page_load_timeout = float(seconds)
+
+    def implicitly_wait(self, seconds):
+        pass
+
+
+def sim_driver_factory(catalogue, latency=None, faults=None, page_load="normal", slow_delay=60.0, seed=0):
+    """
+    Returns a JobScheduler driver_factory making SimDrivers with distinct seeds.
+    The drivers made so far are in factory.drivers (for their stats).
+    """
+    seeds = itertools.count(seed)
+
+    def factory():
+        driver = SimDriver(catalogue, latency, faults, page_load, slow_delay, seed=next(seeds))
+        factory.drivers.append(driver)
+        return driver
+
+    factory.drivers = []
+    return factory
+
+
+if __name__ == "__main__":
+    import argparse
+    import functools
+    import os
+    import tempfile
+    import threading
+
+    import realtor_scrapper as rs
+    from jobs import Job, JobScheduler
+    from retry import RetryQueue
+    from tracing import tracer
+
+    parser = argparse.ArgumentParser(
+        description="Load-test the crawl loop (scheduler, pagination, process) against simulated browsers")
+    parser.add_argument("--listings", type=int, default=20000, help="catalogue size")
+    parser.add_argument("--jobs", type=int, default=0, help="one job per city, up to N (default: every city)")
+    parser.add_argument("--concurrency", type=int, default=4, help="simulated browsers")
+    parser.add_argument("--max-pages", type=int, default=5, help="results pages per job (0: all)")
+    parser.add_argument("--url-paging", action="store_true", help="open result pages through the URL hash")
+    parser.add_argument("--list-only", choices=("none", "changed"), help="scrape result cards only")
+    parser.add_argument("--prefetch", type=int, default=0, help="detail pages loaded ahead in background tabs")
+    parser.add_argument("--page-load", choices=rs.PAGE_LOAD_STRATEGIES, default="normal")
+    parser.add_argument("--listing-budget", type=float, default=2.0, help="seconds per listing")
+    parser.add_argument("--latency", default="",
+                        help="e.g. 'nav=lognormal:0.2,0.5 load=uniform:0.1,1 command=const:0.001'")
+    parser.add_argument("--faults", default="", help="e.g. blank=0.02,slow=0.01,error=0.01,blocked=0.01,crash=0.0001")
+    parser.add_argument("--slow-delay", type=float, default=60.0, help="seconds until a 'slow' page's cards render")
+    parser.add_argument("--sleep-scale", type=float, default=0.01,
+                        help="multiplier for the scraper's fixed pauses (1 = real time)")
+    parser.add_argument("--retry-pass", action="store_true", help="retry failed listings after the jobs")
+    parser.add_argument("--out", help="output directory (default: a temporary one)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    catalogue = Catalogue(args.listings, seed=args.seed)
+    out = args.out or tempfile.mkdtemp(prefix="sim-")
+    os.makedirs(out, exist_ok=True)
+    cities = catalogue.cities()[:args.jobs or None]
+    jobs = [Job(search_url(city), name=city, output=os.path.join(out, f"{city}.jsonl"),
+                max_pages=args.max_pages or None, list_only=args.list_only,
+                state=os.path.join(out, f"{city}.state.json") if args.list_only == "changed" else None,
+                paging="url" if args.url_paging else "click")
+            for city in cities]
+
+    rs.set_sleep(lambda seconds: tracer.sleep(seconds * args.sleep_scale))
+    factory = sim_driver_factory(catalogue, parse_latency(args.latency), parse_faults(args.faults),
+                                 args.page_load, args.slow_delay, seed=args.seed)
+    # Retry back-off shrinks with the scraper's pauses, or retry passes would wait in real time
+    retry = RetryQueue(os.path.join(out, "retry_queue.json"), base_delay=30 * args.sleep_scale,
+                       max_delay=900 * args.sleep_scale)
+    runner = functools.partial(rs.run_job, retry=retry, cache=rs.CardCache(), prefetch=args.prefetch,
+                               budget=args.listing_budget)
+
+    started = time.time()
+    scheduler = JobScheduler(jobs, runner, driver_factory=factory, concurrency=args.concurrency,
+                             log=logger.info, stop_event=threading.Event())
+    totals = scheduler.run()
+    if args.retry_pass and len(retry):
+        driver = factory()
+        try:
+            extract = rs.make_extractor(budget=args.listing_budget)
+            totals["recovered"] = rs.run_retry_pass(driver, retry, logger.info, threading.Event(), extract=extract)
+        finally:
+            driver.quit()
+    elapsed = time.time() - started
+
+    stats = {}
+    for driver in factory.drivers:
+        for key, value in driver.stats.items():
+            stats[key] = stats.get(key, 0) + value
+    logger.info(f"[sim] {len(catalogue)} listings, {len(jobs)} job(s), {args.concurrency} browser(s), "
+                f"{len(factory.drivers)} started: {totals.get('items', 0)} written in {elapsed:.1f}s "
+                f"({totals.get('items', 0) / max(elapsed, 1e-9):.1f}/s), {len(retry)} queued for retry")
+    logger.info("[sim] " + " ".join(f"{k}={v}" for k, v in stats.items()) + f"; output in {out}")
@@ -0,0 +1,206 @@
+import csv
+import json
+import os
+import threading
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.utils import get_column_letter
+
+from listing import Listing
+
+
+# =======================
+# OUTPUT LAYOUT
+# =======================
+HEADERS = [
+    "Price", "page link", "1st Image link",
+    "Line 1 Address", "City", "Province", "Post Code",
+    "Salesperson 1", "Phone#1", "Phone#2",
+    "Brokerage1", "Brokerage1 Addr#" ,"Brokerage1 Tel#",
+    "Salesperson 2", "Phone#1", "Phone#2",
+    "Brokerage2", "Brokerage2 Addr#" ,"Brokerage2 Tel#"
+]
+
+# One lock per output path, so jobs that share a target don't interleave writes.
+_path_locks = {}
+_path_locks_guard = threading.Lock()
+
+
+def _lock_for(path):
+    key = os.path.abspath(path)
+    with _path_locks_guard:
+        if key not in _path_locks:
+            _path_locks[key] = threading.Lock()
+        return _path_locks[key]
+
+
+# Listing field behind each HEADERS column
+ROW_FIELDS = (
+    "price_text",
+    "url",
+    "image",
+    "street", "city", "province", "postal",
+    "salesperson1", "salesperson1_phone1", "salesperson1_phone2",
+    "brokerage1", "brokerage1_address", "brokerage1_tel",
+    "salesperson2", "salesperson2_phone1", "salesperson2_phone2",
+    "brokerage2", "brokerage2_address", "brokerage2_tel",
+)
+
+
+def listing_row(listing: Listing) -> list:
+    """
+    Reshapes a Listing into a row matching HEADERS.
+    """
+    return [getattr(listing, f) for f in ROW_FIELDS]
+
+
+def listing_from_row(row) -> Listing:
+    """
+    Inverse of listing_row: rebuilds a Listing from a row in HEADERS order.
+    """
+    row = ["" if v is None else str(v) for v in row]
+    row += [""] * (len(HEADERS) - len(row))
+    listing = Listing(**dict(zip(ROW_FIELDS[1:], row[1:])))
+    listing.set_price(row[0])
+    if listing.street or listing.city:
+        listing.address = f"{listing.street}\n{listing.city}, {listing.province} {listing.postal}".strip()
+    return listing
+
+
+def _as_listing(data):
+    return data if isinstance(data, Listing) else Listing.from_dict(data)
+
+
+def append_to_excel(data, filename="scrapper.xlsx", sheet_name="Sheet1", extra_columns=()):
+    """
+    Appends scraped data (a Listing, or a raw info dict) to Excel in a structured format.
+    `extra_columns` is a sequence of (header, field) placed before the standard columns.
+    """
+    append_rows_to_excel([data], filename, sheet_name, extra_columns)
+
+
+def append_rows_to_excel(rows, filename="scrapper.xlsx", sheet_name="Sheet1", extra_columns=()):
+    """
+    Appends several listings with a single load / save of the workbook.
+    """
+    rows = [_as_listing(data) for data in rows]
+    headers = [h for h, _ in extra_columns] + HEADERS
+    # Create workbook if not exists
+    if not os.path.exists(filename):
+        wb = Workbook()
+        ws = wb.active
+        ws.title = sheet_name
+        ws.append(headers)
+        wb.save(filename)
+
+    # Load existing workbook
+    wb = load_workbook(filename)
+    if sheet_name not in wb.sheetnames:
+        ws = wb.create_sheet(sheet_name)
+        ws.append(headers)
+    else:
+        ws = wb[sheet_name]
+
+    # Append rows
+    for data in rows:
+        ws.append([getattr(data, k) for _, k in extra_columns] + listing_row(data))
+
+    # Auto-adjust column width
+    for col_idx, header in enumerate(headers, 1):
+        col_letter = get_column_letter(col_idx)
+        max_length = max(len(str(cell.value)) for cell in ws[col_letter])
+        ws.column_dimensions[col_letter].width = max(15, min(max_length + 2, 60))
+
+    wb.save(filename)
+
+
+# =======================
+# SINKS
+# =======================
+class ExcelSink:
+    """
+    Appends each listing to an .xlsx workbook (same layout as append_to_excel).
+    """
+
+    def __init__(self, filename="scrapper.xlsx", sheet_name="Sheet1", extra_columns=()):
+        self.filename = filename
+        self.sheet_name = sheet_name
+        self.extra_columns = tuple(extra_columns)
+        self.count = 0
+
+    def write(self, data: Listing):
+        self.write_many([data])
+
+    def write_many(self, rows):
+        with _lock_for(self.filename):
+            append_rows_to_excel(rows, self.filename, self.sheet_name, self.extra_columns)
+        self.count += len(rows)
+
+    def close(self):
+        pass
+
+
+class CsvSink:
+    """
+    Appends each listing as a CSV row; the header is written once per new file.
+    """
+
+    def __init__(self, filename, extra_columns=()):
+        self.filename = filename
+        self.extra_columns = tuple(extra_columns)
+        self.count = 0
+
+    def write(self, data: Listing):
+        self.write_many([data])
+
+    def write_many(self, rows):
+        rows = [_as_listing(data) for data in rows]
+        with _lock_for(self.filename):
+            new_file = not os.path.exists(self.filename) or os.path.getsize(self.filename) == 0
+            with open(self.filename, "a", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                if new_file:
+                    writer.writerow([h for h, _ in self.extra_columns] + HEADERS)
+                for data in rows:
+                    writer.writerow([getattr(data, k) for _, k in self.extra_columns] + listing_row(data))
+        self.count += len(rows)
+
+    def close(self):
+        pass
+
+
+class JsonlSink:
+    """
+    Appends each listing as one JSON line (Listing.to_dict()).
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.count = 0
+
+    def write(self, data: Listing):
+        self.write_many([data])
+
+    def write_many(self, rows):
+        lines = "".join(json.dumps(_as_listing(data).to_dict(), ensure_ascii=False) + "\n" for data in rows)
+        with _lock_for(self.filename):
+            with open(self.filename, "a", encoding="utf-8") as f:
+                f.write(lines)
+        self.count += len(rows)
+
+    def close(self):
+        pass
+
+
+def open_sink(target="scrapper.xlsx", extra_columns=()):
+    """
+    Returns a sink for an output target, picked by file extension
+    (.xlsx, .csv, .jsonl/.ndjson). Unknown extensions fall back to Excel.
+    `extra_columns` only applies to the tabular formats; JSONL keeps every key.
+    """
+    ext = os.path.splitext(target)[1].lower()
+    if ext == ".csv":
+        return CsvSink(target, extra_columns)
+    if ext in (".jsonl", ".ndjson"):
+        return JsonlSink(target)
+    return ExcelSink(target, extra_columns=extra_columns)
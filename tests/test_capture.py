@@ -0,0 +1,121 @@
+import json
+
+from selenium.common.exceptions import WebDriverException
+
+import realtor_scrapper as rs
+from capture import NetworkCapture
+from extract import Deadline
+from simdriver import Catalogue, SimDriver, parse_latency
+
+
+NO_LATENCY = parse_latency("command=const:0 nav=const:0 load=const:0 search=const:0")
+DETAILS = "https://api2.realtor.ca/Listing.svc/PropertyDetails?ApplicationId=1&PropertyId="
+SEARCH = "https://api2.realtor.ca/Listing.svc/PropertySearch_Post"
+
+
+def record(lid, price, street="1 Main St"):
+    return {
+        "Id": lid,
+        "RelativeDetailsURL": f"/real-estate/{lid}/x",
+        "Property": {"Price": f"${price:,}", "Address": {"AddressText": f"{street}|London, Ontario N6A1A1"}},
+        "Individual": [{"Name": "Jane Doe",
+                        "Phones": [{"PhoneType": "Telephone", "AreaCode": "519", "PhoneNumber": "555-0101"}],
+                        "Organization": {"OrganizationID": 7, "Name": "Acme Realty",
+                                         "Phones": [{"PhoneType": "Telephone", "AreaCode": "519",
+                                                     "PhoneNumber": "555-1111"}]}}],
+    }
+
+
+class PerformanceLog:
+    """
+    Chrome's performance log and Network.getResponseBody, fed by respond():
+    like Chrome, a body can only be read while its tab is the current one.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.entries = []
+        self.bodies = {}
+
+    def respond(self, tab, request_id, url, payload, event="Network.loadingFinished"):
+        for method, params in (("Network.responseReceived", {"response": {"url": url}}), (event, {})):
+            self.entries.append({"message": json.dumps({
+                "webview": tab, "message": {"method": method, "params": {"requestId": request_id, **params}}})})
+        self.bodies[tab, request_id] = payload
+
+    def get_log(self, kind):
+        entries, self.entries = self.entries, []
+        return entries
+
+    def execute_cdp_cmd(self, cmd, params):
+        if cmd != "Network.getResponseBody":
+            return super().execute_cdp_cmd(cmd, params)
+        key = (self.current_window_handle, params["requestId"])
+        if key not in self.bodies:
+            raise WebDriverException("No resource with given identifier found")
+        return {"body": json.dumps(self.bodies.pop(key))}
+
+
+class FakeDriver(PerformanceLog):
+    current_window_handle = "MAP"
+
+
+class CapturingSimDriver(PerformanceLog, SimDriver):
+    pass
+
+
+def test_responses_are_matched_to_their_tab():
+    driver = FakeDriver()
+    capture = NetworkCapture(driver)
+    # Request IDs are only unique within a tab: both tabs use "1000.7"
+    driver.respond("MAP", "1000.7", SEARCH, {"Results": [record("100", 500000), record("200", 600000)]})
+    driver.respond("DETAIL", "1000.7", DETAILS + "200", record("200", 590000, street="2 Main St"))
+
+    capture.poll()
+    assert capture.listing("100").price == 500000
+    assert capture.listing("200").price == 600000  # the detail tab's body is not readable yet
+    assert capture.stats == {"responses": 1, "records": 2, "errors": 0, "dropped": 0}
+
+    driver.current_window_handle = "DETAIL"
+    info = capture.listing("200")
+    assert (info.price, info.street, info.url) == (590000, "2 Main St", "https://www.realtor.ca/real-estate/200/x")
+    assert (info.salesperson1, info.salesperson1_phone1) == ("Jane Doe", "519-555-0101")
+    assert (info.brokerage1, info.brokerage1_tel) == ("Acme Realty", "519-555-1111")
+
+    # A later search summary does not replace the detail record
+    driver.current_window_handle = "MAP"
+    driver.respond("MAP", "1000.9", SEARCH, {"Results": [record("200", 610000)]})
+    assert capture.listing("200").price == 590000
+    assert capture.stats["errors"] == 0
+
+
+def test_unmatched_responses_are_dropped():
+    driver = FakeDriver()
+    capture = NetworkCapture(driver, max_age=0)
+    driver.respond("MAP", "1.1", DETAILS + "300", record("300", 1), event="Network.loadingFailed")
+    driver.respond("MAP", "1.2", "https://www.realtor.ca/images/logo.svg", {})
+    # Finished in a tab that is never current again (closed): dropped after max_age
+    driver.respond("GONE", "1.3", DETAILS + "400", record("400", 1))
+    capture.poll()
+    capture.poll()
+    assert capture.listing("300") is None and capture.listing("400") is None
+    assert capture.stats == {"responses": 0, "records": 0, "errors": 0, "dropped": 1}
+
+
+def test_extractor_falls_back_to_the_dom():
+    catalogue = Catalogue(20, seed=1)
+    captured, missed = list(catalogue.by_id.values())[:2]
+    driver = CapturingSimDriver(catalogue, NO_LATENCY, page_load="eager")
+    tab = driver.current_window_handle
+    extract = rs.make_extractor(NetworkCapture(driver), html=True, budget=0.5)
+
+    driver.get(captured["url"])
+    driver.respond(tab, "5.1", DETAILS + captured["id"], record(captured["id"], 123456))
+    info = extract(driver, Deadline(0.5))
+    assert (info.price, info.url) == (123456, captured["url"])
+
+    # No response captured for this one: read from the page
+    driver.get(missed["url"])
+    info = extract(driver, Deadline(0.5))
+    assert (info.price, info.street, info.url) == (missed["price"], missed["street"], missed["url"])
+    assert info.salesperson1 == missed["agents"][0][0]
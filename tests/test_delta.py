@@ -0,0 +1,85 @@
+import json
+import os
+import threading
+
+import pytest
+from selenium.webdriver.support.ui import WebDriverWait
+
+import realtor_scrapper as rs
+from jobs import Job, JobScheduler
+from simdriver import Catalogue, parse_faults, parse_latency, search_url, sim_driver_factory
+from tracing import tracer
+
+
+NO_LATENCY = parse_latency("command=const:0 nav=const:0 load=const:0 search=const:0")
+
+
+@pytest.fixture(autouse=True)
+def no_pauses():
+    rs.set_sleep(lambda seconds: None)
+    yield
+    rs.set_sleep(tracer.sleep)
+
+
+def crawl(catalogue, city, state, output, faults=None, **options):
+    job = Job(search_url(city), name=city, output=output, state=state, **options)
+    factory = sim_driver_factory(catalogue, NO_LATENCY, parse_faults(faults or ""), page_load="eager")
+    JobScheduler([job], rs.run_job, driver_factory=factory, log=lambda msg: None,
+                 stop_event=threading.Event()).run()
+    if not os.path.exists(output):
+        return job, []  # nothing written
+    with open(output, encoding="utf-8") as f:
+        return job, [json.loads(line) for line in f]
+
+
+def changes(rows):
+    return sorted((row["change"], row["url"]) for row in rows)
+
+
+def test_new_changed_and_removed_listings(tmp_path):
+    catalogue = Catalogue(200, seed=5)
+    city, other = catalogue.cities()[:2]
+    listings = catalogue.by_city[city.lower()]
+    state = str(tmp_path / "state.json")
+
+    job, rows = crawl(catalogue, city, state, str(tmp_path / "run1.jsonl"))
+    assert job.status == "done"
+    assert changes(rows) == sorted(("new", item["url"]) for item in listings)
+
+    # Between crawls: one price drops, one listing sells, one is listed
+    changed, removed = listings[0], listings.pop(1)
+    changed["price"] -= 10000
+    added = catalogue.by_city[other.lower()].pop()
+    listings.append(added)
+
+    job, rows = crawl(catalogue, city, state, str(tmp_path / "run2.jsonl"))
+    assert changes(rows) == sorted([("changed", changed["url"]), ("new", added["url"]),
+                                    ("removed", removed["url"])])
+    assert next(row for row in rows if row["change"] == "changed")["old_price"] == f"${changed['price'] + 10000:,}"
+    assert job.delta == {"new": 1, "changed": 1, "unchanged": len(listings) - 2, "removed": 1}
+
+
+@pytest.mark.parametrize("cut_short", ["page_limit", "timeout"])
+def test_partial_crawl_reports_no_removals(tmp_path, monkeypatch, cut_short):
+    catalogue = Catalogue(200, seed=5)
+    city = catalogue.cities()[0]
+    listings = catalogue.by_city[city.lower()]
+    state = str(tmp_path / "state.json")
+    crawl(catalogue, city, state, str(tmp_path / "run1.jsonl"))
+    assert len(listings) > rs.RESULTS_PER_PAGE
+
+    gone = listings.pop()
+    if cut_short == "page_limit":
+        job, rows = crawl(catalogue, city, state, str(tmp_path / "run2.jsonl"), max_pages=1)
+        assert job.status == "done"
+    else:
+        # Every results page is a bot-check page: no cards, and the Next button never shows
+        monkeypatch.setattr(rs, "WebDriverWait", lambda driver, timeout, **kw: WebDriverWait(driver, 0.2, **kw))
+        job, rows = crawl(catalogue, city, state, str(tmp_path / "run2.jsonl"), faults="blocked=1")
+        assert job.status == "incomplete"
+    assert not [row for row in rows if row["change"] == "removed"]
+    assert job.delta["removed"] == 0
+
+    # The listings not reached are still in the state, so the next full crawl finds the real removal
+    job, rows = crawl(catalogue, city, state, str(tmp_path / "run3.jsonl"))
+    assert changes(rows) == [("removed", gone["url"])]
@@ -0,0 +1,73 @@
+import os
+
+import pytest
+from lxml import html as lxml_html
+
+from extract_html import _inner_text, parse_listing_html
+
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def parse_fixture(name):
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return parse_listing_html(f.read(), url="https://www.realtor.ca/real-estate/40512345/x")
+
+
+@pytest.mark.parametrize("markup, expected", [
+    ("<div>Jane <span>Q.</span> Doe</div>", "Jane Q. Doe"),
+    ("<div>  many \n   spaces\t here </div>", "many spaces here"),
+    ("<div><div>one</div><div>two</div></div>", "one\ntwo"),
+    ("<div><span>one</span><span>two</span></div>", "onetwo"),
+    ("<div>line1<br>line2<br/><br>line3</div>", "line1\nline2\nline3"),
+    ("<div><p>para</p>tail<ul><li>a</li><li>b</li></ul></div>", "para\ntail\na\nb"),
+    ("<div>shown<span hidden>hidden</span></div>", "shown"),
+    ("<div>shown<span style='display: none'>gone</span><i style='visibility:hidden'>gone</i></div>", "shown"),
+    ("<div>text<script>var x = 1;</script><style>p {}</style><noscript>js off</noscript></div>", "text"),
+    ("<div>a<!-- comment -->b</div>", "ab"),
+    ("<div>  </div>", ""),
+])
+def test_inner_text_matches_rendered_text(markup, expected):
+    assert _inner_text(lxml_html.fragment_fromstring(markup)) == expected
+
+
+def test_full_listing():
+    info = parse_fixture("listing_full.html")
+
+    assert info.image == "https://cdn.realtor.ca/listings/TS638123456789/reb5/highres/5/40512345_1.jpg"
+    assert info.price_text == "$749,900" and info.price == 749900
+    assert info.address == "123 Main Street\nKitchener (Central Frederick), Ontario N2H2L6"
+    assert (info.street, info.city, info.province, info.postal) == (
+        "123 Main Street", "Kitchener (Central Frederick)", "Ontario", "N2H2L6")
+
+    assert (info.salesperson1, info.salesperson1_phone1, info.salesperson1_phone2) == (
+        "Jane Q. Doe", "519-555-0101", "519-555-0199")
+    # A hidden phone reads as empty text and is skipped, as WebElement.text does
+    assert (info.salesperson2, info.salesperson2_phone1, info.salesperson2_phone2) == (
+        "Sam Lee", "226-555-0142", "-")
+
+    # officeCardTopLeft: name, "Brokerage", then the address lines (split by a <br>)
+    assert info.brokerage1 == "RE/MAX TWIN CITY REALTY INC."
+    assert info.brokerage1_address == "83 Erb St W Waterloo, Ontario N2L6C2"
+    assert info.brokerage1_tel == "519-885-1111"
+    assert (info.brokerage2, info.brokerage2_address, info.brokerage2_tel) == ("-", "-", "-")
+
+
+def test_listing_fallbacks():
+    info = parse_fixture("listing_fallbacks.html")
+
+    assert info.url == "https://www.realtor.ca/real-estate/40512345/x"
+    assert info.image == ""
+    assert info.price_text == "$2,450/Monthly" and info.price == 2450
+    assert (info.street, info.city, info.province, info.postal) == (
+        "Unit 4 - 50 Young Street", "Toronto", "Ontario", "M5E1G9")
+    assert (info.salesperson1, info.salesperson1_phone1, info.salesperson1_phone2) == ("Alex Martin", "-", "-")
+    assert info.salesperson2 == "-"
+
+    # No officeCardTopLeft: the whole card's text is split instead; no phone at all
+    assert info.brokerage1 == "Royal LePage Signature Realty"
+    assert info.brokerage1_address == "495 Wellington St W Toronto, Ontario M5V1E9"
+    assert info.brokerage1_tel == "-"
+    # Name only, and no officeCardContactNumber: the first Telephone is used
+    assert (info.brokerage2, info.brokerage2_address, info.brokerage2_tel) == (
+        "Harbour Team Realty", "-", "416-555-0177")
@@ -0,0 +1,80 @@
+import hashlib
+import http.server
+import json
+import os
+import threading
+
+import pytest
+
+from images import ImageDownloader
+
+
+IMAGES = {
+    "/a.jpg": b"\xff\xd8 first image",
+    "/b.jpg": b"\xff\xd8 first image",  # same bytes under another URL
+    "/c.png": b"\x89PNG second image",
+}
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = IMAGES.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_downloads_are_content_addressed_and_indexed(server, tmp_path):
+    root = str(tmp_path / "images")
+    downloader = ImageDownloader(root, concurrency=2, retries=0)
+    paths = {name: downloader.submit(server + name).result(timeout=10) for name in ("/a.jpg", "/b.jpg", "/c.png")}
+    missing = downloader.submit(server + "/gone.jpg").result(timeout=10)
+    downloader.close()
+
+    digest = hashlib.sha256(IMAGES["/a.jpg"]).hexdigest()
+    assert paths["/a.jpg"] == paths["/b.jpg"] == os.path.join(root, digest[:2], digest + ".jpg")
+    assert paths["/c.png"].endswith(".png")
+    assert missing is None
+    assert downloader.stats == {"downloaded": 2, "deduped": 1, "skipped": 0, "failed": 1, "thumb_failed": 0}
+    with open(os.path.join(root, "index.json"), encoding="utf-8") as f:
+        assert set(json.load(f)) == {server + name for name in paths}
+
+    # A new run skips URLs already in the index
+    again = ImageDownloader(root, retries=0)
+    assert again.submit(server + "/a.jpg").result(timeout=10) == paths["/a.jpg"]
+    again.close()
+    assert again.stats["skipped"] == 1
+
+
+def test_thumbnail_error_keeps_the_download(server, tmp_path):
+    downloader = ImageDownloader(str(tmp_path / "images"), retries=0)
+    downloader.thumbnail = (64, 64)
+
+    def broken(path, digest):
+        raise OSError("cannot identify image file")
+
+    downloader._make_thumbnail = broken
+    path = downloader.submit(server + "/c.png").result(timeout=10)
+    downloader.close()
+
+    assert path and os.path.exists(path)
+    assert downloader.path_for(server + "/c.png") == path
+    assert downloader.stats["downloaded"] == 1
+    assert downloader.stats["failed"] == 0
+    assert downloader.stats["thumb_failed"] == 1
@@ -0,0 +1,78 @@
+import json
+import os
+
+from delta import CrawlState, StateEntry, listing_id
+from listing import Listing
+from merge import merge, read_shard
+from sinks import open_sink
+
+
+T = 1_700_000_000
+
+
+def listing(n, price):
+    info = Listing(url=f"https://www.realtor.ca/real-estate/{27000000 + n}/x")
+    info.set_price(f"${price:,}")
+    info.set_address(f"{n} Main St\nLondon, Ontario N6A1A{n}")
+    return info
+
+
+def write_shard(path, listings, mtime):
+    sink = open_sink(str(path))
+    sink.write_many(listings)
+    sink.close()
+    os.utime(path, (mtime, mtime))
+
+
+def write_jsonl(path, records, mtime):
+    with open(path, "w", encoding="utf-8") as f:
+        for info, seen in records:
+            f.write(json.dumps({**info.to_dict(), "last_seen": seen}) + "\n")
+    os.utime(path, (mtime, mtime))
+
+
+def merged(path):
+    return {listing_id(info): (info.price, seen) for info, seen in read_shard(str(path))}
+
+
+def test_last_seen_precedence_across_formats(tmp_path):
+    A, B, C, D = (listing_id(listing(n, 0)) for n in range(4))
+    csv_shard = tmp_path / "day1.csv"
+    jsonl_shard = tmp_path / "day2.jsonl"
+    master = tmp_path / "master.xlsx"
+
+    write_shard(csv_shard, [listing(0, 100), listing(1, 200), listing(2, 300)], mtime=T + 1000)
+    # Rows that carry their own last_seen, in a file modified after every other
+    write_jsonl(jsonl_shard, [(listing(0, 110), T + 500), (listing(1, 210), T + 2000),
+                              (listing(3, 410), T + 3500)], mtime=T + 9000)
+    write_shard(master, [listing(1, 220), listing(2, 320), listing(3, 420)], mtime=T + 4000)
+    state = CrawlState(str(tmp_path / "state.json"))
+    for n in (1, 3):
+        info = listing(n, 0)
+        state.listings[listing_id(info)] = StateEntry("", "", info.url, "", T, T + 3000)
+    state.save()
+
+    # The master file is both an input and the output
+    stats = merge([str(csv_shard), str(jsonl_shard), str(master)], str(master), states=[state.path],
+                  log=lambda msg: None)
+
+    assert stats == {"files": 3, "rows": 9, "unique": 4, "duplicates": 5}
+    assert merged(master) == {
+        A: (100, T + 1000),   # the row's own last_seen beats the newer file's mtime
+        B: (220, T + 3000),   # state beats an older row value; a tie goes to the later file
+        C: (320, T + 4000),   # neither: file mtime
+        D: (410, T + 3500),   # the row's own value beats state, state beats mtime
+    }
+    assert not [name for name in os.listdir(tmp_path) if ".merging" in name]
+
+
+def test_merge_to_csv_and_jsonl_round_trips(tmp_path):
+    shard = tmp_path / "shard.xlsx"
+    write_shard(shard, [listing(0, 100), listing(1, 200), listing(0, 150)], mtime=T)
+
+    for name in ("out.csv", "out.jsonl"):
+        merge([str(shard)], str(tmp_path / name), log=lambda msg: None)
+        assert merged(tmp_path / name) == {
+            listing_id(listing(0, 0)): (150, T),  # the later row of the same file wins
+            listing_id(listing(1, 0)): (200, T),
+        }
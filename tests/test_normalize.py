@@ -0,0 +1,112 @@
+import csv
+
+import pytest
+from openpyxl import load_workbook
+
+from listing import Listing
+from sinks import HEADERS, open_sink
+
+pd = pytest.importorskip("pandas")
+
+from normalize import (normalize_file, normalize_frame, normalize_phone, normalize_postal,  # noqa: E402
+                       normalize_price)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("$549,900", 549900),
+    ("$2,500/Monthly", 2500),
+    ("$1,234.60", 1235),
+    ("Price on request", None),
+    ("", None),
+    (None, None),
+])
+def test_price(text, expected):
+    value = normalize_price(pd.Series([text]))[0]
+    assert (value is pd.NA) if expected is None else value == expected
+
+
+@pytest.mark.parametrize("text, expected, valid", [
+    ("n6a1a1", "N6A 1A1", True),
+    ("M5J 2N8", "M5J 2N8", True),
+    (" t2p-1j9 ", "T2P 1J9", True),
+    ("D6A 1A1", "", False),   # D is never a first letter
+    ("N6A 1A", "", False),
+    ("", "", False),
+])
+def test_postal(text, expected, valid):
+    codes, ok = normalize_postal(pd.Series([text]))
+    assert (codes[0], bool(ok[0])) == (expected, valid)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("(519) 555-1234", "519-555-1234"),
+    ("519.555.1234", "519-555-1234"),
+    ("1-800-555-0199", "800-555-0199"),
+    ("+1 416 555 0177", "416-555-0177"),
+    ("555-1234", "555-1234"),     # not a full number: kept as given
+    ("-", "-"),
+    ("", ""),
+])
+def test_phone(text, expected):
+    assert normalize_phone(pd.Series([text]))[0] == expected
+
+
+ADDRESSES = [
+    # address, (street, city, province, postal, postal_ok)
+    ("123 Main St\nLondon, Ontario N6A1A1", ("123 Main St", "London", "ON", "N6A 1A1", True)),
+    ("5 Rue Roy\nMontréal, Québec h2x 1y4", ("5 Rue Roy", "Montréal", "QC", "H2X 1Y4", True)),
+    ("2 Water St\nSt. John's, Newfoundland and Labrador A1C1A1",
+     ("2 Water St", "St. John's", "NL", "A1C 1A1", True)),
+    ("9 Iqaluit Rd\nIqaluit, Nunavut X0A0H0", ("9 Iqaluit Rd", "Iqaluit", "NU", "X0A 0H0", True)),
+    # No province: inferred from the postal code
+    ("4 Stephen Ave\nCalgary, T2P 1J9", ("4 Stephen Ave", "Calgary", "AB", "T2P 1J9", True)),
+    # Postal code of another province: kept, but flagged
+    ("1 Bay St\nToronto, British Columbia M5J2N8", ("1 Bay St", "Toronto", "BC", "M5J 2N8", False)),
+    ("7 Main St\nWhitehorse, Yukon", ("7 Main St", "Whitehorse", "YT", "", False)),
+]
+
+
+def test_frame_resplits_addresses():
+    df = pd.DataFrame({"address": [a for a, _ in ADDRESSES], "price_text": "$1"})
+    normalize_frame(df)
+    got = list(zip(df["street"], df["city"], df["province"], df["postal"], df["postal_ok"]))
+    assert got == [expected for _, expected in ADDRESSES]
+
+
+def test_frame_infers_province_from_postal_code():
+    # Only the split columns were kept, and the province is missing
+    df = pd.DataFrame({"address": [""], "street": ["9 Elm St"], "city": ["Calgary"], "province": [""],
+                       "postal": ["t2p1j9"], "price_text": ["$1"]})
+    normalize_frame(df)
+    assert (df["street"][0], df["city"][0], df["province"][0], df["postal"][0]) == ("9 Elm St", "Calgary", "AB",
+                                                                                    "T2P 1J9")
+    assert bool(df["postal_ok"][0])
+
+
+def test_files_lead_with_normalized_columns(tmp_path):
+    src = tmp_path / "raw.csv"
+    sink = open_sink(str(src))
+    for n, (address, _) in enumerate(ADDRESSES):
+        info = Listing(url=f"https://www.realtor.ca/real-estate/{27000000 + n}/x", salesperson1_phone1="(519) 555-1234")
+        info.set_price(f"${(n + 1) * 100000:,}")
+        info.set_address(address)
+        sink.write(info)
+    sink.close()
+
+    for name in ("clean.csv", "clean.xlsx"):
+        dst = tmp_path / name
+        normalize_file(str(src), str(dst), log=lambda msg: None)
+        if name.endswith(".csv"):
+            with open(dst, newline="", encoding="utf-8") as f:
+                rows = list(csv.reader(f))
+        else:
+            rows = [["" if v is None else str(v) for v in row]
+                    for row in load_workbook(dst, read_only=True).active.iter_rows(values_only=True)]
+        assert rows[0] == ["Price Value", "Postal OK"] + HEADERS
+        assert [row[0] for row in rows[1:]] == [str((n + 1) * 100000) for n in range(len(ADDRESSES))]
+        assert [row[1] for row in rows[1:]] == [str(expected[4]) for _, expected in ADDRESSES]
+        assert "519-555-1234" in rows[1]
+
+    # A normalized file reads back and normalizes again to the same result
+    again = normalize_file(str(tmp_path / "clean.csv"), str(tmp_path / "again.csv"), log=lambda msg: None)
+    assert list(again["postal"]) == [expected[3] for _, expected in ADDRESSES]
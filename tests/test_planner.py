@@ -0,0 +1,57 @@
+import math
+
+from jobs import Job
+from planner import DAY, HOUR, CrawlHistory, plan
+
+
+NOW = 1_700_000_000.0
+
+
+def run(at, elapsed=HOUR / 2, **delta):
+    return {"at": at, "elapsed": elapsed, "status": "done", "pages": 10, "items": 100, **delta}
+
+
+def history_for(tmp_path, runs):
+    history = CrawlHistory(str(tmp_path / "history.json"))
+    history.runs = runs
+    return history
+
+
+def test_stateless_job_does_not_starve_learned_ones(tmp_path):
+    busy = Job("https://example.com/a", name="busy", state="a.json")
+    quiet = Job("https://example.com/b", name="quiet", state="b.json")
+    stateless = Job("https://example.com/c", name="stateless")
+    history = history_for(tmp_path, {
+        "busy": [run(NOW - 4 * DAY, new=20, changed=20, removed=8), run(NOW - 2 * DAY, new=30, changed=10, removed=8)],
+        "quiet": [run(NOW - 5 * DAY, new=1, changed=0, removed=0), run(NOW - 3 * DAY, new=2, changed=1, removed=0)],
+        "stateless": [run(NOW - 8 * DAY)],
+    })
+
+    # Room for two half-hour crawls: both learned jobs beat the one that can't be learned
+    selected, entries = plan([stateless, busy, quiet], history, budget_hours=1.0, now=NOW, log=lambda msg: None)
+    by_name = {e.job.name: e for e in entries}
+    assert [job.name for job in selected] == ["busy", "quiet"]
+    assert by_name["stateless"].rate is None
+    assert by_name["stateless"].interval == 7 * DAY
+    assert by_name["stateless"].due and math.isfinite(by_name["stateless"].score)
+    assert by_name["busy"].score > by_name["quiet"].score > by_name["stateless"].score
+    assert "untracked" in by_name["stateless"].describe()
+
+    # With budget to spare it still runs, but only once a week
+    selected, _ = plan([stateless, busy, quiet], history, budget_hours=2.0, now=NOW, log=lambda msg: None)
+    assert {job.name for job in selected} == {"busy", "quiet", "stateless"}
+    history.runs["stateless"] = [run(NOW - 3 * DAY)]
+    selected, _ = plan([stateless, busy, quiet], history, budget_hours=2.0, now=NOW, log=lambda msg: None)
+    assert "stateless" not in {job.name for job in selected}
+
+
+def test_new_jobs_are_measured_first(tmp_path):
+    learned = Job("https://example.com/a", name="learned", state="a.json")
+    fresh = Job("https://example.com/b", name="fresh")
+    history = history_for(tmp_path, {
+        "learned": [run(NOW - 4 * DAY, new=5, changed=5, removed=0), run(NOW - 2 * DAY, new=5, changed=5, removed=0)],
+    })
+
+    selected, entries = plan([learned, fresh], history, budget_hours=0.5, now=NOW, log=lambda msg: None)
+    assert [job.name for job in selected] == ["fresh"]
+    assert {e.job.name: e.score for e in entries}["fresh"] == math.inf
@@ -0,0 +1,119 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+import realtor_scrapper as rs
+from jobs import Job, JobScheduler
+from sessions import SessionStore
+from simdriver import Catalogue, parse_faults, parse_latency, search_url, sim_driver_factory
+from tracing import tracer
+
+
+NO_LATENCY = parse_latency("command=const:0 nav=const:0 load=const:0 search=const:0")
+
+
+@pytest.fixture(autouse=True)
+def no_pauses():
+    rs.set_sleep(lambda seconds: None)
+    yield
+    rs.set_sleep(tracer.sleep)
+
+
+@pytest.fixture
+def catalogue():
+    return Catalogue(40, seed=3)
+
+
+def crawl(store, catalogue, tmp_path, faults=None):
+    """
+    One job on a fresh simulated browser with a session checked out of `store`,
+    as init_driver does. Returns the job, the driver and its session.
+    """
+    sim = sim_driver_factory(catalogue, NO_LATENCY, parse_faults(faults or ""), page_load="eager")
+    city = catalogue.cities()[0]
+    job = Job(search_url(city), name=city, output=str(tmp_path / f"{city}.jsonl"), max_pages=1)
+    JobScheduler([job], rs.run_job, driver_factory=lambda: rs.bind_identity(sim(), store.checkout()),
+                 log=lambda msg: None, stop_event=threading.Event()).run()
+    driver, = sim.drivers
+    return job, driver, driver.browser_session
+
+
+def meta(store, session):
+    with open(os.path.join(store.root, session.id, "meta.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_session_is_saved_and_restored(tmp_path, catalogue):
+    store = SessionStore(str(tmp_path / "sessions"))
+    job, first, session = crawl(store, catalogue, tmp_path)
+    assert job.status == "done"
+    assert session.kind == "new"
+    assert meta(store, session)["uses"] == 1
+    cookie = first.cookies["visid_incap"]["value"]
+
+    # The next browser gets the same identity back, cookies included
+    job, second, again = crawl(store, catalogue, tmp_path)
+    assert (again.id, again.kind) == (session.id, "recycled")
+    assert second.cookies["visid_incap"]["value"] == cookie
+    assert meta(store, again)["uses"] == 2
+    assert store.stats["recycled"]["checkouts"] == 1
+
+
+def test_blocked_session_is_discarded(tmp_path, catalogue):
+    store = SessionStore(str(tmp_path / "sessions"))
+    _, _, session = crawl(store, catalogue, tmp_path)
+
+    job, _, blocked = crawl(store, catalogue, tmp_path, faults="blocked=1")
+    assert job.status == "failed"
+    assert blocked.id == session.id and blocked.blocked
+    assert not os.path.exists(os.path.join(store.root, session.id))
+    assert store.stats["recycled"]["blocked"] == 1
+
+    _, _, fresh = crawl(store, catalogue, tmp_path)
+    assert fresh.kind == "new" and fresh.id != session.id
+
+
+def test_session_retired_after_failures_in_a_row(tmp_path, catalogue):
+    store = SessionStore(str(tmp_path / "sessions"), max_failures=3)
+    _, _, session = crawl(store, catalogue, tmp_path)
+
+    for failures in (1, 2, 3):
+        job, _, same = crawl(store, catalogue, tmp_path, faults="crash=1")
+        assert job.status == "failed"
+        assert same.id == session.id
+        assert meta(store, same)["failures"] == failures
+
+    # A healthy job in between would have reset the count; three in a row retire it
+    _, _, fresh = crawl(store, catalogue, tmp_path)
+    assert fresh.id != session.id and fresh.kind == "new"
+    assert not os.path.exists(os.path.join(store.root, session.id))
+
+
+def test_failure_count_resets_after_a_healthy_job(tmp_path, catalogue):
+    store = SessionStore(str(tmp_path / "sessions"), max_failures=2)
+    _, _, session = crawl(store, catalogue, tmp_path)
+    for faults in ("crash=1", "", "crash=1"):
+        _, _, same = crawl(store, catalogue, tmp_path, faults=faults)
+        assert same.id == session.id
+    assert meta(store, session)["failures"] == 1
+
+
+def test_session_retired_when_too_old(tmp_path, catalogue):
+    store = SessionStore(str(tmp_path / "sessions"), max_age=3600)
+    _, _, session = crawl(store, catalogue, tmp_path)
+
+    session.meta["created"] = time.time() - 7200
+    session._save_meta()
+    _, _, fresh = crawl(store, catalogue, tmp_path)
+    assert fresh.id != session.id and fresh.kind == "new"
+    assert not os.path.exists(os.path.join(store.root, session.id))
+
+
+def test_session_retired_after_max_jobs(tmp_path, catalogue):
+    store = SessionStore(str(tmp_path / "sessions"), max_uses=2)
+    ids = [crawl(store, catalogue, tmp_path)[2].id for _ in range(3)]
+    assert ids[0] == ids[1] != ids[2]
+    assert os.listdir(store.root) == [ids[2]]
@@ -0,0 +1,128 @@
+import functools
+import json
+import threading
+
+import pytest
+from selenium.webdriver.support.ui import WebDriverWait
+
+import realtor_scrapper as rs
+from jobs import Job, JobScheduler
+from retry import RetryQueue
+from simdriver import Catalogue, parse_faults, parse_latency, search_url, sim_driver_factory
+from tracing import tracer
+
+
+NO_LATENCY = parse_latency("command=const:0 nav=const:0 load=const:0 search=const:0")
+
+
+@pytest.fixture(autouse=True)
+def no_pauses():
+    rs.set_sleep(lambda seconds: None)
+    yield
+    rs.set_sleep(tracer.sleep)
+
+
+def read_rows(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_faulty_detail_pages_are_queued_once_and_recovered(tmp_path):
+    catalogue = Catalogue(400, seed=7)
+    city = catalogue.cities()[0]
+    expected = {item["url"] for item in catalogue.by_city[city.lower()]}
+    output = str(tmp_path / "out.jsonl")
+    job = Job(search_url(city), name=city, output=output, paging="url")
+
+    # Blank pages never render; slow ones miss the listing budget. Both must be
+    # queued exactly once, not written. The long back-off keeps run_job from
+    # retrying them itself.
+    factory = sim_driver_factory(catalogue, NO_LATENCY, parse_faults("blank=0.25,slow=0.15"),
+                                 page_load="eager", slow_delay=60)
+    retry = RetryQueue(str(tmp_path / "retry.json"), base_delay=3600)
+    runner = functools.partial(rs.run_job, retry=retry, budget=0.5)
+    totals = JobScheduler([job], runner, driver_factory=factory, log=lambda msg: None,
+                          stop_event=threading.Event()).run()
+
+    stats = factory.drivers[0].stats
+    faults = stats["blank"] + stats["slow"]
+    rows = read_rows(output)
+    assert job.status == "done"
+    assert stats["blank"] > 0 and stats["slow"] > 0
+    assert len(retry) == faults
+    assert len(rows) == totals["items"] == len(expected) - faults
+    assert {row["url"] for row in rows} | {e["url"] for e in retry.pending()} == expected
+
+    # A retry pass on a healthy browser recovers every one without duplicating rows
+    for entry in retry.entries.values():
+        entry["next_at"] = 0
+    healthy = sim_driver_factory(catalogue, NO_LATENCY, page_load="eager")()
+    recovered = rs.run_retry_pass(healthy, retry, lambda msg: None, threading.Event(),
+                                  extract=rs.make_extractor(budget=2))
+    rows = read_rows(output)
+    assert recovered == faults
+    assert len(retry) == 0
+    assert len(rows) == len({row["url"] for row in rows}) == len(expected)
+
+
+def test_click_paging_waits_for_pages_without_a_page_load_wait(tmp_path):
+    catalogue = Catalogue(400, seed=7)
+    city = catalogue.cities()[0]
+    output = str(tmp_path / "out.jsonl")
+    job = Job(search_url(city), name=city, output=output, max_pages=3)
+
+    # get() returns before the page commits, and Next re-renders the list later still
+    latency = parse_latency("command=const:0 nav=const:0.1 load=const:0.05 search=const:0.1")
+    factory = sim_driver_factory(catalogue, latency, page_load="none")
+    runner = functools.partial(rs.run_job, budget=2)
+    JobScheduler([job], runner, driver_factory=factory, log=lambda msg: None,
+                 stop_event=threading.Event()).run()
+
+    rows = read_rows(output)
+    assert len(catalogue.by_city[city.lower()]) > 36
+    assert job.status == "done"
+    assert job.pages == 3
+    assert len(rows) == len({row["url"] for row in rows}) == job.items == 36
+
+
+def test_cut_short_or_empty_crawls_are_incomplete(tmp_path, monkeypatch):
+    # Every results page is a bot-check page: no cards and no Next button
+    monkeypatch.setattr(rs, "WebDriverWait", lambda driver, timeout, **kw: WebDriverWait(driver, 0.2, **kw))
+    catalogue = Catalogue(100, seed=1)
+    blocked = Job(search_url(catalogue.cities()[0]), name="blocked", output=str(tmp_path / "blocked.jsonl"))
+    factory = sim_driver_factory(catalogue, NO_LATENCY, parse_faults("blocked=1"), page_load="eager")
+    logs = []
+    totals = JobScheduler([blocked], rs.run_job, driver_factory=factory, log=logs.append,
+                          stop_event=threading.Event()).run()
+
+    assert blocked.status == "incomplete"
+    assert blocked.incomplete == "page 1: no Next button (timeout)"
+    assert totals["incomplete"] == 1 and "done" not in totals
+    assert any(line.startswith("[incomplete] blocked pages=1 items=0") for line in logs)
+
+    # A search that reaches its last page without a single listing isn't a success either
+    empty = Job(search_url("Nowhere"), name="empty", output=str(tmp_path / "empty.jsonl"))
+    JobScheduler([empty], rs.run_job, driver_factory=sim_driver_factory(Catalogue(0), NO_LATENCY),
+                 log=lambda msg: None, stop_event=threading.Event()).run()
+    assert empty.status == "incomplete"
+    assert empty.incomplete == "no listings written"
+
+
+def test_crashed_browser_fails_the_job_and_is_replaced(tmp_path):
+    catalogue = Catalogue(200, seed=3)
+    cities = catalogue.cities()[:2]
+    jobs = [Job(search_url(city), name=city, output=str(tmp_path / f"{city}.jsonl"), paging="url")
+            for city in cities]
+    factory = sim_driver_factory(catalogue, NO_LATENCY, page_load="eager")
+
+    def run_job(driver, job, log, stop_event):
+        if len(factory.drivers) == 1:
+            driver.alive = False  # the first browser dies before its job starts
+        rs.run_job(driver, job, log, stop_event, budget=2)
+
+    totals = JobScheduler(jobs, run_job, driver_factory=factory, log=lambda msg: None,
+                          stop_event=threading.Event()).run()
+
+    assert [job.status for job in jobs] == ["failed", "done"]
+    assert len(factory.drivers) == 2
+    assert totals["items"] == len(catalogue.by_city[cities[1].lower()])
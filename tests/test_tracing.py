@@ -0,0 +1,71 @@
+import json
+import threading
+
+import pytest
+from selenium.webdriver.support.ui import WebDriverWait
+
+import realtor_scrapper as rs
+from jobs import Job, JobScheduler
+from simdriver import Catalogue, parse_latency, search_url, sim_driver_factory
+from tracing import tracer
+
+
+NO_LATENCY = parse_latency("command=const:0 nav=const:0 load=const:0 search=const:0")
+UNTIL, UNTIL_NOT = WebDriverWait.until, WebDriverWait.until_not
+
+
+@pytest.fixture(autouse=True)
+def no_pauses():
+    rs.set_sleep(lambda seconds: None)
+    yield
+    rs.set_sleep(tracer.sleep)
+
+
+def test_trace_export(tmp_path):
+    catalogue = Catalogue(40, seed=2)
+    city = catalogue.cities()[0]
+    job = Job(search_url(city), name=city, output=str(tmp_path / "out.jsonl"), max_pages=1)
+
+    with tracer.recording():
+        assert WebDriverWait.until is not UNTIL
+        JobScheduler([job], rs.run_job, driver_factory=sim_driver_factory(catalogue, NO_LATENCY),
+                     log=lambda msg: None, stop_event=threading.Event()).run()
+    assert (WebDriverWait.until, WebDriverWait.until_not) == (UNTIL, UNTIL_NOT)
+    assert not tracer.enabled
+
+    path = tmp_path / "trace.json"
+    count = tracer.export(str(path))
+    with open(path, encoding="utf-8") as f:
+        trace = json.load(f)
+    events = trace["traceEvents"]
+    assert trace["displayTimeUnit"] == "ms" and len(events) == count
+
+    spans = [e for e in events if e["ph"] == "X"]
+    assert {e["name"] for e in spans} >= {"job", "page", "listing", "extract", "write", "wait.until"}
+    for e in spans:
+        assert set(e) == {"name", "cat", "ph", "ts", "dur", "pid", "tid", "args"}
+        assert e["ts"] >= 0 and e["dur"] >= 0
+    # Every thread that recorded a span is named once
+    names = [e for e in events if e["ph"] == "M"]
+    assert sorted(e["tid"] for e in names) == sorted({e["tid"] for e in spans})
+    assert {e["args"]["name"] for e in names} == {"worker-1"}
+
+    job_span = next(e for e in spans if e["name"] == "job")
+    assert job_span["args"] == {"job": city, "worker": "worker-1"}
+    listings = [e for e in spans if e["name"] == "listing"]
+    assert len(listings) == min(rs.RESULTS_PER_PAGE, len(catalogue.by_city[city.lower()]))
+    for e in listings:
+        assert e["args"]["url"].startswith("https://www.realtor.ca/real-estate/")
+        # Nested inside the job's span
+        assert job_span["ts"] <= e["ts"] and e["ts"] + e["dur"] <= job_span["ts"] + job_span["dur"]
+    waits = [e for e in spans if e["name"] == "wait.until"]
+    assert all(e["cat"] == "wait" and e["args"]["outcome"] for e in waits)
+
+
+def test_wait_patch_is_removed_when_the_block_raises():
+    with pytest.raises(RuntimeError):
+        with tracer.recording():
+            assert WebDriverWait.until is not UNTIL
+            raise RuntimeError("crawl failed")
+    assert (WebDriverWait.until, WebDriverWait.until_not) == (UNTIL, UNTIL_NOT)
+    assert not tracer.enabled
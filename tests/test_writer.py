@@ -0,0 +1,111 @@
+import json
+import threading
+
+import pytest
+
+from listing import Listing
+from writer import WriterClient, WriterServer
+
+
+def listing(n, price=100000):
+    info = Listing(url=f"https://www.realtor.ca/real-estate/{27000000 + n}/x")
+    info.set_price(f"${price + n:,}")
+    return info
+
+
+def read_rows(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.fixture
+def server(tmp_path):
+    # Long interval and batch: only flushes commit, so a test controls each batch
+    server = WriterServer(f"unix:{tmp_path / 'w.sock'}", batch_size=10000, flush_interval=3600).start()
+    yield server
+    server.stop()
+
+
+def test_concurrent_clients_are_deduplicated_and_accounted_for(server, tmp_path):
+    output = str(tmp_path / "out.jsonl")
+    address = f"unix:{server.address}"
+
+    # Three scrapers crawling the same 50 listings
+    def scraper():
+        client = WriterClient(address, output)
+        for n in range(50):
+            client.write(listing(n))
+        client.close()
+
+    threads = [threading.Thread(target=scraper) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=30)
+
+    # Seen again after commit: identical rows are dropped, a changed one goes through
+    client = WriterClient(address, output)
+    client.write(listing(0))
+    client.write(listing(1, price=90000))
+    client.close()
+
+    rows = read_rows(output)
+    stats = server.stats
+    assert len(rows) == 51
+    assert len({row["url"] for row in rows}) == 50
+    assert stats["received"] == 152
+    assert stats["committed"] == 51
+    assert stats["received"] == stats["committed"] + stats["duplicates"] + stats["collapsed"] + stats["failed"]
+    assert stats["duplicates"] + stats["collapsed"] == 101
+
+
+def test_rows_for_one_listing_collapse_within_a_batch(server, tmp_path):
+    output = str(tmp_path / "out.jsonl")
+    client = WriterClient(f"unix:{server.address}", output)
+    for price in (300000, 310000, 320000):
+        client.write(listing(0, price=price))
+    client.close()
+
+    assert [row["price"] for row in read_rows(output)] == [320000]
+    assert server.stats["collapsed"] == 2
+    assert server.stats["committed"] == 1
+
+
+def test_failed_batch_is_kept_and_reported(server, tmp_path, monkeypatch):
+    output = str(tmp_path / "out.jsonl")
+    sink_for = server._sink_for
+    failures = [OSError("file is locked")]
+
+    class FlakySink:
+        def __init__(self, sink):
+            self.sink = sink
+
+        def write_many(self, rows):
+            if failures:
+                raise failures.pop()
+            self.sink.write_many(rows)
+
+    monkeypatch.setattr(server, "_sink_for", lambda output, columns: FlakySink(sink_for(output, columns)))
+    client = WriterClient(f"unix:{server.address}", output)
+    for n in range(3):
+        client.write(listing(n))
+    with pytest.raises(IOError, match="file is locked"):
+        client.flush()
+    assert server.stats["committed"] == 0
+
+    # The next commit retries the batch, alongside a newer row for one of its listings
+    client.write(listing(2, price=90000))
+    assert client.flush()["committed"] == 3
+    client.close()
+
+    rows = read_rows(output)
+    assert [row["price"] for row in rows] == [100000, 100001, 90002]
+    assert server.stats["collapsed"] == 1
+    assert server.stats["received"] == 4
+
+
+def test_mismatched_columns_are_refused(server, tmp_path):
+    output = str(tmp_path / "out.csv")
+    WriterClient(f"unix:{server.address}", output, [("Change", "change")]).close()
+    with pytest.raises(IOError, match="different columns"):
+        WriterClient(f"unix:{server.address}", output)
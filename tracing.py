@@ -0,0 +1,256 @@
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium.webdriver.support.ui import WebDriverWait
+
+
+# =======================
+# TRACER
+# =======================
+class Tracer:
+    """
+    Records nested spans as Chrome trace events (chrome://tracing, Perfetto).
+
+    Disabled by default: span() / sleep() cost one attribute check until
+    enable() is called. Spans carry the tags set with tag() on the current
+    thread (listing URL, worker), and every WebDriver command on an
+    instrumented driver is recorded as its own span.
+
+    While enabled, WebDriverWait.until / until_not are patched process-wide to
+    record waits; disable() puts them back, so pair enable() with disable() in
+    a try/finally, or use `with tracer.recording():`.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.events = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._t0 = time.perf_counter()
+        self._named_threads = set()
+        self._orig_until = None
+        self._orig_until_not = None
+
+    # ---------- Setup ----------
+    def enable(self):
+        """
+        Starts a new recording: events from an earlier one are dropped.
+        """
+        if self.enabled:
+            return
+        with self._lock:
+            self.events = []
+            self._named_threads = set()
+        self.enabled = True
+        self._t0 = time.perf_counter()
+        self._patch_waits()
+
+    def disable(self):
+        """
+        Stops recording and removes the WebDriverWait patch; recorded events stay for export().
+        """
+        self.enabled = False
+        if self._orig_until is not None:
+            WebDriverWait.until = self._orig_until
+            WebDriverWait.until_not = self._orig_until_not
+            self._orig_until = self._orig_until_not = None
+
+    @contextmanager
+    def recording(self):
+        """
+        Enables the tracer for the block and always disables it on the way out.
+        """
+        self.enable()
+        try:
+            yield self
+        finally:
+            self.disable()
+
+    def _patch_waits(self):
+        self._orig_until = WebDriverWait.until
+        self._orig_until_not = WebDriverWait.until_not
+        tracer = self
+
+        def traced(orig, name):
+            @functools.wraps(orig)
+            def wrapper(wait, method, message=""):
+                label = getattr(method, "__qualname__", type(method).__name__)
+                with tracer.span(name, cat="wait", condition=label, timeout=getattr(wait, "_timeout", None)) as args:
+                    try:
+                        result = orig(wait, method, message)
+                    except Exception as e:
+                        args["outcome"] = type(e).__name__
+                        raise
+                    args["outcome"] = "ok"
+                    return result
+            return wrapper
+
+        WebDriverWait.until = traced(self._orig_until, "wait.until")
+        WebDriverWait.until_not = traced(self._orig_until_not, "wait.until_not")
+
+    def instrument(self, driver):
+        """
+        Wraps driver.execute so every WebDriver command (get, findElement,
+        executeScript, element text/attribute/click...) becomes a span.
+        Elements route their commands through the driver, so they're covered too.
+        """
+        if getattr(driver, "_traced", False):
+            return driver
+        orig = driver.execute
+        tracer = self
+
+        @functools.wraps(orig)
+        def execute(command, params=None):
+            if not tracer.enabled:
+                return orig(command, params)
+            args = {}
+            if params:
+                for key in ("url", "using", "value", "name"):
+                    if key in params and isinstance(params[key], str):
+                        args[key] = params[key][:200]
+            with tracer.span(command, cat="webdriver", **args):
+                return orig(command, params)
+
+        driver.execute = execute
+        driver._traced = True
+        return driver
+
+    # ---------- Tags ----------
+    def _tags(self):
+        if not hasattr(self._local, "tags"):
+            self._local.tags = {}
+        return self._local.tags
+
+    @contextmanager
+    def tag(self, **tags):
+        """
+        Adds tags (e.g. url=..., worker=...) to every span opened in this thread inside the block.
+        """
+        current = self._tags()
+        saved = dict(current)
+        current.update(tags)
+        try:
+            yield
+        finally:
+            current.clear()
+            current.update(saved)
+
+    # ---------- Spans ----------
+    def _now_us(self):
+        return (time.perf_counter() - self._t0) * 1e6
+
+    @contextmanager
+    def span(self, name, cat="scraper", **args):
+        """
+        Times the block as one complete ("X") event. Yields the args dict so the
+        block can add results (e.g. args["outcome"] = "timeout").
+        """
+        if not self.enabled:
+            yield args
+            return
+        start = self._now_us()
+        try:
+            yield args
+        finally:
+            self._record(name, cat, start, self._now_us() - start, args)
+
+    def _record(self, name, cat, start, dur, args):
+        thread = threading.current_thread()
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": round(start, 1),
+            "dur": round(dur, 1),
+            "pid": os.getpid(),
+            "tid": thread.ident,
+            "args": {**self._tags(), **{k: v for k, v in args.items() if v is not None}},
+        }
+        with self._lock:
+            if thread.ident not in self._named_threads:
+                self._named_threads.add(thread.ident)
+                self.events.append({
+                    "name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": thread.ident,
+                    "args": {"name": thread.name},
+                })
+            self.events.append(event)
+
+    def sleep(self, seconds):
+        with self.span("sleep", cat="sleep", seconds=seconds):
+            time.sleep(seconds)
+
+    # ---------- Export ----------
+    def export(self, path):
+        with self._lock:
+            events = list(self.events)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return len(events)
+
+
+# =======================
+# PROFILER
+# =======================
+class Profiler:
+    """
+    cProfile for a multi-threaded run: wrap() profiles each call in its own
+    thread, dump() merges everything into one .pstats file and returns the top
+    functions by cumulative time as text.
+
+    Python 3.12+ allows one active profiler per process ("Another profiling
+    tool is already active"): there a call that starts while another is being
+    profiled runs unprofiled instead, and dump() says how many did.
+    """
+
+    def __init__(self):
+        self._profiles = []
+        self._lock = threading.Lock()
+        self.unprofiled = 0
+
+    def wrap(self, fn):
+        @functools.wraps(fn)
+        def profiled(*args, **kwargs):
+            prof = cProfile.Profile()
+            try:
+                prof.enable()
+            except ValueError:
+                with self._lock:
+                    self.unprofiled += 1
+                return fn(*args, **kwargs)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                prof.disable()
+                with self._lock:
+                    self._profiles.append(prof)
+        return profiled
+
+    def dump(self, path, top=30) -> str:
+        with self._lock:
+            profiles = list(self._profiles)
+        if not profiles:
+            return "no profile data"
+        stats = pstats.Stats(profiles[0])
+        for prof in profiles[1:]:
+            stats.add(prof)
+        stats.dump_stats(path)
+
+        out = io.StringIO()
+        if self.unprofiled:
+            out.write(f"{self.unprofiled} call(s) ran unprofiled (another profiler was active)\n")
+        stats.stream = out
+        stats.sort_stats("cumulative").print_stats(top)
+        return out.getvalue()
+
+
+# Process-wide tracer; a no-op until enable() is called.
+tracer = Tracer()
+span = tracer.span
+sleep = tracer.sleep
@@ -0,0 +1,363 @@
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+
+from delta import field_hash, listing_id
+from listing import Listing
+from sinks import open_sink
+
+
+logger = logging.getLogger("YELLOSCRAPPER")
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+
+
+def parse_address(text: str):
+    """
+    "unix:/tmp/w.sock" or "/tmp/w.sock" -> (AF_UNIX, path);
+    "host:port" / ":port" -> (AF_INET, (host, port)), host defaults to 127.0.0.1.
+    """
+    text = (text or DEFAULT_ADDRESS).strip()
+    if text.startswith("unix:"):
+        return socket.AF_UNIX, text[5:]
+    if "/" in text or text.endswith(".sock"):
+        return socket.AF_UNIX, text
+    host, _, port = text.rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+# =======================
+# SERVER
+# =======================
+class _Handler(socketserver.StreamRequestHandler):
+    """
+    One connection = one output. Lines are JSON messages:
+      {"op": "open", "output": "...", "columns": [[header, field], ...]}  -> {"ok": true}
+      {"op": "write", "listing": {...}}
+      {"op": "flush"}   -> replied with {"ok": true, "committed": N} once committed
+    Only open and flush are answered. A bad write is reported in the next flush
+    reply instead, as is a batch for this output the server could not save.
+    """
+
+    def handle(self):
+        server = self.server.writer
+        output, columns = None, ()
+        errors = []
+        for raw in self.rfile:
+            op = None
+            try:
+                msg = json.loads(raw)
+                op = msg.get("op")
+                if op == "open":
+                    output = msg["output"]
+                    columns = tuple(tuple(c) for c in msg.get("columns") or ())
+                    server.register(output, columns)
+                    self._reply({"ok": True})
+                elif op == "write":
+                    if output is None:
+                        raise ValueError("write before open")
+                    server.submit(output, columns, msg["listing"])
+                elif op == "flush":
+                    committed = server.flush()
+                    error = server.error(output)
+                    if error:
+                        errors.append(error)
+                    if errors:
+                        self._reply({"ok": False, "error": "; ".join(errors), "committed": committed})
+                        errors = []
+                    else:
+                        self._reply({"ok": True, "committed": committed})
+                else:
+                    raise ValueError(f"unknown op {op!r}")
+            except Exception as e:
+                logger.warning(f"[writer] bad message from {self.client_address or 'local'}: {e}")
+                if op in ("open", "flush"):
+                    self._reply({"ok": False, "error": str(e)})
+                else:
+                    errors.append(str(e))
+
+    def _reply(self, msg):
+        try:
+            self.wfile.write((json.dumps(msg) + "\n").encode("utf-8"))
+            self.wfile.flush()
+        except OSError:
+            pass
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socketserver, "UnixStreamServer"):
+    class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+
+class WriterServer:
+    """
+    Single writer for every scraper process on the box. Clients stream listings
+    over a Unix socket or loopback TCP; one committer thread batches them per
+    output and appends each batch with a single open / save (write_many).
+
+    Within a batch the newest record per listing ID wins (the older ones count as
+    collapsed), and a record identical to the last one committed for that ID and
+    output is dropped (duplicates), so two scrapers crawling the same region don't
+    double the rows. Every received row ends up committed, a duplicate, collapsed,
+    or failed (still unsaved when the server stops).
+
+    A batch that fails to save (e.g. the Excel file is open elsewhere) is kept and
+    retried with the next commit; until it goes through, flush replies to that
+    output's clients carry the error. All clients of one output must use the same
+    columns.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, batch_size=200, flush_interval=1.0):
+        self.family, self.address = parse_address(address)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._sinks = {}
+        self._committed = {}  # output -> {listing id: hash}
+        self._pending = {}    # output -> (columns, {listing id: Listing})
+        self._columns = {}    # output -> columns its clients opened it with
+        self._errors = {}     # output -> last save error, until a save succeeds
+        self._lock = threading.Lock()
+        self._server = None
+        self._committer = None
+        self.stats = {"received": 0, "committed": 0, "duplicates": 0, "collapsed": 0, "failed": 0, "batches": 0}
+
+    # ---------- Lifecycle ----------
+    def start(self):
+        if self.family == socket.AF_UNIX:
+            if os.path.exists(self.address):
+                os.unlink(self.address)
+            self._server = _UnixServer(self.address, _Handler)
+        else:
+            if self.address[0] not in ("127.0.0.1", "localhost", "::1"):
+                logger.warning(f"[writer] listening on non-loopback address {self.address[0]}")
+            self._server = _TCPServer(self.address, _Handler)
+        self._server.writer = self
+        self._committer = threading.Thread(target=self._commit_loop, name="writer-commit", daemon=True)
+        self._committer.start()
+        threading.Thread(target=self._server.serve_forever, name="writer-accept", daemon=True).start()
+        logger.info(f"[writer] listening on {self.address}")
+        return self
+
+    def serve_forever(self):
+        self.start()
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            if self.family == socket.AF_UNIX and os.path.exists(self.address):
+                os.unlink(self.address)
+        self._queue.put(None)
+        if self._committer is not None:
+            self._committer.join()
+        for output, (_, rows) in self._pending.items():
+            logger.error(f"[writer] {len(rows)} row(s) for {output} were never saved")
+            self.stats["failed"] += len(rows)
+        for sink in self._sinks.values():
+            sink.close()
+        logger.info(
+            f"[writer] received={self.stats['received']} committed={self.stats['committed']} "
+            f"duplicates={self.stats['duplicates']} collapsed={self.stats['collapsed']} "
+            f"failed={self.stats['failed']} batches={self.stats['batches']}"
+        )
+
+    # ---------- Intake ----------
+    def register(self, output, columns):
+        """
+        Records the columns a client opened `output` with; a different set for an
+        output already open would mix two layouts in one file, so it is refused.
+        """
+        with self._lock:
+            known = self._columns.setdefault(output, columns)
+        if known != columns:
+            raise ValueError(f"{output} is already open with different columns")
+
+    def error(self, output):
+        """
+        The reason `output`'s last batch could not be saved, or None.
+        """
+        with self._lock:
+            return self._errors.get(output)
+
+    def submit(self, output, columns, record: dict):
+        self._queue.put((output, columns, record))
+
+    def flush(self, timeout=60) -> int:
+        """
+        Blocks until everything queued so far is committed. Returns the total committed.
+        """
+        done = threading.Event()
+        self._queue.put(done)
+        if not done.wait(timeout):
+            raise TimeoutError(f"commit not finished after {timeout}s")
+        return self.stats["committed"]
+
+    # ---------- Commit ----------
+    def _commit_loop(self):
+        last_commit = time.time()
+        while True:
+            timeout = max(0.0, self.flush_interval - (time.time() - last_commit))
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = ()
+
+            if item is None:
+                self._commit_all()
+                return
+            if isinstance(item, threading.Event):
+                self._commit_all()
+                last_commit = time.time()
+                item.set()
+                continue
+            if item:
+                output, columns, record = item
+                listing = Listing.from_dict(record)
+                self.stats["received"] += 1
+                self._queue_row(output, columns, listing, replace=True)
+
+            pending = sum(len(rows) for _, rows in self._pending.values())
+            if pending >= self.batch_size or (pending and time.time() - last_commit >= self.flush_interval):
+                self._commit_all()
+                last_commit = time.time()
+
+    def _commit_all(self):
+        pending, self._pending = self._pending, {}
+        failed = {}
+        for output, (columns, rows) in pending.items():
+            committed = self._committed.setdefault(output, {})
+            batch = []
+            for lid, listing in rows.items():
+                h = field_hash(listing) + listing.change
+                if committed.get(lid) == h:
+                    self.stats["duplicates"] += 1
+                    continue
+                committed[lid] = h
+                batch.append(listing)
+            if not batch:
+                continue
+            try:
+                self._sink_for(output, columns).write_many(batch)
+            except Exception as e:
+                logger.error(f"[writer] could not write {len(batch)} row(s) to {output}, will retry: {e}")
+                for listing in batch:
+                    committed.pop(listing_id(listing), None)
+                failed[output] = (columns, batch)
+                with self._lock:
+                    self._errors[output] = f"could not write {output}: {e}"
+                continue
+            with self._lock:
+                self._errors.pop(output, None)
+            self.stats["committed"] += len(batch)
+            self.stats["batches"] += 1
+
+        # Failed batches are retried with the next commit
+        for output, (columns, batch) in failed.items():
+            for listing in batch:
+                self._queue_row(output, columns, listing, replace=False)
+
+    def _queue_row(self, output, columns, listing, replace):
+        """
+        Adds a row to `output`'s pending batch. Of two rows for one listing ID only
+        one is kept: the new one with `replace`, else the one already pending.
+        """
+        rows = self._pending.setdefault(output, (columns, {}))[1]
+        lid = listing_id(listing)
+        if lid in rows:
+            self.stats["collapsed"] += 1
+            if not replace:
+                return
+        rows[lid] = listing
+
+    def _sink_for(self, output, columns):
+        if output not in self._sinks:
+            self._sinks[output] = open_sink(output, columns)
+        return self._sinks[output]
+
+
+# =======================
+# CLIENT
+# =======================
+class WriterClient:
+    """
+    Sink that streams listings to a WriterServer instead of writing the file
+    itself. close() waits until the server has committed everything sent.
+    """
+
+    def __init__(self, address, output, extra_columns=()):
+        family, addr = parse_address(address)
+        self.output = output
+        self.count = 0
+        self._lock = threading.Lock()
+        try:
+            if family == socket.AF_UNIX:
+                self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self._sock.connect(addr)
+            else:
+                self._sock = socket.create_connection(addr, timeout=10)
+                self._sock.settimeout(None)
+        except OSError as e:
+            raise ConnectionError(f"writer service not reachable at {address}: {e}") from e
+        self._rfile = self._sock.makefile("rb")
+        self._send({"op": "open", "output": output, "columns": [list(c) for c in extra_columns]})
+        self._reply()
+
+    def _send(self, msg):
+        self._sock.sendall((json.dumps(msg, ensure_ascii=False) + "\n").encode("utf-8"))
+
+    def _reply(self):
+        line = self._rfile.readline()
+        if not line:
+            raise ConnectionError("writer service closed the connection")
+        msg = json.loads(line)
+        if not msg.get("ok"):
+            raise IOError(f"writer service: {msg.get('error')}")
+        return msg
+
+    def write(self, data: Listing):
+        record = data.to_dict() if isinstance(data, Listing) else dict(data)
+        with self._lock:
+            self._send({"op": "write", "listing": record})
+            self.count += 1
+
+    def flush(self):
+        with self._lock:
+            self._send({"op": "flush"})
+            return self._reply()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self._rfile.close()
+            self._sock.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    parser = argparse.ArgumentParser(description="Single-writer output service for scraper processes")
+    parser.add_argument("--listen", default=DEFAULT_ADDRESS, help="host:port (loopback) or unix:/path.sock")
+    parser.add_argument("--batch-size", type=int, default=200, help="rows per commit")
+    parser.add_argument("--flush-interval", type=float, default=1.0, help="max seconds a row waits for commit")
+    args = parser.parse_args()
+    WriterServer(args.listen, args.batch_size, args.flush_interval).serve_forever()